@@ -99,7 +99,8 @@ document.addEventListener('DOMContentLoaded', function() {
         console.log('Sending request to server...');
 
         try {
-            const response = await fetch('/api/process-pdf', {
+            // Only what the page shows; chunk summaries are paged from /api/jobs/<id>/chunk-summaries
+            const response = await fetch('/api/process-pdf?fields=summary,audioUrl,jobId', {
                 method: 'POST',
                 body: formData,
             });
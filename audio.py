@@ -0,0 +1,205 @@
+"""
+PCM post-processing for PDF to Podcast Generator.
+
+Speech is rendered in segments (see tts.SpeechPipeline). assemble() joins
+them into the final WAV with NumPy instead of copying frames in Python:
+
+- each segment is memory-mapped, so reading it costs nothing up front;
+- leading and trailing silence is trimmed by slicing the mapped array (a
+  view, no copy), and a fixed AUDIO_GAP_MS pause goes between segments;
+- every segment is scaled to the same loudness (RMS of AUDIO_TARGET_DBFS,
+  limited so peaks do not clip);
+- segments at another sample rate are resampled to the first one's;
+- all samples land in one preallocated buffer that is written after the
+  header in a single call.
+
+numpy is listed in requirements.txt; if it is missing anyway, tts falls back
+to plain concatenation.
+"""
+
+import os
+import struct
+
+AUDIO_TARGET_DBFS = float(os.environ.get('AUDIO_TARGET_DBFS', '-20') or -20)
+AUDIO_GAP_MS = int(os.environ.get('AUDIO_GAP_MS', '250') or 0)
+
+# Samples quieter than this (dBFS) count as silence when trimming.
+SILENCE_DBFS = -50
+# Silence kept at each end of a trimmed segment, so word onsets are not cut.
+TRIM_PAD_MS = 20
+
+_FULL_SCALE = 32767
+
+
+def available() -> bool:
+    try:
+        import numpy  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def write_wav_header(stream, pcm_data_length, sample_rate, channels=1):
+    """Writes the header of a 16-bit PCM WAV file to a stream."""
+    stream.write(b'RIFF')
+    stream.write((pcm_data_length + 36).to_bytes(4, 'little'))
+    stream.write(b'WAVE')
+    stream.write(b'fmt ')
+    stream.write((16).to_bytes(4, 'little'))
+    stream.write((1).to_bytes(2, 'little'))
+    stream.write(int(channels).to_bytes(2, 'little'))
+    stream.write(int(sample_rate).to_bytes(4, 'little'))
+    byte_rate = int(sample_rate) * int(channels) * (16 // 8)
+    stream.write(int(byte_rate).to_bytes(4, 'little'))
+    block_align = int(channels) * (16 // 8)
+    stream.write(int(block_align).to_bytes(2, 'little'))
+    stream.write((16).to_bytes(2, 'little'))
+    stream.write(b'data')
+    stream.write(pcm_data_length.to_bytes(4, 'little'))
+
+
+def read_pcm(path: str):
+    """Memory-map a 16-bit PCM WAV file.
+
+    Returns (samples, sample_rate) where samples is a read-only int16 array
+    of shape (frames, channels) backed by the file.
+    """
+    import numpy as np
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError(f"{path} is not a WAV file")
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                fmt = struct.unpack('<HHIIHH', f.read(16))
+                f.seek(size - 16 + (size & 1), 1)
+            elif chunk_id == b'data':
+                offset = f.tell()
+                break
+            else:
+                f.seek(size + (size & 1), 1)  # chunks are word-aligned
+        file_size = os.fstat(f.fileno()).st_size
+    if fmt is None:
+        raise ValueError(f"{path} has no fmt chunk")
+    audio_format, channels, sample_rate, _, _, bits = fmt
+    if audio_format not in (1, 0xFFFE) or bits != 16:
+        raise ValueError(f"{path}: only 16-bit PCM is supported (format {audio_format}, {bits} bits)")
+    # Streaming writers may leave the data size unset (0 or 0xFFFFFFFF).
+    size = min(size or file_size, file_size - offset)
+    frames = size // (2 * channels)
+    if not frames:
+        return np.zeros((0, channels), dtype='<i2'), sample_rate
+    samples = np.memmap(path, dtype='<i2', mode='r', offset=offset, shape=(frames, channels))
+    return samples, sample_rate
+
+
+def _loud_frames(block, threshold):
+    import numpy as np
+    return np.flatnonzero(((block > threshold) | (block < -threshold)).any(axis=1))
+
+
+def trim_silence(samples, sample_rate: int, threshold_dbfs: float = SILENCE_DBFS, pad_ms: int = TRIM_PAD_MS):
+    """View of `samples` without leading and trailing silence."""
+    threshold = _FULL_SCALE * 10 ** (threshold_dbfs / 20)
+    # Scan inwards from each end in 100 ms blocks; the middle is never read.
+    step = max(1, sample_rate // 10)
+    first = None
+    for start in range(0, len(samples), step):
+        loud = _loud_frames(samples[start:start + step], threshold)
+        if len(loud):
+            first = start + loud[0]
+            break
+    if first is None:
+        return samples[:0]
+    last = first
+    for end in range(len(samples), first, -step):
+        start = max(first, end - step)
+        loud = _loud_frames(samples[start:end], threshold)
+        if len(loud):
+            last = start + loud[-1]
+            break
+    pad = int(sample_rate * pad_ms / 1000)
+    return samples[max(0, first - pad):last + 1 + pad]
+
+
+def loudness_gain(samples, target_dbfs: float = AUDIO_TARGET_DBFS) -> float:
+    """Gain bringing the RMS level to target_dbfs without clipping peaks."""
+    import numpy as np
+    if not len(samples):
+        return 1.0
+    flat = samples.reshape(-1)
+    rms = float(np.sqrt(np.dot(flat, flat.astype(np.float64)) / flat.size))
+    peak = float(max(int(flat.max()), -int(flat.min())))  # np.abs overflows on -32768
+    if not rms or not peak:
+        return 1.0
+    target = _FULL_SCALE * 10 ** (target_dbfs / 20)
+    return min(target / rms, _FULL_SCALE / peak)
+
+
+def resample(samples, src_rate: int, dst_rate: int):
+    """Linear-interpolation resample of (frames, channels) samples (float32)."""
+    import numpy as np
+    if src_rate == dst_rate or not len(samples):
+        return samples
+    frames = int(round(len(samples) * dst_rate / src_rate))
+    positions = np.arange(frames, dtype=np.float64) * (src_rate / dst_rate)
+    source = np.arange(len(samples), dtype=np.float64)
+    out = np.empty((frames, samples.shape[1]), dtype=np.float32)
+    for channel in range(samples.shape[1]):
+        out[:, channel] = np.interp(positions, source, samples[:, channel])
+    return out
+
+
+def assemble(paths, output_path: str, trim: bool = True, normalize: bool = True,
+             gap_ms: int = AUDIO_GAP_MS, target_dbfs: float = AUDIO_TARGET_DBFS) -> float:
+    """Join WAV segments into output_path; returns the duration in seconds.
+
+    The first segment fixes the sample rate and channel count. Segments
+    that are silent after trimming are dropped.
+    """
+    import numpy as np
+    segments, rate, channels = [], None, None
+    for path in paths:
+        samples, sample_rate = read_pcm(path)
+        if rate is None:
+            rate, channels = sample_rate, samples.shape[1]
+        elif samples.shape[1] != channels:
+            raise ValueError(f"WAV channel mismatch in {path}: {samples.shape[1]} != {channels}")
+        if trim:
+            samples = trim_silence(samples, sample_rate)
+            if not len(samples):
+                continue
+        gain = loudness_gain(samples, target_dbfs) if normalize else 1.0
+        samples = resample(samples, sample_rate, rate)
+        segments.append((samples, gain))
+    if rate is None:
+        raise ValueError("No audio segments to assemble")
+
+    gap = int(rate * gap_ms / 1000) if trim else 0
+    total = sum(len(s) for s, _ in segments) + gap * max(0, len(segments) - 1)
+    out = np.zeros((total, channels), dtype='<i2')
+    scratch = np.empty((max((len(s) for s, _ in segments), default=0), channels), dtype=np.float32)
+    pos = 0
+    for i, (samples, gain) in enumerate(segments):
+        n = len(samples)
+        if gain == 1.0 and samples.dtype == out.dtype:
+            out[pos:pos + n] = samples
+        else:
+            buf = scratch[:n]
+            np.multiply(samples, gain, out=buf, casting='unsafe')
+            np.rint(buf, out=buf)
+            np.clip(buf, -_FULL_SCALE - 1, _FULL_SCALE, out=buf)
+            out[pos:pos + n] = buf
+        pos += n + (gap if i < len(segments) - 1 else 0)
+
+    tmp_path = output_path + '.part'
+    with open(tmp_path, 'wb') as f:
+        write_wav_header(f, out.nbytes, rate, channels)
+        out.tofile(f)
+    os.replace(tmp_path, output_path)
+    return total / rate
@@ -0,0 +1,271 @@
+"""
+Batch processing of many PDFs for PDF to Podcast Generator.
+
+Runs the same pipeline as /api/process-pdf over a directory or manifest of
+PDFs. From the CLI, documents are spread over worker processes (one per CPU
+core by default) while a shared semaphore caps the number of Gemini calls in
+flight across all of them; the server instead passes its shared, bounded
+thread pool and runs each document in a scheduler slot. Every finished
+document is appended to `<output>/manifest.jsonl`, keyed by a content
+fingerprint, so an interrupted batch resumes where it stopped when run again
+with the same output folder.
+
+A running batch holds `<output>/running.lease` and touches it while it
+works, so any worker process can tell from disk whether a batch is running.
+A lease not renewed for BATCH_LEASE_SECONDS belonged to a process that died.
+
+Used by batch_process.py (CLI) and /api/process-batch.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import llm_client
+
+MANIFEST_NAME = 'manifest.jsonl'
+BATCH_INFO_NAME = 'batch.json'
+LEASE_NAME = 'running.lease'
+BATCH_LEASE_SECONDS = 120
+
+
+def discover_inputs(source: str) -> list:
+    """Resolve a directory, JSON manifest or text list into PDF paths.
+
+    JSON manifests may be a list of paths or of {"path": ...} objects; text
+    lists hold one path per line. Relative paths are resolved against the
+    manifest's folder.
+    """
+    source = os.path.abspath(source)
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            paths.extend(os.path.join(root, f) for f in files if f.lower().endswith('.pdf'))
+        return sorted(paths)
+
+    base = os.path.dirname(source)
+    with open(source, encoding='utf-8') as f:
+        if source.lower().endswith('.json'):
+            entries = json.load(f)
+            if isinstance(entries, dict):
+                entries = entries.get('documents', [])
+            raw = [e['path'] if isinstance(e, dict) else e for e in entries]
+        else:
+            raw = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    return [p if os.path.isabs(p) else os.path.join(base, p) for p in raw]
+
+
+def fingerprint(path: str) -> str:
+    """SHA-256 of the file contents, used to recognise already-done documents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir: str) -> dict:
+    """Latest manifest entry per fingerprint."""
+    entries = {}
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # a line cut short by an interruption
+            entries[entry['fingerprint']] = entry
+    return entries
+
+
+def _append_manifest(output_dir: str, entry: dict) -> None:
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def claim(output_dir: str) -> bool:
+    """Take the batch's lease; False if another live run holds it."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, LEASE_NAME)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if is_running(output_dir):
+                return False
+            release(output_dir)  # stale: its process died
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def renew(output_dir: str) -> None:
+    try:
+        os.utime(os.path.join(output_dir, LEASE_NAME))
+    except OSError:
+        pass  # no lease (CLI runs)
+
+
+def release(output_dir: str) -> None:
+    try:
+        os.remove(os.path.join(output_dir, LEASE_NAME))
+    except FileNotFoundError:
+        pass
+
+
+def is_running(output_dir: str) -> bool:
+    try:
+        return time.time() - os.path.getmtime(os.path.join(output_dir, LEASE_NAME)) < BATCH_LEASE_SECONDS
+    except OSError:
+        return False
+
+
+def _init_worker(budget):
+    llm_client.set_concurrency_budget(budget)
+
+
+def _process_document(path: str, output_dir: str, length_choice: str, slot=None) -> dict:
+    """Run the pipeline for one PDF (inside `slot(path)` when given)."""
+    if slot:
+        with slot(path):
+            return _process_document(path, output_dir, length_choice)
+    import server
+
+    job_id = str(uuid.uuid4())
+    doc_dir = os.path.join(output_dir, job_id)
+    os.makedirs(doc_dir, exist_ok=True)
+    audio_path = os.path.join(doc_dir, f"{job_id}_podcast.wav")
+    started = time.time()
+    body, status_code = server._run_pdf_job(path, job_id, length_choice, folder=doc_dir,
+                                            audio_path=audio_path, keep_input=True, track_revisions=False)
+    entry = {
+        'jobId': job_id,
+        'status': 'done' if status_code == 200 else 'failed',
+        'seconds': round(time.time() - started, 3),
+    }
+    if status_code == 200:
+        entry['outputs'] = {
+            'summary': os.path.join(doc_dir, f"{job_id}_summary.txt"),
+            'pdf': os.path.join(doc_dir, f"{job_id}_summary.pdf"),
+            'audio': audio_path,
+        }
+        entry['timings'] = body.get('timings', {})
+    else:
+        entry['error'] = body.get('error', f'HTTP {status_code}')
+    return entry
+
+
+def prepare_batch(inputs, output_dir: str, length_choice: str = 'medium') -> None:
+    """Record the batch's inputs in output_dir (kept from the first run)."""
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    info_path = os.path.join(output_dir, BATCH_INFO_NAME)
+    if not os.path.exists(info_path):
+        with open(info_path, 'w', encoding='utf-8') as f:
+            json.dump({'inputs': [os.path.abspath(p) for p in inputs], 'length': length_choice,
+                       'createdAt': time.time()}, f)
+
+
+def run_batch(inputs, output_dir: str, workers: int = None, llm_concurrency: int = None,
+              length_choice: str = 'medium', on_progress=None, executor=None, slot=None) -> dict:
+    """Process `inputs` (PDF paths), skipping ones already done in output_dir.
+
+    Documents run on `executor` when given (shared with other batches; the
+    caller bounds it), each inside the context manager `slot(path)`;
+    otherwise on a pool of `workers` processes. Returns counts by status
+    for this run.
+    """
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    llm_concurrency = llm_concurrency or llm_client.LLM_CONCURRENCY
+    inputs = [os.path.abspath(p) for p in inputs]
+
+    prepare_batch(inputs, output_dir, length_choice)
+
+    done = {fp for fp, e in load_manifest(output_dir).items() if e.get('status') == 'done'}
+    todo = []
+    for path in inputs:
+        try:
+            fp = fingerprint(path)
+        except OSError as e:
+            print(f"[WARN] Skipping unreadable input {path}: {e}")
+            _append_manifest(output_dir, {'path': path, 'fingerprint': path, 'status': 'failed', 'error': str(e)})
+            continue
+        if fp in done:
+            continue
+        todo.append((path, fp))
+    # Longest documents first so the tail of the batch isn't one big file.
+    todo.sort(key=lambda item: os.path.getsize(item[0]), reverse=True)
+
+    skipped = len(inputs) - len(todo)
+    if executor:
+        print(f"[INFO] Batch: {len(todo)} document(s) to process, {skipped} already done")
+    else:
+        print(f"[INFO] Batch: {len(todo)} document(s) to process, {skipped} already done; "
+              f"{workers} worker(s), {llm_concurrency} concurrent model call(s)")
+    counts = {'done': 0, 'failed': 0, 'skipped': skipped}
+    if not todo:
+        return counts
+
+    if executor:
+        _collect(executor, todo, output_dir, length_choice, slot, counts, on_progress)
+        return counts
+    ctx = multiprocessing.get_context('spawn')
+    budget = ctx.BoundedSemaphore(llm_concurrency)
+    with ProcessPoolExecutor(max_workers=min(workers, len(todo)), mp_context=ctx,
+                             initializer=_init_worker, initargs=(budget,)) as pool:
+        _collect(pool, todo, output_dir, length_choice, None, counts, on_progress)
+    return counts
+
+
+def _collect(pool, todo, output_dir, length_choice, slot, counts, on_progress):
+    """Submit every document to `pool` and record results as they finish."""
+    futures = {pool.submit(_process_document, path, output_dir, length_choice, slot): (path, fp)
+               for path, fp in todo}
+    pending = set(futures)
+    while pending:
+        finished, pending = wait(pending, timeout=BATCH_LEASE_SECONDS / 4, return_when=FIRST_COMPLETED)
+        renew(output_dir)
+        for future in finished:
+            path, fp = futures[future]
+            try:
+                entry = future.result()
+            except Exception as e:
+                entry = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+            entry.update({'path': path, 'fingerprint': fp, 'finishedAt': time.time()})
+            _append_manifest(output_dir, entry)
+            counts[entry['status']] += 1
+            print(f"[INFO] Batch: {entry['status']} {os.path.basename(path)}")
+            if on_progress:
+                on_progress(counts, len(todo))
+
+
+def batch_status(output_dir: str) -> dict:
+    """Summarize a batch folder: totals plus the latest entry per input."""
+    info_path = os.path.join(output_dir, BATCH_INFO_NAME)
+    if not os.path.exists(info_path):
+        return None
+    with open(info_path, encoding='utf-8') as f:
+        info = json.load(f)
+    entries = list(load_manifest(output_dir).values())
+    finished = {e['path'] for e in entries}
+    pending = [p for p in info['inputs'] if p not in finished]
+    return {
+        'total': len(info['inputs']),
+        'done': sum(1 for e in entries if e.get('status') == 'done'),
+        'failed': sum(1 for e in entries if e.get('status') == 'failed'),
+        'pending': len(pending),
+        'running': is_running(output_dir),
+        'documents': entries,
+    }
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+PDF to Podcast Generator - Batch Processing Script
+Processes a directory (or manifest) of PDFs into summaries and audio.
+
+Usage:
+    python batch_process.py INPUT_DIR_OR_MANIFEST --output OUTPUT_DIR
+        [--workers N] [--llm-concurrency N] [--length short|medium|long]
+
+Re-running with the same --output resumes an interrupted batch; results are
+recorded per document in OUTPUT_DIR/manifest.jsonl.
+"""
+
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+
+def main():
+    """Run a batch from the command line."""
+    load_dotenv()
+    import batch
+
+    parser = argparse.ArgumentParser(description="Convert many PDFs to podcasts.")
+    parser.add_argument("input", help="directory of PDFs, JSON manifest, or text file with one path per line")
+    parser.add_argument("--output", "-o", default="batch_output", help="output folder (default: batch_output)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--llm-concurrency", type=int, default=None,
+                        help="max Gemini calls in flight across all workers (default: LLM_CONCURRENCY)")
+    parser.add_argument("--length", choices=("short", "medium", "long"), default="medium")
+    args = parser.parse_args()
+
+    try:
+        inputs = batch.discover_inputs(args.input)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Could not read inputs from {args.input}: {e}")
+        sys.exit(1)
+    if not inputs:
+        print(f"[ERROR] No PDF files found in {args.input}")
+        sys.exit(1)
+
+    print(f"[STARTUP] Batch of {len(inputs)} PDF(s) -> {os.path.abspath(args.output)}")
+    try:
+        counts = batch.run_batch(inputs, args.output, workers=args.workers,
+                                 llm_concurrency=args.llm_concurrency, length_choice=args.length)
+    except KeyboardInterrupt:
+        print("\n[INFO] Batch interrupted; run the same command again to resume")
+        sys.exit(130)
+
+    print(f"[SUCCESS] Batch finished: {counts['done']} done, {counts['failed']} failed, "
+          f"{counts['skipped']} already done")
+    sys.exit(1 if counts['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
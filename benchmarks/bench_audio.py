@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: assembling a podcast from speech segments.
+
+Writes synthetic TTS-like segments (a tone with silence at both ends, at
+varying levels, some at another sample rate) adding up to --minutes of
+audio, then times:
+
+  concat   tts.concat_wavs: frame copy through the wave module, no processing
+  python   trim + normalize + concatenate with per-sample Python loops
+  numpy    audio.assemble: memory-mapped, vectorized trim/normalize/resample
+
+Usage:
+    python benchmarks/bench_audio.py [--minutes 20] [--segment-seconds 12] [--repeat 3]
+"""
+
+import argparse
+import array
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+import audio
+import tts
+
+RATE = 22050
+
+
+def write_segment(path, seconds, rate, level, seed):
+    rng = np.random.default_rng(seed)
+    n = int(seconds * rate)
+    t = np.arange(n) / rate
+    voice = np.sin(2 * np.pi * (180 + 40 * np.sin(2 * np.pi * 3 * t)) * t) * level * 32767
+    voice += rng.normal(0, 30, n)
+    lead, tail = int(0.4 * rate), int(0.6 * rate)
+    pcm = np.concatenate([np.zeros(lead), voice, np.zeros(tail)]).astype('<i2')
+    with open(path, 'wb') as f:
+        audio.write_wav_header(f, pcm.nbytes, rate)
+        pcm.tofile(f)
+
+
+def python_assemble(paths, output_path):
+    """The same processing written as plain Python loops over samples."""
+    threshold = 32767 * 10 ** (audio.SILENCE_DBFS / 20)
+    target = 32767 * 10 ** (audio.AUDIO_TARGET_DBFS / 20)
+    out = array.array('h')
+    gap = array.array('h', bytes(2 * int(RATE * audio.AUDIO_GAP_MS / 1000)))
+    for i, path in enumerate(paths):
+        with open(path, 'rb') as f:
+            f.seek(44)
+            samples = array.array('h', f.read())
+        loud = [j for j, s in enumerate(samples) if abs(s) > threshold]
+        samples = samples[loud[0]:loud[-1] + 1]
+        rms = math.sqrt(sum(s * s for s in samples) / len(samples))
+        peak = max(abs(s) for s in samples)
+        gain = min(target / rms, 32767 / peak)
+        if i:
+            out.extend(gap)
+        out.extend(max(-32768, min(32767, round(s * gain))) for s in samples)
+    with open(output_path, 'wb') as f:
+        audio.write_wav_header(f, len(out) * 2, RATE)
+        out.tofile(f)
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--minutes', type=float, default=20)
+    parser.add_argument('--segment-seconds', type=float, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip-python', action='store_true', help="skip the slow pure-Python baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        count = max(1, int(args.minutes * 60 / args.segment_seconds))
+        paths, same_rate = [], []
+        for i in range(count):
+            path = os.path.join(tmp, f"{i:05d}.wav")
+            rate = 24000 if i % 10 == 9 else RATE  # an occasional segment at another rate
+            write_segment(path, args.segment_seconds - 1, rate, 0.2 + 0.6 * ((i * 7) % 10) / 10, i)
+            paths.append(path)
+            if rate == RATE:
+                same_rate.append(path)
+        out = os.path.join(tmp, 'podcast.wav')
+        print(f"{count} segments, {args.minutes:.0f} min of audio\n")
+
+        print(f"{'method':<8} {'median s':>10}")
+        print(f"{'concat':<8} {timed(lambda: tts.concat_wavs(same_rate, out), args.repeat):>10.3f}"
+              f"   (same-rate segments only, no trim/normalize)")
+        seconds = timed(lambda: audio.assemble(paths, out), args.repeat)
+        duration = audio.assemble(paths, out)
+        print(f"{'numpy':<8} {seconds:>10.3f}   ({duration / 60:.1f} min written)")
+        if not args.skip_python:
+            print(f"{'python':<8} {timed(lambda: python_assemble(same_rate, out), 1):>10.3f}"
+                  f"   (same-rate segments only, 1 run)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: page rasterization handed to tesseract.
+
+Compares the old path (RGB pixmap -> PNG bytes -> Image.open) against the raw
+grayscale samples path used by server._render_page_image. Reports per-page
+conversion time and the size of the pixel buffer held per page. Pass --ocr to
+also time OCR on both images with the configured OCR_BACKEND
+(requires tesseract).
+
+Usage:
+    python benchmarks/bench_ocr_raster.py [--pages 20] [--dpi 200] [--ocr]
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+import ocr
+from server import _render_page_image
+
+
+def build_sample_pdf(pages):
+    """Create an in-memory PDF with a page of dense text per page."""
+    doc = fitz.open()
+    line = "The quick brown fox jumps over the lazy dog. 0123456789 "
+    for i in range(pages):
+        page = doc.new_page()
+        body = f"Page {i + 1}\n" + "\n".join(line * 2 for _ in range(45))
+        page.insert_textbox(fitz.Rect(36, 36, 559, 806), body, fontsize=9)
+    return doc
+
+
+def png_roundtrip(page, dpi):
+    pix = page.get_pixmap(dpi=dpi, alpha=False)
+    image = Image.open(io.BytesIO(pix.tobytes("png")))
+    image.load()
+    return image
+
+
+def raw_samples(page, dpi):
+    return _render_page_image(page, dpi=dpi)
+
+
+def run(label, fn, doc, dpi, with_ocr):
+    convert_times = []
+    ocr_times = []
+    buffer_bytes = 0
+    for page in doc:
+        start = time.perf_counter()
+        image = fn(page, dpi)
+        convert_times.append(time.perf_counter() - start)
+        buffer_bytes = max(buffer_bytes, len(image.tobytes()))
+        if with_ocr:
+            start = time.perf_counter()
+            ocr.image_to_string(image)
+            ocr_times.append(time.perf_counter() - start)
+    per_page_ms = 1000 * sum(convert_times) / len(convert_times)
+    print(f"{label:<14} convert {per_page_ms:8.2f} ms/page   buffer {buffer_bytes / 1e6:6.2f} MB/page", end="")
+    if ocr_times:
+        print(f"   ocr {1000 * sum(ocr_times) / len(ocr_times):8.2f} ms/page", end="")
+    print()
+    return per_page_ms, buffer_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=200)
+    parser.add_argument("--ocr", action="store_true", help="also run OCR on each image")
+    args = parser.parse_args()
+
+    doc = build_sample_pdf(args.pages)
+    print(f"[BENCH] {args.pages} page(s) at {args.dpi} dpi")
+    old_ms, old_bytes = run("png-roundtrip", png_roundtrip, doc, args.dpi, args.ocr)
+    new_ms, new_bytes = run("raw-gray", raw_samples, doc, args.dpi, args.ocr)
+    doc.close()
+    print(f"[BENCH] saved {old_ms - new_ms:.2f} ms/page ({old_ms / max(new_ms, 1e-9):.1f}x), "
+          f"buffer {old_bytes / max(new_bytes, 1):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: summary PDF writing.
+
+Compares the old single-page `insert_textbox` layout with the paginating
+pdf_writer for summaries of increasing length. Reports wall time per PDF
+(median of --repeat runs, after one warm-up that loads the font), the page
+count, and whether the old layout dropped text that did not fit its box.
+
+Usage:
+    python benchmarks/bench_pdf_writer.py [--words 500,2000,10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VOCAB = ("the model summarizes each section and the podcast narrates key findings about "
+         "measurement results evaluation methods limitations future work data").split()
+
+
+def make_summary(words, seed=0):
+    rng = random.Random(seed)
+    paragraphs, out = [], []
+    for i in range(words):
+        out.append(rng.choice(VOCAB))
+        if i % 120 == 119:
+            paragraphs.append(" ".join(out).capitalize() + ".")
+            out = []
+    if out:
+        paragraphs.append(" ".join(out).capitalize() + ".")
+    return "\n\n".join(paragraphs)
+
+
+def legacy_write(text, path):
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    page = doc.new_page()
+    overflow = page.insert_textbox(fitz.Rect(36, 36, 559, 806), text, fontsize=11, lineheight=1.2)
+    doc.save(path)
+    doc.close()
+    return 1, overflow < 0
+
+
+def paginated_write(text, path):
+    import pdf_writer
+    return pdf_writer.write_summary_pdf(text, path), False
+
+
+def bench(fn, text, path, repeat):
+    fn(text, path)  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages, truncated = fn(text, path)
+        samples.append(1000 * (time.perf_counter() - start))
+    return statistics.median(samples), pages, truncated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", default="500,2000,10000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "summary.pdf")
+        for words in (int(w) for w in args.words.split(',')):
+            text = make_summary(words)
+            for name, fn in (("insert_textbox", legacy_write), ("pdf_writer", paginated_write)):
+                ms, pages, truncated = bench(fn, text, path, args.repeat)
+                print(f"[BENCH] {words:6d} words  {name:15s} {ms:8.2f} ms  {pages:3d} page(s)"
+                      f"{'  TRUNCATED' if truncated else ''}")
+
+
+if __name__ == "__main__":
+    main()
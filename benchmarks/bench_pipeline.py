@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the PDF-to-podcast pipeline.
+
+Generates synthetic PDFs with PyMuPDF (text-only, scanned-image and mixed
+documents of configurable page counts) and runs the pipeline stages on them
+without network or audio hardware:
+
+    extract      extract_text_chunks_from_pdf
+    summarize    generate_summaries_for_chunks (no-model fallback, or --llm stub)
+    synthesis    generate_final_summary_from_chunks
+    tts          generate_tts_audio with a stub pyttsx3 engine
+
+Scanned pages need OCR; pass --stub-ocr when tesseract is not installed.
+Every scenario runs in its own interpreter so peak RSS is per scenario.
+Reports pages/s, p50/p95 latency per stage and peak RSS, and can compare
+against a saved baseline to fail on regressions.
+
+Usage:
+    python benchmarks/bench_pipeline.py                       # default matrix
+    python benchmarks/bench_pipeline.py --kinds text,mixed --pages 10,100,1000
+    python benchmarks/bench_pipeline.py --output bench.json
+    python benchmarks/bench_pipeline.py --baseline bench.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+KINDS = ('text', 'scanned', 'mixed')
+STAGES = ('extract', 'summarize', 'synthesis', 'tts', 'total')
+
+_SENTENCES = (
+    "The committee reviewed quarterly revenue and found growth in every region.",
+    "Customer retention improved after the support team adopted the new workflow.",
+    "Operating costs rose because of higher energy prices and new hiring.",
+    "The report recommends investing in automation to reduce manual processing.",
+    "Risks include supply chain delays, regulatory changes and currency movements.",
+    "Pilot results suggest the new pricing model increases average order value.",
+)
+
+
+def _page_text(index):
+    lines = [f"Chapter {index // 10 + 1}, page {index + 1}"]
+    for j in range(18):
+        lines.append(f"{_SENTENCES[(index + j) % len(_SENTENCES)]} Item {index}-{j}.")
+    return "\n".join(lines)
+
+
+def build_pdf(kind, pages, path):
+    """Write a synthetic PDF. 'scanned' pages are images with no text layer."""
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    for i in range(pages):
+        scanned = kind == 'scanned' or (kind == 'mixed' and i % 3 == 0)
+        if not scanned:
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(36, 36, 559, 806), _page_text(i), fontsize=10)
+            continue
+        src = fitz.open()
+        src_page = src.new_page()
+        src_page.insert_textbox(fitz.Rect(36, 36, 559, 806), _page_text(i), fontsize=10)
+        pix = src_page.get_pixmap(dpi=100, colorspace=fitz.csGRAY)
+        page = doc.new_page()
+        page.insert_image(page.rect, pixmap=pix)
+        src.close()
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+class _StubOcr:
+    """Stands in for tesseract: returns fixed text after a small delay per page."""
+
+    name = 'stub'
+
+    def __init__(self):
+        self._pages = 0
+
+    def image_to_string(self, image):
+        time.sleep(0.002)
+        self._pages += 1
+        return _page_text(10000 + self._pages)
+
+    def images_to_strings(self, images):
+        return [self.image_to_string(image) for image in images]
+
+
+class _StubTtsEngine:
+    """Minimal pyttsx3 engine: writes ~1 s of silence per 15 words."""
+
+    def __init__(self):
+        self._jobs = []
+
+    def getProperty(self, name):
+        return [] if name == 'voices' else None
+
+    def setProperty(self, name, value):
+        pass
+
+    def save_to_file(self, text, path):
+        self._jobs.append((text, path))
+
+    def runAndWait(self):
+        from audio import write_wav_header
+        for text, path in self._jobs:
+            pcm = b'\x00\x00' * int(22050 * max(1, len(text.split()) / 15))
+            with open(path, 'wb') as f:
+                write_wav_header(f, len(pcm), 22050)
+                f.write(pcm)
+        self._jobs = []
+
+
+def _install_stubs(stub_ocr, llm):
+    sys.modules['pyttsx3'] = types.SimpleNamespace(init=_StubTtsEngine)
+    import llm_client
+    import ocr
+    if stub_ocr:
+        ocr._backend, ocr._backend_pid = _StubOcr(), os.getpid()
+    if llm == 'stub':
+        llm_client._client = llm_client.LLMClient(llm_client.StubBackend())
+    else:
+        llm_client._client = None
+    llm_client._client_pid = os.getpid()
+
+
+def run_scenario(kind, pages, repeat, stub_ocr, llm, workdir):
+    """Run one scenario in this process; returns a result dict."""
+    _install_stubs(stub_ocr, llm)
+    import server
+
+    pdf_path = os.path.join(workdir, f"{kind}_{pages}.pdf")
+    build_start = time.perf_counter()
+    # Build in a child process so document generation doesn't count towards
+    # this scenario's peak RSS.
+    builder = multiprocessing.get_context('fork').Process(target=build_pdf, args=(kind, pages, pdf_path))
+    builder.start()
+    builder.join()
+    if builder.exitcode != 0:
+        raise RuntimeError(f"building {kind}:{pages} failed")
+    build_seconds = time.perf_counter() - build_start
+
+    samples = {stage: [] for stage in STAGES}
+    chunk_count = 0
+    for _ in range(repeat):
+        run_start = time.perf_counter()
+        t = time.perf_counter()
+        chunks = server.extract_text_chunks_from_pdf(pdf_path, pages_per_chunk=10)
+        samples['extract'].append(time.perf_counter() - t)
+        chunk_count = len(chunks)
+
+        t = time.perf_counter()
+        summaries = server.generate_summaries_for_chunks(chunks)
+        samples['summarize'].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        final = server.generate_final_summary_from_chunks(summaries, 900, 1100, source_chunks=chunks)
+        samples['synthesis'].append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        server.generate_tts_audio(final, os.path.join(workdir, 'podcast.wav'))
+        samples['tts'].append(time.perf_counter() - t)
+        samples['total'].append(time.perf_counter() - run_start)
+
+    return {
+        'kind': kind,
+        'pages': pages,
+        'chunks': chunk_count,
+        'repeat': repeat,
+        'build_seconds': round(build_seconds, 3),
+        'pages_per_second': round(pages / statistics.median(samples['total']), 2),
+        'latency': {stage: {'p50': round(_percentile(v, 50), 4), 'p95': round(_percentile(v, 95), 4)}
+                    for stage, v in samples.items()},
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * pct / 100.0
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _print_table(results):
+    print(f"{'scenario':<16}{'chunks':>7}{'pages/s':>10}", end="")
+    for stage in STAGES:
+        print(f"{stage + ' p50/p95 ms':>26}", end="")
+    print(f"{'peak RSS MB':>13}")
+    for r in results:
+        print(f"{r['kind'] + ':' + str(r['pages']):<16}{r['chunks']:>7}{r['pages_per_second']:>10.1f}", end="")
+        for stage in STAGES:
+            lat = r['latency'][stage]
+            print(f"{1000 * lat['p50']:>15.1f} / {1000 * lat['p95']:<8.1f}", end="")
+        print(f"{r['peak_rss_mb']:>13.1f}")
+
+
+def _compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['kind'], r['pages']): r for r in json.load(f)['results']}
+    regressions = []
+    for r in results:
+        base = baseline.get((r['kind'], r['pages']))
+        if not base:
+            continue
+        if r['pages_per_second'] < base['pages_per_second'] * (1 - tolerance):
+            regressions.append(f"{r['kind']}:{r['pages']} throughput {r['pages_per_second']} < baseline {base['pages_per_second']}")
+        if r['peak_rss_mb'] > base['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{r['kind']}:{r['pages']} peak RSS {r['peak_rss_mb']} MB > baseline {base['peak_rss_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", default=",".join(KINDS))
+    parser.add_argument("--pages", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--llm", choices=('fallback', 'stub'), default='fallback',
+                        help="fallback: no model (extractive fallback path); stub: offline stub model")
+    parser.add_argument("--stub-ocr", action="store_true", help="replace tesseract with a stub OCR engine")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON from a previous --output run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed regression fraction (default 0.2)")
+    parser.add_argument("--scenario", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scenario:
+        kind, pages = args.scenario.split(":")
+        with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as workdir:
+            os.chdir(workdir)
+            result = run_scenario(kind, int(pages), args.repeat, args.stub_ocr, args.llm, workdir)
+        print("RESULT " + json.dumps(result))
+        return
+
+    results = []
+    for kind in [k for k in args.kinds.split(",") if k]:
+        for pages in [int(p) for p in args.pages.split(",") if p]:
+            cmd = [sys.executable, os.path.abspath(__file__), "--scenario", f"{kind}:{pages}",
+                   "--repeat", str(args.repeat), "--llm", args.llm]
+            if args.stub_ocr:
+                cmd.append("--stub-ocr")
+            print(f"[BENCH] {kind}:{pages} ...", flush=True)
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith("RESULT ")]
+            if proc.returncode != 0 or not lines:
+                print(f"[ERROR] scenario {kind}:{pages} failed:\n{proc.stderr[-2000:]}")
+                sys.exit(1)
+            results.append(json.loads(lines[-1][len("RESULT "):]))
+
+    _print_table(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'results': results, 'llm': args.llm, 'stub_ocr': args.stub_ocr}, f, indent=2)
+        print(f"[BENCH] wrote {args.output}")
+    if args.baseline:
+        regressions = _compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"[FAIL] {line}")
+        if regressions:
+            sys.exit(1)
+        print("[OK] no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark: prompt compression of extracted chunk text.
+
+Runs text_compress.compress_text over the chunks of a PDF (or a synthetic
+noisy document when no PDF is given) and reports estimated tokens before and
+after, the percentage saved and the time spent compressing.
+
+Usage:
+    python benchmarks/bench_prompt_compression.py [path/to/file.pdf]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import text_compress
+
+
+def synthetic_chunks(count=10, seed=7):
+    """Chunks that look like OCR'd report pages: prose, tables, page furniture."""
+    rng = random.Random(seed)
+    words = ("revenue growth market analysis customer retention strategy quarterly "
+             "performance operational efficiency investment risk forecast").split()
+    chunks = []
+    for c in range(count):
+        lines = []
+        for p in range(10):
+            for _ in range(25):
+                sentence = " ".join(rng.choice(words) for _ in range(rng.randint(8, 16)))
+                if rng.random() < 0.2:
+                    cut = rng.randint(3, 8)
+                    lines.append(sentence[:cut] + "-")
+                    lines.append(sentence[cut:] + ".")
+                else:
+                    lines.append("  " + sentence.capitalize() + ".   ")
+            lines.append("-" * 40)
+            for _ in range(rng.randint(4, 12)):
+                lines.append("   ".join(str(rng.randint(100, 99999)) for _ in range(6)))
+            lines.append(". , ' ~")
+            lines.append(f"Page {c * 10 + p + 1} of {count * 10}")
+        chunks.append("\n".join(lines))
+    return chunks
+
+
+def main():
+    if len(sys.argv) > 1:
+        from server import extract_text_chunks_from_pdf
+        chunks = extract_text_chunks_from_pdf(sys.argv[1])
+        source = sys.argv[1]
+    else:
+        chunks = synthetic_chunks()
+        source = "synthetic"
+
+    before = after = 0
+    start = time.perf_counter()
+    for chunk in chunks:
+        before += text_compress.estimate_tokens(chunk)
+        after += text_compress.estimate_tokens(text_compress.compress_text(chunk))
+    elapsed = time.perf_counter() - start
+
+    print(f"[BENCH] {source}: {len(chunks)} chunk(s)")
+    print(f"[BENCH] tokens ~{before} -> ~{after} ({100.0 * (before - after) / max(before, 1):.1f}% saved)")
+    print(f"[BENCH] compression time {1000 * elapsed / max(len(chunks), 1):.2f} ms/chunk")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Load test: request concurrency of the gunicorn worker profiles.
+
+Starts gunicorn with gunicorn.conf.py once per WORKER_PROFILE and, while a
+few slow pipeline jobs are in flight (stub model backend with simulated
+latency), hammers /api/status/<job_id> from many concurrent clients. With
+sync workers every poll waits for a worker that is busy with a job; with
+threaded workers polls are answered while the jobs run.
+
+Reports poll throughput and p50/p95/max latency per profile.
+
+Usage:
+    python benchmarks/bench_serving.py [--profiles sync,gthread] [--workers 1]
+        [--jobs 2] [--clients 16] [--duration 5] [--llm-latency-ms 1500]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _make_pdf(pages=3):
+    import fitz  # PyMuPDF
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(72, 72, 540, 770),
+                            f"Page {i + 1}. " + "A sentence about load testing the server. " * 40)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def _post_pdf(base, pdf_bytes, name):
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"pdfFile\"; filename=\"{name}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + pdf_bytes + f"\r\n--{boundary}--\r\n".encode()
+    req = urllib.request.Request(base + '/api/process-pdf', data=body, method='POST',
+                                 headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    try:
+        with urllib.request.urlopen(req, timeout=300) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _wait_ready(base, proc, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup")
+        try:
+            urllib.request.urlopen(base + '/api/me', timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn did not become ready")
+
+
+def run_profile(profile, args, pdf_bytes):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix='pdf2podcast_serving_')
+    env = dict(os.environ, WORKER_PROFILE=profile, WEB_CONCURRENCY=str(args.workers), PORT=str(port),
+               LLM_BACKEND='stub', LLM_STUB_LATENCY_MS=str(args.llm_latency_ms),
+               CHECKPOINTS_ENABLED='0', PYTHONPATH=ROOT)
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app',
+                             '--config', os.path.join(ROOT, 'gunicorn.conf.py'),
+                             '--bind', f'127.0.0.1:{port}', '--access-logfile', '/dev/null'],
+                            cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(base, proc)
+        job_status = []
+        jobs = [threading.Thread(target=lambda i=i: job_status.append(_post_pdf(base, pdf_bytes, f"job{i}.pdf")))
+                for i in range(args.jobs)]
+        for t in jobs:
+            t.start()
+        time.sleep(0.5)  # let the jobs occupy their workers
+
+        latencies, errors = [], [0]
+        lock = threading.Lock()
+        stop_at = time.time() + args.duration
+
+        def poll():
+            while time.time() < stop_at:
+                start = time.perf_counter()
+                try:
+                    urllib.request.urlopen(f"{base}/api/status/{uuid.uuid4()}", timeout=60).read()
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+                except OSError:
+                    with lock:
+                        errors[0] += 1
+
+        clients = [threading.Thread(target=poll) for _ in range(args.clients)]
+        started = time.perf_counter()
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        elapsed = time.perf_counter() - started
+        for t in jobs:
+            t.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    latencies.sort()
+    pick = lambda q: 1000 * latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else float('nan')
+    return {
+        'profile': profile,
+        'polls': len(latencies),
+        'polls_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(pick(0.50), 1),
+        'p95_ms': round(pick(0.95), 1),
+        'max_ms': round(1000 * latencies[-1], 1) if latencies else None,
+        'errors': errors[0],
+        'jobs_ok': sum(1 for s in job_status if s == 200),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", default="sync,gthread")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers (WEB_CONCURRENCY)")
+    parser.add_argument("--jobs", type=int, default=2, help="slow pipeline jobs kept in flight")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent status-poll clients")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of polling")
+    parser.add_argument("--llm-latency-ms", type=int, default=1500, help="stub model latency per call")
+    parser.add_argument("--output", help="write results as JSON")
+    args = parser.parse_args()
+
+    pdf_bytes = _make_pdf()
+    results = []
+    for profile in args.profiles.split(','):
+        result = run_profile(profile.strip(), args, pdf_bytes)
+        results.append(result)
+        print(f"[BENCH] {result['profile']:8s} {result['polls']:6d} polls  {result['polls_per_s']:8.1f}/s  "
+              f"p50 {result['p50_ms']:8.1f} ms  p95 {result['p95_ms']:8.1f} ms  max {result['max_ms']} ms  "
+              f"errors {result['errors']}  jobs ok {result['jobs_ok']}/{args.jobs}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker startup time for `app:app`.
+
+Imports `app` in fresh interpreters (what a non-preloaded gunicorn worker
+does on boot) and reports the median wall time against a budget. Also times
+server.preload_dependencies(), the one-off cost paid by the gunicorn master
+when preload_app is on. Exits non-zero when the median exceeds the budget.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 400]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+PRELOAD = ("import time; import server; t = time.perf_counter(); "
+           "server.preload_dependencies(); print(time.perf_counter() - t)")
+
+
+def timed(snippet, runs):
+    samples = []
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='0')
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", snippet], cwd=ROOT, env=env,
+                             capture_output=True, text=True, check=True)
+        samples.append(1000 * float(out.stdout.strip().splitlines()[-1]))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get('STARTUP_BUDGET_MS', 400)))
+    args = parser.parse_args()
+
+    # Warm the bytecode cache so we measure imports, not compilation.
+    timed(IMPORT_APP, 1)
+    boot = timed(IMPORT_APP, args.runs)
+    preload = timed(PRELOAD, args.runs)
+
+    median = statistics.median(boot)
+    print(f"[BENCH] import app:app      median {median:7.1f} ms  (min {min(boot):.1f}, max {max(boot):.1f})")
+    print(f"[BENCH] preload_dependencies median {statistics.median(preload):7.1f} ms  (paid once in the master)")
+    if median > args.budget_ms:
+        print(f"[FAIL] worker startup {median:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        sys.exit(1)
+    print(f"[OK] worker startup within budget {args.budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
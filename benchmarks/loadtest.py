@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Load test: the whole app under concurrent PDF uploads.
+
+Starts benchmarks/model_stub_server.py in-process as a stand-in for the
+Gemini API (latency and error rate as configured), then gunicorn with
+gunicorn.conf.py pointed at it through GEMINI_API_ENDPOINT, so the real
+client code path (google-generativeai over REST) is exercised. --clients
+concurrent clients upload a weighted mix of generated PDFs, either
+--requests in total or for --duration seconds, while a probe polls
+/api/status to see whether the workers still answer light requests.
+
+Reports:
+  throughput      completed jobs/s and pages/s
+  latency         p50/p95/p99/max per document size and overall
+  errors          share of uploads by outcome (200, 429, 500, connection errors)
+  saturation      uploads in flight vs. worker threads, scheduler queue wait,
+                  model calls in flight, status probe latency
+
+Checkpoints and revision reuse are disabled so every upload does the full
+work. Use it to size WEB_CONCURRENCY / WORKER_PROFILE / SCHEDULER_SLOTS:
+raise them until throughput stops growing or the probe latency climbs.
+
+Usage:
+    python benchmarks/loadtest.py [--workers 2] [--profile gthread] [--threads 8]
+        [--clients 8] [--users 8] [--requests 40 | --duration 60]
+        [--mix small:2:6,medium:10:3,large:40:1]
+        [--llm-latency-ms 800] [--llm-error-rate 0.02] [--output results.json]
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_serving import _free_port, _make_pdf, _wait_ready
+from model_stub_server import ModelStubServer
+
+
+def parse_mix(spec):
+    """'small:2:6,large:40:1' -> [(name, pages, weight), ...]"""
+    mix = []
+    for item in spec.split(','):
+        name, pages, weight = item.strip().split(':')
+        mix.append((name, int(pages), float(weight)))
+    return mix
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def login(base, username):
+    """An opener carrying the session cookie of `username`."""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    req = urllib.request.Request(base + '/api/login', data=json.dumps({'username': username}).encode(),
+                                 method='POST', headers={'Content-Type': 'application/json'})
+    opener.open(req, timeout=30).read()
+    return opener
+
+
+def upload(opener, base, pdf_bytes, name, timeout):
+    """(status or error name, seconds, response body or None)"""
+    boundary = uuid.uuid4().hex
+    body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"pdfFile\"; filename=\"{name}\"\r\n"
+            f"Content-Type: application/pdf\r\n\r\n").encode() + pdf_bytes + f"\r\n--{boundary}--\r\n".encode()
+    req = urllib.request.Request(base + '/api/process-pdf', data=body, method='POST',
+                                 headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    start = time.perf_counter()
+    try:
+        with opener.open(req, timeout=timeout) as resp:
+            payload = json.loads(resp.read() or b'{}')
+            return resp.status, time.perf_counter() - start, payload
+    except urllib.error.HTTPError as e:
+        e.read()
+        return e.code, time.perf_counter() - start, None
+    except OSError as e:
+        return type(e).__name__, time.perf_counter() - start, None
+
+
+class InFlight:
+    """Time-weighted count of uploads in flight."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.current = self.peak = 0
+        self._area = 0.0
+        self._start = self._last = time.monotonic()
+
+    def _advance(self):
+        now = time.monotonic()
+        self._area += self.current * (now - self._last)
+        self._last = now
+
+    def add(self, n):
+        with self._lock:
+            self._advance()
+            self.current += n
+            self.peak = max(self.peak, self.current)
+
+    def average(self):
+        with self._lock:
+            self._advance()
+            return self._area / max(1e-9, self._last - self._start)
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    documents = {name: (pages, _make_pdf(pages)) for name, pages, _ in mix}
+    weights = [w for _, _, w in mix]
+    names = [name for name, _, _ in mix]
+
+    model = ModelStubServer(('127.0.0.1', _free_port()), args.llm_latency_ms, args.llm_token_ms,
+                            args.llm_jitter, args.llm_error_rate, args.llm_error_status, seed=args.seed).start()
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix='pdf2podcast_load_')
+    env = dict(os.environ, WORKER_PROFILE=args.profile, WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_THREADS=str(args.threads), PORT=str(port), PYTHONPATH=ROOT,
+               GEMINI_API_KEY='loadtest', GEMINI_API_ENDPOINT=model.url, GEMINI_TRANSPORT='rest',
+               CHECKPOINTS_ENABLED='0', REVISIONS_ENABLED='0')
+    env.pop('LLM_BACKEND', None)
+    log = open(os.path.join(workdir, 'gunicorn.log'), 'wb')
+    proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', 'app:app',
+                             '--config', os.path.join(ROOT, 'gunicorn.conf.py'),
+                             '--bind', f'127.0.0.1:{port}', '--access-logfile', '/dev/null'],
+                            cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+    results, probes = [], []
+    lock = threading.Lock()
+    in_flight = InFlight()
+    try:
+        _wait_ready(base, proc, timeout=60)
+        model.stats.reset()
+        rng = random.Random(args.seed)
+        issued = [0]
+        stop_at = time.monotonic() + args.duration if args.duration else None
+        done = threading.Event()
+
+        def next_document():
+            with lock:
+                if args.requests and issued[0] >= args.requests:
+                    return None
+                if stop_at and time.monotonic() >= stop_at:
+                    return None
+                issued[0] += 1
+                return rng.choices(names, weights)[0]
+
+        def client(index):
+            # Uploads are scheduled per user (SCHEDULER_PER_USER_SLOTS), so spread clients over users
+            opener = login(base, f"load{index % args.users}")
+            while True:
+                kind = next_document()
+                if kind is None:
+                    return
+                pages, pdf_bytes = documents[kind]
+                in_flight.add(1)
+                status, seconds, body = upload(opener, base, pdf_bytes, f"{kind}-{uuid.uuid4().hex[:8]}.pdf", args.timeout)
+                in_flight.add(-1)
+                queue_wait = ((body or {}).get('timings') or {}).get('queue_wait')
+                with lock:
+                    results.append({'kind': kind, 'pages': pages, 'status': status,
+                                    'seconds': seconds, 'queue_wait': queue_wait})
+
+        def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                try:
+                    urllib.request.urlopen(f"{base}/api/status/{uuid.uuid4()}", timeout=30).read()
+                    probes.append(time.perf_counter() - start)
+                except OSError:
+                    probes.append(None)
+                done.wait(args.probe_interval)
+
+        prober = threading.Thread(target=probe, daemon=True)
+        prober.start()
+        clients = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        started = time.perf_counter()
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        prober.join()
+        model_stats = model.stats.snapshot()
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+        model.shutdown()
+
+    return summarize(args, results, probes, elapsed, in_flight, model_stats, workdir)
+
+
+def summarize(args, results, probes, elapsed, in_flight, model_stats, workdir):
+    ok = [r for r in results if r['status'] == 200]
+    outcomes = {}
+    for r in results:
+        outcomes[str(r['status'])] = outcomes.get(str(r['status']), 0) + 1
+
+    def latency(rows):
+        secs = [r['seconds'] for r in rows]
+        return {q: round(percentile(secs, p), 3) if secs else None
+                for q, p in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))}
+
+    probe_ok = [p for p in probes if p is not None]
+    waits = [r['queue_wait'] for r in ok if r['queue_wait'] is not None]
+    capacity = args.workers * (args.threads if args.profile == 'gthread' else 1)
+    return {
+        'config': {'workers': args.workers, 'profile': args.profile, 'threads': args.threads,
+                   'clients': args.clients, 'users': args.users, 'mix': args.mix, 'llm_latency_ms': args.llm_latency_ms,
+                   'llm_error_rate': args.llm_error_rate},
+        'requests': len(results),
+        'elapsed_s': round(elapsed, 2),
+        'throughput': {'jobs_per_s': round(len(ok) / elapsed, 3),
+                       'pages_per_s': round(sum(r['pages'] for r in ok) / elapsed, 2)},
+        'latency_s': dict({'all': latency(ok)},
+                          **{kind: latency([r for r in ok if r['kind'] == kind]) for kind in sorted({r['kind'] for r in ok})}),
+        'outcomes': {k: {'count': v, 'rate': round(v / len(results), 4)} for k, v in sorted(outcomes.items())},
+        'saturation': {
+            'uploads_in_flight_avg': round(in_flight.average(), 2),
+            'uploads_in_flight_peak': in_flight.peak,
+            'worker_threads': capacity,
+            'thread_utilization': round(min(1.0, in_flight.average() / capacity), 3),
+            'queue_wait_p50_s': round(percentile(waits, 0.5), 3) if waits else None,
+            'queue_wait_p95_s': round(percentile(waits, 0.95), 3) if waits else None,
+            'model_calls': model_stats['calls'],
+            'model_errors': model_stats['errors'],
+            'model_streams_cancelled': model_stats['cancelled'],
+            'model_in_flight_avg': round(model_stats['avg_in_flight'], 2),
+            'model_in_flight_peak': model_stats['peak_in_flight'],
+            'probe_p50_ms': round(1000 * percentile(probe_ok, 0.5), 1) if probe_ok else None,
+            'probe_p95_ms': round(1000 * percentile(probe_ok, 0.95), 1) if probe_ok else None,
+            'probe_failures': len(probes) - len(probe_ok),
+        },
+        'gunicorn_log': os.path.join(workdir, 'gunicorn.log'),
+    }
+
+
+def print_report(report):
+    c, t, s = report['config'], report['throughput'], report['saturation']
+    print(f"[LOAD] {c['workers']} x {c['profile']} worker(s), {c['clients']} clients as {c['users']} user(s), "
+          f"mix {c['mix']}, "
+          f"model {c['llm_latency_ms']:.0f} ms / {c['llm_error_rate']:.0%} errors")
+    print(f"[LOAD] {report['requests']} uploads in {report['elapsed_s']} s: "
+          f"{t['jobs_per_s']} jobs/s, {t['pages_per_s']} pages/s")
+    for kind, lat in report['latency_s'].items():
+        print(f"[LOAD]   {kind:<8} p50 {lat['p50']} s  p95 {lat['p95']} s  p99 {lat['p99']} s  max {lat['max']} s")
+    print("[LOAD] outcomes: " + ", ".join(f"{k} {v['count']} ({v['rate']:.1%})" for k, v in report['outcomes'].items()))
+    print(f"[LOAD] uploads in flight avg {s['uploads_in_flight_avg']} / peak {s['uploads_in_flight_peak']} "
+          f"of {s['worker_threads']} worker threads ({s['thread_utilization']:.0%}); "
+          f"queue wait p50 {s['queue_wait_p50_s']} s p95 {s['queue_wait_p95_s']} s")
+    print(f"[LOAD] model calls {s['model_calls']} ({s['model_errors']} failed, {s['model_streams_cancelled']} "
+          f"closed early), in flight avg {s['model_in_flight_avg']} / peak {s['model_in_flight_peak']}; "
+          f"status probe p50 {s['probe_p50_ms']} ms p95 {s['probe_p95_ms']} ms, {s['probe_failures']} failed")
+    print(f"[LOAD] gunicorn log: {report['gunicorn_log']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers (WEB_CONCURRENCY)")
+    parser.add_argument("--profile", default="gthread", help="WORKER_PROFILE: gthread, sync or gevent")
+    parser.add_argument("--threads", type=int, default=8, help="GUNICORN_THREADS for gthread")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent uploading clients")
+    parser.add_argument("--users", type=int, default=0, help="distinct logged-in users (default: one per client)")
+    parser.add_argument("--requests", type=int, default=40, help="total uploads (0: run for --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="seconds to keep uploading")
+    parser.add_argument("--mix", default="small:2:6,medium:10:3,large:40:1",
+                        help="name:pages:weight of the generated PDFs")
+    parser.add_argument("--llm-latency-ms", type=float, default=800)
+    parser.add_argument("--llm-token-ms", type=float, default=2.0)
+    parser.add_argument("--llm-jitter", type=float, default=0.3)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-error-status", type=int, default=503)
+    parser.add_argument("--timeout", type=float, default=600, help="per-upload client timeout")
+    parser.add_argument("--probe-interval", type=float, default=0.25)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+    if not args.requests and not args.duration:
+        parser.error("set --requests or --duration")
+    args.users = args.users or args.clients
+
+    report = run(args)
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
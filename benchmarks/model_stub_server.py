@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Local HTTP stand-in for the Gemini API, for load tests.
+
+Answers the REST calls google-generativeai makes for `generate_content`
+(`:generateContent`, and `:streamGenerateContent` with the response streamed
+in pieces) with an extractive reply from llm_client.StubBackend, after a
+simulated latency:
+
+- each call takes a log-normal latency around --latency-ms (--jitter sets
+  the spread), plus --token-ms for every output token;
+- --error-rate of the calls fail with HTTP --error-status in Google's error
+  format;
+- a stream whose client disconnects is stopped at once and counted as
+  cancelled, so the in-flight gauge shows what the model would still be
+  generating.
+
+Point the app at it with GEMINI_API_KEY=<anything>
+GEMINI_API_ENDPOINT=http://127.0.0.1:<port> (see llm_client.py). The server
+counts calls, errors and in-flight requests; benchmarks/loadtest.py reads
+them to report how hard the workers drive the model.
+
+Usage:
+    python benchmarks/model_stub_server.py [--port 8090] [--latency-ms 800]
+        [--token-ms 2] [--jitter 0.3] [--error-rate 0.0] [--error-status 503]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import select
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from llm_client import StubBackend
+
+_STATUS_NAMES = {400: 'INVALID_ARGUMENT', 429: 'RESOURCE_EXHAUSTED', 500: 'INTERNAL', 503: 'UNAVAILABLE'}
+_PATH = re.compile(r"^/v1\w*/models/([^/:]+):(generateContent|streamGenerateContent)")
+
+
+class ModelStats:
+    """Call counts and a time-weighted in-flight gauge."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._area = 0.0  # integral of in_flight over time
+        self._since = self._last = time.monotonic()
+
+    def _advance(self):
+        now = time.monotonic()
+        self._area += self.in_flight * (now - self._last)
+        self._last = now
+
+    def begin(self):
+        with self._lock:
+            self._advance()
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def end(self, failed=False, cancelled=False):
+        with self._lock:
+            self._advance()
+            self.in_flight -= 1
+            self.errors += int(failed)
+            self.cancelled += int(cancelled)
+
+    def reset(self):
+        with self._lock:
+            self.calls = self.errors = self.cancelled = 0
+            self.peak_in_flight = self.in_flight
+            self._area = 0.0
+            self._since = self._last = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._advance()
+            elapsed = max(1e-9, self._last - self._since)
+            return {'calls': self.calls, 'errors': self.errors, 'cancelled': self.cancelled,
+                    'in_flight': self.in_flight,
+                    'peak_in_flight': self.peak_in_flight, 'avg_in_flight': self._area / elapsed}
+
+
+class ModelStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=800, token_ms=2.0, jitter=0.3, error_rate=0.0,
+                 error_status=503, seed=None):
+        super().__init__(address, _Handler)
+        self.latency = latency_ms / 1000.0
+        self.token_time = token_ms / 1000.0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stats = ModelStats()
+        self.backend = StubBackend(latency_ms=0)
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def draw(self):
+        """(latency in seconds before output tokens, fail?) for one call."""
+        with self._random_lock:
+            # Log-normal with the requested mean: exp(mu + sigma^2 / 2) == latency
+            sigma = self.jitter
+            latency = self._random.lognormvariate(math.log(max(self.latency, 1e-6)) - sigma * sigma / 2, sigma) \
+                if self.latency and sigma else self.latency
+            return latency, self._random.random() < self.error_rate
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name='model-stub', daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        match = _PATH.match(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not match:
+            self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+            return
+        server = self.server
+        server.stats.begin()
+        failed = cancelled = False
+        try:
+            request = json.loads(body or b'{}')
+            prompt = "".join(part.get('text', '') for content in request.get('contents', [])
+                             for part in content.get('parts', []))
+            config = request.get('generationConfig') or {}
+            max_tokens = config.get('maxOutputTokens') or config.get('max_output_tokens')
+            latency, failed = server.draw()
+            if failed:
+                time.sleep(latency * 0.2)  # errors come back quickly
+                status = server.error_status
+                self._send_json(status, {'error': {'code': status, 'message': 'Simulated model error',
+                                                   'status': _STATUS_NAMES.get(status, 'UNKNOWN')}})
+                return
+            words = server.backend._reply(prompt, {'max_output_tokens': max_tokens} if max_tokens else None).split()
+            total = latency + server.token_time * len(words) / 0.75  # ~0.75 words per token
+            if match.group(2) == 'generateContent':
+                time.sleep(total)
+                self._send_json(200, _response(" ".join(words), len(prompt)))
+            else:
+                self._stream(words, latency, total, len(prompt))
+        except (BrokenPipeError, ConnectionResetError, _ClientGone):
+            cancelled = True  # the client closed the stream early (word budget reached)
+            self.close_connection = True
+        finally:
+            server.stats.end(failed, cancelled)
+
+    def _stream(self, words, first_delay, total, prompt_chars, piece_words=12):
+        pieces = [" ".join(words[i:i + piece_words]) + " " for i in range(0, len(words), piece_words)] or [""]
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        self._wait(first_delay)
+        step = (total - first_delay) / len(pieces)
+        for i, piece in enumerate(pieces):
+            if i:
+                self._wait(step)
+            prefix = '[' if i == 0 else ',\r\n'
+            self._chunk((prefix + json.dumps(_response(piece, prompt_chars))).encode('utf-8'))
+        self._chunk(b']')
+        self._chunk(b'')
+
+    def _wait(self, seconds):
+        """Sleep, raising _ClientGone as soon as the client closes the connection."""
+        deadline = time.monotonic() + seconds
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            readable, _, _ = select.select([self.connection], [], [], remaining)
+            if readable:
+                try:
+                    data = self.connection.recv(1, socket.MSG_PEEK)
+                except OSError:
+                    data = b''
+                if not data:
+                    raise _ClientGone()
+                time.sleep(min(remaining, 0.01))  # unexpected bytes; keep waiting
+
+    def _chunk(self, data):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+class _ClientGone(Exception):
+    pass
+
+
+def _response(text, prompt_chars):
+    return {
+        'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'},
+                        'finishReason': 'STOP', 'index': 0}],
+        'usageMetadata': {'promptTokenCount': prompt_chars // 4,
+                          'candidatesTokenCount': int(len(text.split()) / 0.75)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency-ms', type=float, default=800, help="mean latency before output tokens")
+    parser.add_argument('--token-ms', type=float, default=2.0, help="extra latency per output token")
+    parser.add_argument('--jitter', type=float, default=0.3, help="log-normal sigma of the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of calls that fail")
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+    server = ModelStubServer((args.host, args.port), args.latency_ms, args.token_ms, args.jitter,
+                             args.error_rate, args.error_status)
+    print(f"[INFO] Model stub listening on {server.url} "
+          f"(GEMINI_API_KEY=stub GEMINI_API_ENDPOINT={server.url})")
+    server.start()
+    try:
+        while True:
+            time.sleep(10)
+            if server.stats.calls:
+                print(f"[INFO] {json.dumps(server.stats.snapshot())}")
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+Per-stage checkpoints for /api/process-pdf jobs.
+
+Each job gets a directory under the user's folder, keyed by a fingerprint
+of the uploaded PDF and the requested length. As the pipeline runs, every
+stage writes its output there:
+
+    job.json           job id and the last completed stage
+    chunks.jsonl       extracted chunk texts (one JSON string per line)
+    summaries.jsonl    chunk summaries, appended as each one finishes
+    synthesis.txt      final summary
+    result.json        response body of the finished job
+    running            pid of the process running the job (see claim)
+
+If a worker dies or gunicorn's timeout kills the request, retrying the same
+upload finds the directory and resumes after the last completed stage
+(including any chunk summaries that finished before the crash). Only one
+request runs a job directory at a time: a second identical upload arriving
+while the first runs is turned away rather than writing the same files.
+
+Only model output is checkpointed: fallback summaries and silent audio are
+recomputed on the next attempt. A finished result whose artifacts have
+since been removed is not returned; the job rewinds to its last intact
+stage and rebuilds them.
+
+Disable with CHECKPOINTS_ENABLED=0.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import storage
+
+CHECKPOINTS_ENABLED = os.environ.get('CHECKPOINTS_ENABLED', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+STAGES = ('extract', 'summarize', 'synthesis', 'audio', 'done')
+RUN_LOCK_NAME = 'running'
+
+
+def job_key(pdf_path: str, *params) -> str:
+    """Fingerprint of the PDF contents plus the parameters that shape the output."""
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    for param in params:
+        digest.update(b'\0' + str(param).encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+
+def _open_temp(path: str):
+    """A uniquely named temporary file next to `path`, open for writing: (file, its path)."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    return os.fdopen(fd, 'w', encoding='utf-8'), tmp_path
+
+
+def _write_atomic(path: str, data: str) -> None:
+    f, tmp_path = _open_temp(path)
+    try:
+        with f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class JobCheckpoint:
+    """Reads and writes the checkpoint files of one job directory."""
+
+    def __init__(self, job_dir: str):
+        self.job_dir = job_dir
+        os.makedirs(job_dir, exist_ok=True)
+        self._state = self._read_json('job.json') or {}
+
+    def _path(self, name):
+        return os.path.join(self.job_dir, name)
+
+    def _read_json(self, name):
+        try:
+            with open(self._path(name), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def job_id(self):
+        return self._state.get('jobId')
+
+    @property
+    def stage(self):
+        """Last completed stage, or None for a fresh job."""
+        return self._state.get('stage')
+
+    def claim(self) -> bool:
+        """Take the job's run lock; False while another live request holds it.
+
+        Call before start(). A lock left by a process that died is taken over.
+        """
+        path = self._path(RUN_LOCK_NAME)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(path, encoding='ascii') as f:
+                        pid = int(f.read() or 0)
+                except (OSError, ValueError):
+                    pid = 0
+                if pid and storage.pid_alive(pid):
+                    return False
+                self.release()  # stale: its process died
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def release(self) -> None:
+        try:
+            os.remove(self._path(RUN_LOCK_NAME))
+        except FileNotFoundError:
+            pass
+
+    def completed(self, stage: str) -> bool:
+        return self.stage is not None and STAGES.index(self.stage) >= STAGES.index(stage)
+
+    def start(self, job_id: str) -> None:
+        if not self.job_id:
+            self._state = {'jobId': job_id, 'stage': None}
+            _write_atomic(self._path('job.json'), json.dumps(self._state))
+
+    def mark(self, stage: str, **extra) -> None:
+        self._state.update(extra)
+        self._state['stage'] = stage
+        _write_atomic(self._path('job.json'), json.dumps(self._state))
+
+    def get(self, key, default=None):
+        return self._state.get(key, default)
+
+    # extract
+    def save_chunks(self, chunks) -> None:
+        f, tmp_path = _open_temp(self._path('chunks.jsonl'))
+        try:
+            with f:
+                for chunk in chunks:
+                    f.write(json.dumps(chunk) + "\n")
+            os.replace(tmp_path, self._path('chunks.jsonl'))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.mark('extract')
+
+    def load_chunks(self, into=None):
+        """Stored chunk texts, appended one at a time to `into` (e.g. a
+        SpilledTextList) when given, else returned as a list."""
+        chunks = [] if into is None else into
+        with open(self._path('chunks.jsonl'), encoding='utf-8') as f:
+            for line in f:
+                chunks.append(json.loads(line))
+        return chunks
+
+    # summarize (incremental)
+    def add_summary(self, index: int, summary: str) -> None:
+        with open(self._path('summaries.jsonl'), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'i': index, 'summary': summary}) + "\n")
+
+    def load_summaries(self) -> dict:
+        done = {}
+        try:
+            with open(self._path('summaries.jsonl'), encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # last line cut short by a crash
+                    done[entry['i']] = entry['summary']
+        except OSError:
+            pass
+        return done
+
+    # synthesis
+    def save_synthesis(self, text: str) -> None:
+        _write_atomic(self._path('synthesis.txt'), text)
+        self.mark('synthesis')
+
+    def load_synthesis(self) -> str:
+        with open(self._path('synthesis.txt'), encoding='utf-8') as f:
+            return f.read()
+
+    # done
+    def save_result(self, body: dict) -> None:
+        _write_atomic(self._path('result.json'), json.dumps(body))
+        self.mark('done')
+
+    def load_result(self):
+        return self._read_json('result.json')
+
+    def rewind(self, audio_present: bool = None) -> None:
+        """Step back from 'done' to the last stage whose files are still present.
+
+        `audio_present` overrides the local check of the audio file (artifact
+        storage may have moved it).
+        """
+        stage = None
+        if os.path.exists(self._path('synthesis.txt')):
+            if audio_present is None:
+                audio_present = os.path.exists(self.get('audioPath') or '')
+            stage = 'audio' if audio_present else 'synthesis'
+        elif os.path.exists(self._path('chunks.jsonl')):
+            stage = 'extract'
+        self.mark(stage)
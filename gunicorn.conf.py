@@ -8,15 +8,64 @@ backlog = 2048
 
 # Worker processes
 workers = int(os.environ.get('WEB_CONCURRENCY', 2))
-worker_class = 'sync'
-worker_connections = 1000
-timeout = 30
-keepalive = 2
 
-# Restart workers after this many requests, to prevent memory leaks
-max_requests = 1000
+# WORKER_PROFILE picks how each worker handles connections:
+#   gthread  a pool of GUNICORN_THREADS threads per worker (default), so status
+#            polls, event streams and downloads are served while pipeline jobs
+#            run in other threads of the same worker
+#   sync     one request per worker at a time (the old behaviour)
+#   gevent   greenlets, up to worker_connections per worker; needs
+#            `pip install gevent` and suits mostly-idle long-lived connections
+#            (OCR/PDF work is CPU-bound and blocks the whole worker)
+# PyMuPDF is not thread-safe, so within a worker every use of it is
+# serialized behind pdf_lock.lock (held per page window, not across OCR or
+# model calls). PDF parsing and rendering therefore use at most one core per
+# worker; raise WEB_CONCURRENCY rather than GUNICORN_THREADS to scale them.
+worker_profile = os.environ.get('WORKER_PROFILE', 'gthread').strip().lower()
+if worker_profile == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        print("[WARN] WORKER_PROFILE=gevent but gevent is not installed; using gthread")
+        worker_profile = 'gthread'
+if worker_profile not in ('sync', 'gthread', 'gevent'):
+    print(f"[WARN] Unknown WORKER_PROFILE={worker_profile!r}; using sync")
+    worker_profile = 'sync'
+
+worker_class = worker_profile
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 1000))
+# The scheduler caps its queue so waiting uploads cannot take every request
+# thread (0: gevent, where a waiting job only holds a greenlet).
+os.environ['GUNICORN_WORKER_THREADS'] = str(threads if worker_class != 'gevent' else 0)
+# Sync workers are killed when one request outlives `timeout`. Threaded and
+# gevent workers heartbeat independently of requests, so there it only
+# catches a worker that is hung as a whole.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30 if worker_class == 'sync' else 120))
+keepalive = 2 if worker_class == 'sync' else 5
+
+# Restart workers after this many requests, to prevent memory leaks. A
+# recycling worker stops accepting until its running jobs finish, so threaded
+# workers (which also serve cheap status polls) get a proportionally larger
+# allowance.
+max_requests = 1000 * threads
 max_requests_jitter = 50
 
+# Load the app once in the master and fork workers from it, so worker boots
+# (including every max_requests recycle) skip the import cost. Set
+# PRELOAD_APP=0 to import the app in each worker instead. Not used with
+# gevent, which must monkey-patch the stdlib before the app imports it.
+preload_app = (os.environ.get('PRELOAD_APP', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+               and worker_class != 'gevent')
+
+
+def when_ready(server):
+    # Runs in the master before any worker is forked. Gemini clients and OCR
+    # engines are not created here; each worker builds its own after fork.
+    if preload_app:
+        from server import preload_dependencies
+        preload_dependencies()
+
 # Logging
 accesslog = '-'
 errorlog = '-'
@@ -0,0 +1,67 @@
+"""
+Response compression for PDF to Podcast Generator.
+
+compress_response() is installed as an after_request hook: JSON and plain
+text responses of at least COMPRESS_MIN_BYTES are sent brotli-compressed
+(when the `brotli` package is installed and the client accepts br) or
+gzipped. Streams (status events), file downloads and already encoded
+bodies pass through untouched. Static assets are precompressed at build
+time instead (see static_assets.py).
+
+Disable with COMPRESS_RESPONSES=0.
+"""
+
+import gzip
+import os
+
+COMPRESS_RESPONSES = os.environ.get('COMPRESS_RESPONSES', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024') or 0)
+
+# Fast settings: these bodies are compressed on every request.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_COMPRESSIBLE = ('application/json', 'text/plain')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings an Accept-Encoding header allows (q > 0)."""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def compress_response(response, accept_encoding: str):
+    """Compress a buffered Flask response in place if worthwhile; returns it."""
+    if (not COMPRESS_RESPONSES or response.direct_passthrough or response.is_streamed
+            or response.mimetype not in _COMPRESSIBLE or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)):
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.vary.add('Accept-Encoding')
+    accepted = accepted_encodings(accept_encoding)
+    if brotli is not None and 'br' in accepted:
+        response.set_data(brotli.compress(data, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accepted:
+        response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,397 @@
+"""
+LLM client layer for PDF to Podcast Generator.
+
+Wraps `genai.GenerativeModel` so the rest of the app deals with plain prompt
+strings and text results. One client (and therefore one underlying API
+connection) is kept per worker process and reused for every request.
+
+Environment:
+    LLM_BACKEND      gemini (default when GEMINI_API_KEY is set) or stub
+    GEMINI_API_KEY   API key for the gemini backend
+    GEMINI_MODEL     model name, default gemini-1.5-flash
+    GEMINI_API_ENDPOINT  alternative API host, e.g. http://127.0.0.1:8090 for
+                     benchmarks/model_stub_server.py (plain http uses REST)
+    GEMINI_TRANSPORT grpc (SDK default) or rest; with rest, streamed calls
+                     read the HTTP response as it arrives and closing the
+                     stream closes the connection
+    LLM_TIMEOUT      per-call timeout in seconds, default 60; passed to the
+                     transport as its deadline, so a call that hangs is aborted
+    LLM_CONCURRENCY  max in-flight calls for generate_many, default 4
+    LLM_STUB_LATENCY_MS  simulated latency of the stub backend, default 0
+"""
+
+import codecs
+import json
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return float(default)
+
+
+LLM_TIMEOUT = _env_float('LLM_TIMEOUT', 60)
+LLM_CONCURRENCY = max(1, int(_env_float('LLM_CONCURRENCY', 4)))
+DEFAULT_GEMINI_MODEL = 'gemini-1.5-flash'
+
+
+class LLMError(Exception):
+    """Raised when the model call fails, times out or returns no text."""
+
+
+class GeminiBackend:
+    """Calls Gemini through google-generativeai with a reused model object."""
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name=None, endpoint=None, transport=None):
+        import google.generativeai as genai
+        endpoint = endpoint or os.environ.get('GEMINI_API_ENDPOINT') or None
+        transport = transport or os.environ.get('GEMINI_TRANSPORT') or None
+        options = {}
+        if endpoint:
+            options['client_options'] = {'api_endpoint': endpoint}
+            if endpoint.startswith('http://') and not transport:
+                transport = 'rest'  # gRPC needs TLS; plain http only works over REST
+        if transport:
+            options['transport'] = transport
+        genai.configure(api_key=api_key, **options)
+        self.endpoint = endpoint
+        self.transport = transport
+        self._api_key = api_key
+        self.model_name = model_name or os.environ.get('GEMINI_MODEL') or DEFAULT_GEMINI_MODEL
+        self._model = genai.GenerativeModel(self.model_name)
+
+    def _call_kwargs(self, generation_config, timeout):
+        kwargs = {}
+        if generation_config:
+            kwargs['generation_config'] = generation_config
+        if timeout:
+            # The transport deadline: gRPC and REST both abort the call once it passes.
+            kwargs['request_options'] = {'timeout': timeout}
+        return kwargs
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        response = self._model.generate_content(prompt, **self._call_kwargs(generation_config, timeout))
+        return _response_text(response)
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        if self.transport == 'rest':
+            # The SDK's REST transport reads the whole streamed body before
+            # yielding anything, so closing early would neither save time nor
+            # stop the call. Stream the HTTP response directly instead.
+            yield from self._stream_rest(prompt, generation_config, timeout)
+            return
+        response = self._model.generate_content(prompt, stream=True, **self._call_kwargs(generation_config, timeout))
+        try:
+            for chunk in response:
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue  # chunk without text parts (e.g. only a finish reason)
+                if text:
+                    yield text
+        finally:
+            # Closed early: cancel the gRPC stream rather than let it run on.
+            cancel = getattr(getattr(response, '_iterator', None), 'cancel', None)
+            if cancel:
+                cancel()
+
+    def _stream_rest(self, prompt, generation_config, timeout):
+        import requests
+        base = self.endpoint or 'generativelanguage.googleapis.com'
+        if '://' not in base:
+            base = 'https://' + base
+        model = self.model_name.split('/')[-1]
+        body = {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+        if generation_config:
+            body['generationConfig'] = {_camel_case(k): v for k, v in dict(generation_config).items()}
+        # Leaving the `with` block (the generator was closed) closes the
+        # connection, which cancels the call on the server.
+        with requests.post(f"{base.rstrip('/')}/v1beta/models/{model}:streamGenerateContent",
+                           params={'key': self._api_key}, json=body, stream=True, timeout=timeout) as response:
+            if response.status_code >= 400:
+                try:
+                    message = response.json()['error']['message']
+                except (ValueError, KeyError, TypeError):
+                    message = response.reason
+                raise LLMError(f"HTTP {response.status_code}: {message}")
+            for item in _iter_json_array(response.iter_content(chunk_size=None)):
+                for candidate in item.get('candidates', [])[:1]:
+                    text = "".join(part.get('text', '') for part in candidate.get('content', {}).get('parts', []))
+                    if text:
+                        yield text
+
+
+def _camel_case(name):
+    first, *rest = name.split('_')
+    return first + "".join(word.capitalize() for word in rest)
+
+
+def _iter_json_array(pieces):
+    """Yield the objects of a JSON array as its bytes arrive in pieces."""
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    for piece in pieces:
+        buffer += text.decode(piece)
+        while True:
+            buffer = buffer.lstrip(" \t\r\n[,")
+            if not buffer or buffer.startswith(']'):
+                break
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                break  # incomplete; wait for more
+            yield item
+            buffer = buffer[end:]
+
+
+class StubBackend:
+    """Offline stand-in for Gemini used for tests and benchmarks.
+
+    Returns an extractive "summary" of the prompt (its leading sentences,
+    capped by max_output_tokens when given) after LLM_STUB_LATENCY_MS.
+    """
+
+    name = 'stub'
+    model_name = 'stub'
+
+    def __init__(self, latency_ms=None, max_words=400):
+        self.latency = (latency_ms if latency_ms is not None else _env_float('LLM_STUB_LATENCY_MS', 0)) / 1000.0
+        self.max_words = max_words
+
+    def _reply(self, prompt, generation_config):
+        limit = self.max_words
+        if generation_config and generation_config.get('max_output_tokens'):
+            # ~0.75 words per token
+            limit = max(1, int(generation_config['max_output_tokens'] * 0.75))
+        body = prompt.split("\n\n", 1)[-1]
+        sentences = re.split(r"(?<=[.!?])\s+", " ".join(body.split()))
+        words = []
+        for sentence in sentences:
+            words.extend(sentence.split())
+            if len(words) >= limit:
+                break
+        return " ".join(words[:limit])
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._reply(prompt, generation_config)
+
+    def stream(self, prompt, generation_config=None, timeout=None, piece_words=8):
+        # The simulated latency is spread over the pieces, as with a real stream.
+        words = self._reply(prompt, generation_config).split()
+        pieces = [" ".join(words[i:i + piece_words]) + " " for i in range(0, len(words), piece_words)]
+        for piece in pieces:
+            if self.latency:
+                time.sleep(self.latency / len(pieces))
+            yield piece
+
+
+def _response_text(response):
+    text = getattr(response, 'text', None) if response is not None else None
+    if not text:
+        raise LLMError("No response text received from model")
+    return text
+
+
+class LLMClient:
+    """Per-process client: timeouts, streaming and bounded parallel fan-out."""
+
+    def __init__(self, backend, timeout=LLM_TIMEOUT, concurrency=LLM_CONCURRENCY):
+        self.backend = backend
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def name(self):
+        return f"{self.backend.name}:{self.backend.model_name}"
+
+    def _pool(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='llm')
+        return self._executor
+
+    def _call(self, stage, prompt, generation_config, timeout):
+        # Runs on a pool thread; times the model call itself, not queueing.
+        budget = _shared_budget
+        if budget is not None:
+            budget.acquire()
+        try:
+            if not stage:
+                return self.backend.generate(prompt, generation_config, timeout)
+            with metrics.stage_timer(stage):
+                return self.backend.generate(prompt, generation_config, timeout)
+        finally:
+            if budget is not None:
+                budget.release()
+
+    def generate(self, prompt, generation_config=None, timeout=None, stage=None):
+        """Blocking call returning the response text; raises LLMError on failure.
+
+        `stage` names the metrics stage the call is timed under.
+        """
+        timeout = timeout or self.timeout
+        future = self._pool().submit(self._call, stage, prompt, generation_config, timeout)
+        try:
+            return future.result(timeout=timeout).strip()
+        except LLMError:
+            raise
+        except TimeoutError:
+            future.cancel()
+            raise LLMError(f"Model call timed out after {timeout:.0f}s")
+        except Exception as e:
+            raise LLMError(f"{type(e).__name__}: {e}") from e
+
+    def generate_stream(self, prompt, generation_config=None, timeout=None, stage=None):
+        """Yield the response text piece by piece as it arrives.
+
+        Closing the generator early stops the model call, so the rest of the
+        response is neither waited for nor generated. The backend stream is
+        read on a helper thread so a stalled call cannot hold the caller past
+        `timeout`; raises LLMError on failure or once `timeout` has passed.
+        """
+        timeout = timeout or self.timeout
+        deadline = time.monotonic() + timeout
+        start = time.perf_counter()
+        pieces = queue.Queue()
+        stop = threading.Event()
+        reader = threading.Thread(target=self._read_stream, name='llm-stream', daemon=True,
+                                  args=(prompt, generation_config, timeout, pieces, stop))
+        received = False
+        try:
+            reader.start()
+            while True:
+                try:
+                    kind, value = pieces.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    raise LLMError(f"Model stream timed out after {timeout:.0f}s")
+                if kind == 'error':
+                    raise value
+                if kind == 'end':
+                    break
+                received = True
+                yield value
+            if not received:
+                raise LLMError("No response text received from model")
+        except (LLMError, GeneratorExit):
+            raise
+        except Exception as e:
+            raise LLMError(f"{type(e).__name__}: {e}") from e
+        finally:
+            # The reader closes the backend stream at its next piece; a call
+            # that never answers is ended by the transport deadline.
+            stop.set()
+            if stage:
+                metrics.observe_stage(stage, time.perf_counter() - start)
+
+    def _read_stream(self, prompt, generation_config, timeout, pieces, stop):
+        # Holds the shared budget for as long as the call really runs.
+        budget = _shared_budget
+        if budget is not None:
+            budget.acquire()
+        stream = None
+        try:
+            stream = self.backend.stream(prompt, generation_config, timeout)
+            for piece in stream:
+                if stop.is_set():
+                    break
+                pieces.put(('piece', piece))
+            pieces.put(('end', None))
+        except Exception as e:
+            pieces.put(('error', e))
+        finally:
+            if stream is not None:
+                stream.close()
+            if budget is not None:
+                budget.release()
+
+    def generate_many(self, prompts, generation_config=None, timeout=None, stage=None):
+        """Run several prompts with up to `concurrency` requests in flight.
+
+        Returns a list aligned with `prompts`; failed calls yield the LLMError
+        instance instead of text so callers can fall back per item.
+        """
+        timeout = timeout or self.timeout
+        futures = [self._pool().submit(self._call, stage, p, generation_config, timeout) for p in prompts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result(timeout=timeout).strip())
+            except LLMError as e:
+                results.append(e)
+            except TimeoutError:
+                future.cancel()
+                results.append(LLMError(f"Model call timed out after {timeout:.0f}s"))
+            except Exception as e:
+                results.append(LLMError(f"{type(e).__name__}: {e}"))
+        return results
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+_shared_budget = None
+
+
+def set_concurrency_budget(semaphore) -> None:
+    """Share one limit on in-flight model calls across processes.
+
+    Batch runs pass the same multiprocessing semaphore to every worker so the
+    total Gemini concurrency stays fixed however many documents run at once.
+    """
+    global _shared_budget
+    _shared_budget = semaphore
+
+
+def _create_client():
+    backend_name = (os.environ.get('LLM_BACKEND') or '').strip().lower()
+    if backend_name == 'stub':
+        client = LLMClient(StubBackend())
+        print(f"[INFO] LLM backend: offline stub ({client.backend.latency * 1000:.0f} ms latency)")
+        return client
+    api_key = os.environ.get('GEMINI_API_KEY')
+    if not api_key:
+        print("[WARN] GEMINI_API_KEY not found in environment variables.")
+        print("[INFO] Proceeding with basic (non-AI) summary fallback. To enable AI, set GEMINI_API_KEY in a .env file.")
+        return None
+    try:
+        client = LLMClient(GeminiBackend(api_key))
+        where = f" at {client.backend.endpoint}" if client.backend.endpoint else ""
+        print(f"[SUCCESS] Gemini client initialized with {client.backend.model_name}{where}")
+        return client
+    except Exception as e:
+        print(f"[ERROR] Error initializing Gemini Client: {e}")
+        print(f"[ERROR] Please check your GEMINI_API_KEY in the .env file")
+        return None
+
+
+def get_client():
+    """Return this process's LLMClient, or None when no model is configured.
+
+    Created on first use and rebuilt after fork, since gRPC channels and
+    thread pools do not survive fork().
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client_pid != pid:
+        with _client_lock:
+            if _client_pid != pid:
+                _client = _create_client()
+                _client_pid = pid
+    return _client
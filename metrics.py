@@ -0,0 +1,129 @@
+"""
+Pipeline metrics for PDF to Podcast Generator.
+
+A small in-process registry of counters and histograms rendered in the
+Prometheus text exposition format at /metrics. Values are per worker
+process; with several gunicorn workers each scrape sees the worker that
+served it.
+
+Stage timings are recorded with `stage_timer`, which also accumulates the
+elapsed seconds into a per-job dict that is returned with the job result.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a single OCR'd page up to a full long-document synthesis.
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> float
+_histograms = {}  # (name, labels) -> [bucket_counts, sum, count]
+_help = {}
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def describe(name: str, kind: str, text: str) -> None:
+    _help[name] = (kind, text)
+
+
+def inc(name: str, labels: dict = None, amount: float = 1) -> None:
+    """Increment a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name: str, value: float, labels: dict = None) -> None:
+    """Record one observation in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        entry = _histograms.get(key)
+        if entry is None:
+            entry = _histograms[key] = [[0] * len(DEFAULT_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(DEFAULT_BUCKETS):
+            if value <= bound:
+                entry[0][i] += 1
+        entry[1] += value
+        entry[2] += 1
+
+
+def observe_stage(stage: str, seconds: float, timings: dict = None) -> None:
+    """Record a stage duration, adding it to the job's timings dict if given."""
+    observe('pdf2podcast_stage_seconds', seconds, {'stage': stage})
+    if timings is not None:
+        timings[stage] = round(timings.get(stage, 0.0) + seconds, 4)
+
+
+@contextmanager
+def stage_timer(stage: str, timings: dict = None):
+    """Time the enclosed block as pipeline stage `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start, timings)
+
+
+def record_fallback(kind: str) -> None:
+    inc('pdf2podcast_fallbacks_total', {'kind': kind})
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    inc('pdf2podcast_cache_hits_total' if hit else 'pdf2podcast_cache_misses_total', {'cache': cache})
+
+
+def _escape(value, quote=True):
+    """Escape a label value (or HELP text, quote=False) for the text format."""
+    value = str(value).replace('\\', '\\\\').replace('\n', '\\n')
+    return value.replace('"', '\\"') if quote else value
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + list(extra or [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus() -> str:
+    """Render all metrics in the Prometheus text format."""
+    lines = []
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: (list(v[0]), v[1], v[2]) for k, v in _histograms.items()}
+
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            seen.add(name)
+            _, text = _help.get(name, ('counter', name))
+            lines.append(f"# HELP {name} {_escape(text, quote=False)}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        if name not in seen:
+            seen.add(name)
+            _, text = _help.get(name, ('histogram', name))
+            lines.append(f"# HELP {name} {_escape(text, quote=False)}")
+            lines.append(f"# TYPE {name} histogram")
+        for bound, bucket_count in zip(DEFAULT_BUCKETS, buckets):
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', f'{bound:g}')])} {bucket_count}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:g}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+describe('pdf2podcast_stage_seconds', 'histogram', 'Time spent in each pipeline stage.')
+describe('pdf2podcast_fallbacks_total', 'counter', 'Times a stage fell back to a degraded path.')
+describe('pdf2podcast_cache_hits_total', 'counter', 'Cache hits by cache name.')
+describe('pdf2podcast_cache_misses_total', 'counter', 'Cache misses by cache name.')
+describe('pdf2podcast_llm_early_stops_total', 'counter', 'Model streams closed early once the word budget was reached.')
+describe('pdf2podcast_rejected_jobs_total', 'counter', 'Uploads refused by admission control (HTTP 429).')
+describe('pdf2podcast_jobs_total', 'counter', 'Finished /api/process-pdf jobs by outcome.')
@@ -0,0 +1,158 @@
+"""
+OCR backends for PDF to Podcast Generator.
+
+`pytesseract` forks a new tesseract process (and reloads the language model)
+for every image. When the `tesserocr` bindings are installed we instead keep
+one long-lived engine per worker process and feed it images directly.
+
+Select the backend with OCR_BACKEND:
+    auto        (default) tesserocr if importable, otherwise pytesseract
+    tesserocr   persistent in-process engine
+    pytesseract one tesseract subprocess per image (honours TESSERACT_CMD)
+OCR_LANG sets the tesseract language(s), default "eng".
+OCR_BATCH_PAGES > 1 hands scanned pages to the engine N at a time; with
+pytesseract that is one tesseract invocation per batch instead of per page.
+"""
+
+import os
+import tempfile
+import threading
+
+OCR_BACKEND = (os.environ.get('OCR_BACKEND') or 'auto').strip().lower()
+OCR_LANG = os.environ.get('OCR_LANG') or 'eng'
+try:
+    OCR_BATCH_PAGES = max(1, int(os.environ.get('OCR_BATCH_PAGES', '1')))
+except ValueError:
+    OCR_BATCH_PAGES = 1
+
+
+class PytesseractBackend:
+    """Runs the tesseract CLI through pytesseract, one subprocess per image."""
+
+    name = 'pytesseract'
+
+    def __init__(self, lang=OCR_LANG):
+        import pytesseract
+        self._pytesseract = pytesseract
+        self.lang = lang
+        tesseract_cmd = os.environ.get('TESSERACT_CMD')
+        if tesseract_cmd:
+            try:
+                pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+                print(f"[INFO] Using custom Tesseract at: {tesseract_cmd}")
+            except Exception as _tess_err:
+                print(f"[WARN] Failed to set custom Tesseract path: {_tess_err}")
+
+    def image_to_string(self, image) -> str:
+        return self._pytesseract.image_to_string(image, lang=self.lang) or ""
+
+    def images_to_strings(self, images) -> list:
+        """OCR several images with a single tesseract run.
+
+        Images are written uncompressed to a temp dir and passed as a list
+        file; tesseract ends every page with a form feed, which we split on.
+        Falls back to one run per image if the page count doesn't line up.
+        """
+        if len(images) <= 1:
+            return [self.image_to_string(image) for image in images]
+        with tempfile.TemporaryDirectory(prefix='ocr_batch_') as tmp_dir:
+            paths = []
+            for i, image in enumerate(images):
+                path = os.path.join(tmp_dir, f"page_{i:04d}.{'pgm' if image.mode == 'L' else 'ppm'}")
+                image.save(path)
+                paths.append(path)
+            list_path = os.path.join(tmp_dir, 'pages.txt')
+            with open(list_path, 'w', encoding='utf-8') as f:
+                f.write("\n".join(paths) + "\n")
+            output = self._pytesseract.image_to_string(list_path, lang=self.lang) or ""
+        texts = output.split("\f")
+        if len(texts) == len(images) + 1 and not texts[-1].strip():
+            texts = texts[:-1]
+        if len(texts) != len(images):
+            print(f"[WARN] Batched OCR returned {len(texts)} page(s) for {len(images)} image(s); retrying per page")
+            return [self.image_to_string(image) for image in images]
+        return texts
+
+
+class TesserocrBackend:
+    """Keeps a tesserocr engine alive and reuses it for every image.
+
+    PyTessBaseAPI is not thread-safe, so each thread gets its own engine;
+    with sync gunicorn workers that means one engine per worker.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, lang=OCR_LANG):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self._local = threading.local()
+
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            api = self._tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+        return api
+
+    def image_to_string(self, image) -> str:
+        api = self._api()
+        api.SetImage(image)
+        return api.GetUTF8Text() or ""
+
+    def images_to_strings(self, images) -> list:
+        # The engine is already warm, so a batch is just a loop.
+        return [self.image_to_string(image) for image in images]
+
+    def close(self):
+        api = getattr(self._local, 'api', None)
+        if api is not None:
+            api.End()
+            self._local.api = None
+
+
+_backend = None
+_backend_pid = None
+_backend_lock = threading.Lock()
+
+
+def _create_backend():
+    if OCR_BACKEND in ('auto', 'tesserocr'):
+        try:
+            backend = TesserocrBackend()
+            print(f"[INFO] OCR backend: tesserocr (lang={backend.lang})")
+            return backend
+        except Exception as e:
+            if OCR_BACKEND == 'tesserocr':
+                print(f"[WARN] tesserocr unavailable ({e}); falling back to pytesseract")
+    elif OCR_BACKEND != 'pytesseract':
+        print(f"[WARN] Unknown OCR_BACKEND '{OCR_BACKEND}'; using pytesseract")
+    backend = PytesseractBackend()
+    print(f"[INFO] OCR backend: pytesseract (lang={backend.lang})")
+    return backend
+
+
+def get_ocr_backend():
+    """Return this process's OCR backend, creating it on first use.
+
+    Engines are not carried across fork(): a forked worker builds its own.
+    """
+    global _backend, _backend_pid
+    pid = os.getpid()
+    if _backend is None or _backend_pid != pid:
+        with _backend_lock:
+            if _backend is None or _backend_pid != pid:
+                _backend = _create_backend()
+                _backend_pid = pid
+    return _backend
+
+
+def image_to_string(image) -> str:
+    """OCR a single PIL image with the configured backend."""
+    return get_ocr_backend().image_to_string(image)
+
+
+def images_to_strings(images) -> list:
+    """OCR a batch of PIL images, returning one string per image in order."""
+    return get_ocr_backend().images_to_strings(list(images))
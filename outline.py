@@ -0,0 +1,102 @@
+"""
+PDF outline (table of contents) and page selection for partial jobs.
+
+Sections come from PyMuPDF's `get_toc()` and get positional IDs: "2" is the
+second top-level entry, "2.3" the third entry below it. Each section spans
+from its start page up to the page before the next entry at the same or a
+higher level.
+
+/api/process-pdf accepts `pages` ("1-20,35,40-") and/or `sections`
+("2,3.1"); only the selected pages are extracted, OCR'd and summarized.
+Chunks also start afresh at section starts so summaries follow the
+document's structure.
+"""
+
+
+def get_outline(doc) -> list:
+    """Sections of an open fitz document, in reading order.
+
+    Each is {'id', 'title', 'level', 'startPage', 'endPage'} with 1-based,
+    inclusive page numbers.
+    """
+    page_count = len(doc)
+    sections = []
+    counters = []
+    for level, title, page in doc.get_toc(simple=True):
+        if level > len(counters) + 1:
+            level = len(counters) + 1  # malformed outline: skipped a level
+        del counters[level:]
+        if len(counters) < level:
+            counters.append(0)
+        counters[level - 1] += 1
+        start = min(max(page, 1), page_count) if page_count else 1
+        sections.append({
+            'id': ".".join(str(n) for n in counters),
+            'title': (title or "").strip(),
+            'level': level,
+            'startPage': start,
+            'endPage': page_count,
+        })
+    # A section ends where the next one at the same or a higher level begins.
+    for i, section in enumerate(sections):
+        for later in sections[i + 1:]:
+            if later['level'] <= section['level']:
+                section['endPage'] = max(section['startPage'], later['startPage'] - 1)
+                break
+    return sections
+
+
+def parse_page_ranges(spec: str, page_count: int) -> list:
+    """0-based page indices for a spec like "1-5,8,10-" (1-based, inclusive).
+
+    Raises ValueError for malformed or out-of-range specs.
+    """
+    pages = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            if '-' in part:
+                first, _, last = part.partition('-')
+                first = int(first) if first.strip() else 1
+                last = int(last) if last.strip() else page_count
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page range '{part}'") from None
+        if first < 1 or last > page_count or first > last:
+            raise ValueError(f"Page range '{part}' is outside 1-{page_count}")
+        pages.update(range(first - 1, last))
+    if not pages:
+        raise ValueError("No pages selected")
+    return sorted(pages)
+
+
+def select_pages(doc, pages_spec: str = None, section_ids: str = None):
+    """Resolve `pages` / `sections` request values to sorted 0-based indices.
+
+    Returns None when neither is given (the whole document).
+    """
+    if not pages_spec and not section_ids:
+        return None
+    selected = set()
+    if pages_spec:
+        selected.update(parse_page_ranges(pages_spec, len(doc)))
+    if section_ids:
+        by_id = {s['id']: s for s in get_outline(doc)}
+        for section_id in (s.strip() for s in section_ids.split(',')):
+            if not section_id:
+                continue
+            section = by_id.get(section_id)
+            if section is None:
+                raise ValueError(f"Unknown section '{section_id}'")
+            selected.update(range(section['startPage'] - 1, section['endPage']))
+    if not selected:
+        raise ValueError("No pages selected")
+    return sorted(selected)
+
+
+def section_starts(doc) -> set:
+    """0-based indices of pages where an outline section begins."""
+    return {s['startPage'] - 1 for s in get_outline(doc)}
@@ -0,0 +1,19 @@
+"""
+Serialized access to PyMuPDF.
+
+MuPDF is not safe to use from several threads at once, and PyMuPDF does not
+add any locking of its own. A threaded gunicorn worker (WORKER_PROFILE=gthread)
+can run several jobs side by side, next to /api/outline, cost estimates and
+the background summary-PDF writer, so every use of `fitz` in the app holds
+`lock`: opening and closing documents, loading, reading and rendering pages,
+and writing PDFs.
+
+The lock is held for short steps, never across OCR or model calls: a job
+renders a window of scanned pages under the lock, then OCRs the images after
+releasing it. Separate worker processes (WEB_CONCURRENCY, batch workers)
+each have their own MuPDF and their own lock.
+"""
+
+import threading
+
+lock = threading.RLock()
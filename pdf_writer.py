@@ -0,0 +1,206 @@
+"""
+Paginating writer for the summary PDF.
+
+Text is wrapped greedily with measured glyph widths and flowed onto as many
+A4 pages as it needs, so long summaries are no longer cut off at the bottom
+of a single text box. The font is loaded once per process and word widths
+are cached, so later jobs skip both. Paragraphs can be added one at a time
+as they become available.
+
+write_summary_pdf_background() hands the work to a single background thread
+so the request can return before the PDF is written; the file appears at
+its final path only once complete. wait_pending() and when_written() let
+the download route and the job checkpoint wait for it. write_summary_pdf holds pdf_lock.lock
+while it uses PyMuPDF.
+
+Set PDF_FONT_FILE to a TrueType/OpenType font for scripts the built-in
+Helvetica cannot render.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import metrics
+import pdf_lock
+
+PDF_FONT_FILE = os.environ.get('PDF_FONT_FILE')
+
+PAGE_MARGIN = 36
+FONT_SIZE = 11
+LINE_HEIGHT = 1.2
+
+_font = None
+_font_buffer = None
+_font_lock = threading.Lock()
+_executor = None
+_pending = {}  # absolute path -> Future of its queued or running background write
+
+
+def _get_font():
+    """The process-wide fitz.Font used for measuring, loaded on first use."""
+    global _font, _font_buffer
+    if _font is None:
+        import fitz  # PyMuPDF
+        with _font_lock:
+            if _font is None:
+                if PDF_FONT_FILE:
+                    with open(PDF_FONT_FILE, 'rb') as f:
+                        _font_buffer = f.read()
+                    _font = fitz.Font(fontbuffer=_font_buffer)
+                else:
+                    _font = fitz.Font('helv')
+    return _font
+
+
+@lru_cache(maxsize=16384)
+def _text_width(text: str, fontsize: float) -> float:
+    return _get_font().text_length(text, fontsize=fontsize)
+
+
+class SummaryPdfWriter:
+    """Flows paragraphs of text across as many pages as needed."""
+
+    def __init__(self, fontsize: float = FONT_SIZE, lineheight: float = LINE_HEIGHT):
+        import fitz  # PyMuPDF
+        _get_font()
+        self.doc = fitz.open()
+        self.fontsize = fontsize
+        self.lineheight = lineheight
+        self.page_rect = fitz.paper_rect('a4')
+        self.max_width = self.page_rect.width - 2 * PAGE_MARGIN
+        usable = self.page_rect.height - 2 * PAGE_MARGIN - fontsize
+        self.lines_per_page = int(usable // (fontsize * lineheight)) + 1
+        self._lines_buffer = []  # lines of the page being filled
+
+    @property
+    def page_count(self) -> int:
+        return len(self.doc) + (1 if self._lines_buffer else 0)
+
+    def _flush_page(self):
+        page = self.doc.new_page(width=self.page_rect.width, height=self.page_rect.height)
+        if _font_buffer is not None:
+            page.insert_font(fontname='F0', fontbuffer=_font_buffer)
+            fontname = 'F0'
+        else:
+            fontname = 'helv'
+        # One insert_text call per page: a single content stream write.
+        page.insert_text((PAGE_MARGIN, PAGE_MARGIN + self.fontsize), self._lines_buffer,
+                         fontsize=self.fontsize, fontname=fontname, lineheight=self.lineheight)
+        self._lines_buffer = []
+
+    def _add_line(self, line: str):
+        if len(self._lines_buffer) >= self.lines_per_page:
+            self._flush_page()
+        if line or self._lines_buffer:  # no blank line at the top of a page
+            self._lines_buffer.append(line)
+
+    def _lines(self, paragraph: str):
+        space = _text_width(' ', self.fontsize)
+        line, width = [], 0.0
+        for word in paragraph.split():
+            word_width = _text_width(word, self.fontsize)
+            while word_width > self.max_width:
+                # A single word wider than the page: break it by characters.
+                if line:
+                    yield ' '.join(line)
+                    line, width = [], 0.0
+                cut = len(word) - 1
+                while cut > 1 and _text_width(word[:cut], self.fontsize) > self.max_width:
+                    cut -= 1
+                yield word[:cut]
+                word = word[cut:]
+                word_width = _text_width(word, self.fontsize)
+            if line and width + space + word_width > self.max_width:
+                yield ' '.join(line)
+                line, width = [], 0.0
+            width = width + space + word_width if line else word_width
+            line.append(word)
+        if line:
+            yield ' '.join(line)
+
+    def add_paragraph(self, paragraph: str) -> None:
+        if not paragraph.strip():
+            return
+        if self._lines_buffer or len(self.doc):
+            self._add_line('')  # gap between paragraphs
+        for line in self._lines(paragraph):
+            self._add_line(line)
+
+    def add_text(self, text: str) -> None:
+        """Add text with blank-line-separated paragraphs."""
+        for paragraph in text.replace('\r\n', '\n').split('\n\n'):
+            self.add_paragraph(' '.join(paragraph.split('\n')))
+
+    def save(self, path: str) -> None:
+        """Write the PDF; it appears at `path` only once complete."""
+        if self._lines_buffer or not len(self.doc):
+            self._flush_page()
+        tmp_path = path + '.part'
+        self.doc.save(tmp_path, garbage=3, deflate=True)
+        self.doc.close()
+        os.replace(tmp_path, path)
+
+
+def write_summary_pdf(text: str, path: str, timings: dict = None) -> int:
+    """Write `text` to a paginated PDF at `path`; returns the page count."""
+    with metrics.stage_timer('pdf_write', timings), pdf_lock.lock:
+        writer = SummaryPdfWriter()
+        writer.add_text(text)
+        pages = max(1, writer.page_count)
+        writer.save(path)
+    return pages
+
+
+def _write_logged(text, path, then):
+    try:
+        pages = write_summary_pdf(text, path)
+        print(f"[INFO] Wrote {pages}-page summary PDF {os.path.basename(path)}")
+        if then:
+            then(path)
+    except Exception as e:
+        print(f"[ERROR] Summary PDF {os.path.basename(path)} failed: {e}")
+        raise
+
+
+def write_summary_pdf_background(text: str, path: str, then=None):
+    """Queue write_summary_pdf on the background writer thread; returns a Future.
+
+    `then(path)` is called once the file is complete.
+    """
+    global _executor
+    if _executor is None:
+        with _font_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pdf-writer')
+    key = os.path.abspath(path)
+    future = _executor.submit(_write_logged, text, path, then)
+    _pending[key] = future
+    future.add_done_callback(lambda f: _pending.pop(key, None) if _pending.get(key) is f else None)
+    return future
+
+
+def wait_pending(path: str, timeout: float = None) -> bool:
+    """Wait for a queued background write of `path`; False if there is none or it failed."""
+    future = _pending.get(os.path.abspath(path))
+    if future is None:
+        return False
+    try:
+        future.result(timeout)
+    except Exception:
+        return False
+    return True
+
+
+def when_written(path: str, callback, exists=None) -> None:
+    """Call `callback()` once `path` exists: now, or when its background write succeeds.
+
+    `exists()` replaces the local check for files moved elsewhere once written.
+    """
+    future = _pending.get(os.path.abspath(path))
+    if future is None:
+        if (exists or (lambda: os.path.exists(path)))():
+            callback()
+        return
+    future.add_done_callback(lambda f: callback() if not f.cancelled() and f.exception() is None else None)
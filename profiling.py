@@ -0,0 +1,102 @@
+"""
+Opt-in per-request profiling for /api/process-pdf.
+
+When PROFILING_ENABLED=1, a request carrying `X-Profile: 1` or `?profile=1`
+runs its job under cProfile with tracemalloc tracing allocations. The
+results are written next to the job's other artifacts:
+
+    {job_id}_profile.pstats   raw cProfile data (load with pstats / snakeviz)
+    {job_id}_profile.txt      top functions by cumulative time
+    {job_id}_memory.txt       peak traced memory and top allocation sites
+
+cProfile only sees the request thread; model calls fanned out to the LLM
+thread pool show up as time spent waiting on their futures.
+
+Both profilers are process-wide (since Python 3.12 only one cProfile can be
+enabled at a time), so one profiled job runs per worker process: a profile
+requested while another is being taken is skipped and the job runs normally.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import tracemalloc
+
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '0').strip().lower() in ('1', 'true', 'yes', 'on')
+PROFILE_TOP_N = int(os.environ.get('PROFILE_TOP_N', '40'))
+
+_TRUE = ('1', 'true', 'yes', 'on')
+
+_active = threading.Lock()  # held by the job being profiled
+
+
+def is_requested(req) -> bool:
+    """True if profiling is enabled and the request asks for it."""
+    if not PROFILING_ENABLED:
+        return False
+    flag = req.headers.get('X-Profile') or req.args.get('profile') or ''
+    return flag.strip().lower() in _TRUE
+
+
+class JobProfiler:
+    """Profiles one job; start() before the work, save() afterwards."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self._profiler = cProfile.Profile()
+        self._started_tracemalloc = False
+
+    def start(self) -> bool:
+        """Begin profiling; False (and nothing started) if another profile is running."""
+        if not _active.acquire(blocking=False):
+            print(f"[WARN] Job {self.job_id}: another job is being profiled; running without a profile")
+            return False
+        try:
+            self._profiler.enable()
+        except ValueError as e:  # another profiling tool is active in this process
+            _active.release()
+            print(f"[WARN] Job {self.job_id}: cannot profile: {e}")
+            return False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+        return True
+
+    def save(self, folder: str) -> dict:
+        """Stop profiling and write the artifacts; returns their paths by kind."""
+        try:
+            self._profiler.disable()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+        finally:
+            _active.release()
+
+        stats_path = os.path.join(folder, f"{self.job_id}_profile.pstats")
+        report_path = os.path.join(folder, f"{self.job_id}_profile.txt")
+        memory_path = os.path.join(folder, f"{self.job_id}_memory.txt")
+
+        self._profiler.dump_stats(stats_path)
+        report = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=report)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(report.getvalue())
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        with open(memory_path, 'w', encoding='utf-8') as f:
+            f.write(f"Job {self.job_id}\n")
+            f.write(f"Traced memory: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+            f.write(f"Top {PROFILE_TOP_N} allocation sites still held at end of job:\n")
+            for stat in snapshot.statistics('lineno')[:PROFILE_TOP_N]:
+                f.write(f"{stat}\n")
+
+        print(f"[INFO] Saved profile for job {self.job_id} to {folder}")
+        return {'stats': stats_path, 'report': report_path, 'memory': memory_path}
@@ -0,0 +1,284 @@
+"""
+Incremental re-processing of revised documents.
+
+Every processed upload leaves a small record in the user's folder, under
+`revisions/<id>`:
+
+    <id>.pages       one fingerprint per page
+    <id>.json        file name, the pages where chunks started, and the chunk
+                     summaries keyed by a digest of the chunk text
+    <id>.ocr.jsonl   OCR text of scanned pages, one "<fingerprint>\t<text>" line each
+
+While a new upload is extracted, each page's fingerprint is compared with
+the user's recent records. The record sharing the most pages so far serves
+as the previous version:
+
+- scanned pages with an unchanged fingerprint reuse the stored OCR text
+  instead of being rendered and OCR'd again;
+- chunks are cut where the previous version's chunks started, so runs of
+  unchanged pages produce exactly the same chunk text;
+- a chunk whose text was summarized before reuses that summary.
+
+Only changed chunks go to the model; the synthesis always runs again. Only
+model output is stored: fallback pseudo-summaries never reach a record.
+
+A page fingerprint hashes the text extraction already produced for it, so
+fingerprinting costs no extra pass over the PDF. For pages without text it
+hashes the content stream and the raw data of the images and forms the page
+draws (what OCR would see), taken while the page is loaded for rendering.
+New OCR text is spilled to a temporary file until the record is saved, and
+stored OCR text is read back per page, so neither grows memory with the
+number of scanned pages.
+
+Disable with REVISIONS_ENABLED=0; REVISIONS_KEEP sets how many records are
+kept per user.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import time
+
+import metrics
+import text_store
+
+REVISIONS_ENABLED = os.environ.get('REVISIONS_ENABLED', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+REVISIONS_KEEP = int(os.environ.get('REVISIONS_KEEP', '10') or 10)
+
+_SUFFIXES = ('.pages', '.json', '.ocr.jsonl')
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:24]
+
+
+def chunk_digest(text: str) -> str:
+    return _digest(text.encode('utf-8'))
+
+
+def text_fingerprint(text: str) -> str:
+    """Fingerprint of a page with selectable text (stripped get_text output)."""
+    return _digest(b't' + text.encode('utf-8'))
+
+
+def scanned_fingerprint(doc, page) -> str:
+    """Fingerprint of a page without text: its drawing commands and image data."""
+    digest = hashlib.sha256(b's')
+    digest.update(page.read_contents() or b'')
+    digest.update(str(tuple(page.rect)).encode('ascii'))
+    xrefs = {img[0] for img in page.get_images(full=True)} | {x[0] for x in page.get_xobjects()}
+    for xref in sorted(xrefs):
+        digest.update(doc.xref_stream_raw(xref) or b'')
+    return digest.hexdigest()[:24]
+
+
+class _Record:
+    """A stored version, loaded when one of its pages first matters."""
+
+    def __init__(self, base: str):
+        self.base = base
+        with open(base + '.json', encoding='utf-8') as f:
+            data = json.load(f)
+        self.filename = data.get('filename')
+        self.chunk_starts = set(data.get('chunkStarts', []))
+        self.summaries = data.get('summaries', {})
+        self._ocr_offsets = None
+
+    def ocr_text(self, fingerprint: str):
+        if self._ocr_offsets is None:
+            self._ocr_offsets = {}
+            try:
+                with open(self.base + '.ocr.jsonl', 'rb') as f:
+                    offset = 0
+                    for line in f:
+                        self._ocr_offsets[line.split(b'\t', 1)[0].decode('ascii')] = offset
+                        offset += len(line)
+            except OSError:
+                pass
+        offset = self._ocr_offsets.get(fingerprint)
+        if offset is None:
+            return None
+        try:
+            with open(self.base + '.ocr.jsonl', 'rb') as f:
+                f.seek(offset)
+                return json.loads(f.readline().split(b'\t', 1)[1])
+        except (OSError, ValueError, IndexError):
+            return None
+
+
+class Tracker:
+    """Links one job's extraction and summaries to the previous version.
+
+    extract_text_chunks_from_pdf asks it for known OCR text of scanned pages
+    and whether a page starts a chunk, and reports every page and chunk
+    back; the job then takes the reusable summaries and finally saves the
+    record for the next version.
+    """
+
+    def __init__(self, folder: str, filename: str, candidates: dict):
+        self.folder = folder
+        self.filename = filename
+        self.fingerprints = {}            # page index -> fingerprint
+        self.scanned = set()              # indices of pages without text
+        self._candidates = candidates     # record base path -> its page fingerprints
+        self._votes = {}                  # record base path -> pages shared so far
+        self._records = {}
+        self._ocr_out = text_store.SpilledTextList(prefix='pdf2podcast_ocr_')
+        self._ocr_fingerprints = []
+        self._chunk_starts = []
+        self._chunk_digests = []
+        self.summaries = {}               # chunk digest -> summary
+        self.reused_chunks = 0
+
+    def _load(self, base):
+        if base not in self._records:
+            try:
+                self._records[base] = _Record(base)
+            except (OSError, ValueError):
+                self._records[base] = None  # removed by pruning or storage GC meanwhile
+        return self._records[base]
+
+    def _record_for(self, fingerprint):
+        """The best-matching record so far that contains this page, or None."""
+        holders = [base for base, pages in self._candidates.items() if fingerprint in pages]
+        if not holders:
+            return None
+        return self._load(max(holders, key=lambda base: self._votes.get(base, 0)))
+
+    @property
+    def previous(self):
+        """The record sharing the most pages with this document, or None."""
+        if not self._votes:
+            return None
+        return self._load(max(self._votes, key=self._votes.get))
+
+    @property
+    def previous_name(self):
+        return self.previous.filename if self.previous else None
+
+    def unchanged_pages(self) -> int:
+        return max(self._votes.values(), default=0)
+
+    def known_ocr_text(self, doc, page, page_index: int):
+        """Stored OCR text for a page without selectable text, or None.
+
+        Called by _iter_page_texts while the page is loaded (under
+        pdf_lock.lock); also fingerprints the page.
+        """
+        try:
+            fingerprint = scanned_fingerprint(doc, page)
+        except Exception:
+            return None  # unreadable page: never matched, processed as usual
+        self.fingerprints[page_index] = fingerprint
+        self.scanned.add(page_index)
+        record = self._record_for(fingerprint)
+        text = record.ocr_text(fingerprint) if record else None
+        metrics.record_cache('revision_page', text is not None)
+        return text
+
+    def record_page(self, page_index: int, text: str) -> None:
+        if page_index in self.scanned:
+            fingerprint = self.fingerprints[page_index]
+            if text:
+                self._ocr_fingerprints.append(fingerprint)
+                self._ocr_out.append(text)
+        elif text:
+            fingerprint = self.fingerprints[page_index] = text_fingerprint(text)
+        else:
+            return
+        for base, pages in self._candidates.items():
+            if fingerprint in pages:
+                self._votes[base] = self._votes.get(base, 0) + 1
+
+    def starts_chunk(self, page_index: int) -> bool:
+        """True if this page started a chunk in the previous version."""
+        fingerprint = self.fingerprints.get(page_index)
+        record = self._record_for(fingerprint) if fingerprint else None
+        return bool(record) and fingerprint in record.chunk_starts
+
+    def record_chunk(self, first_page_index: int, text: str) -> None:
+        self._chunk_starts.append(self.fingerprints.get(first_page_index))
+        self._chunk_digests.append(chunk_digest(text))
+
+    def reused_summaries(self) -> dict:
+        """Chunk index -> summary for chunks summarized in the previous version."""
+        previous = self.previous.summaries if self.previous else {}
+        reused = {}
+        for i, digest in enumerate(self._chunk_digests):
+            hit = digest in previous
+            metrics.record_cache('revision_chunk', hit)
+            if hit:
+                reused[i] = previous[digest]
+                self.summaries[digest] = previous[digest]
+        self.reused_chunks = len(reused)
+        return reused
+
+    def add_summary(self, index: int, summary: str) -> None:
+        """Keep a model summary for the next version (never a fallback)."""
+        if 0 <= index < len(self._chunk_digests):
+            self.summaries[self._chunk_digests[index]] = summary
+
+    def close(self) -> None:
+        self._ocr_out.close()
+
+    def save(self) -> None:
+        """Store this version's record and drop the user's oldest beyond REVISIONS_KEEP."""
+        try:
+            pages = [self.fingerprints[i] for i in sorted(self.fingerprints)]
+            if not pages:
+                return
+            record = {
+                'filename': self.filename,
+                'created': time.time(),
+                'chunkStarts': [fp for fp in self._chunk_starts if fp],
+                'summaries': self.summaries,
+            }
+            directory = os.path.join(self.folder, 'revisions')
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, _digest("\n".join(pages).encode('ascii')))
+            with open(base + '.ocr.jsonl.tmp', 'w', encoding='utf-8') as f:
+                for fingerprint, text in zip(self._ocr_fingerprints, self._ocr_out):
+                    f.write(f"{fingerprint}\t{json.dumps(text)}\n")
+            os.replace(base + '.ocr.jsonl.tmp', base + '.ocr.jsonl')
+            _write_atomic(base + '.json', json.dumps(record))
+            _write_atomic(base + '.pages', "\n".join(pages))
+            previous = self.previous
+            if previous and previous.base != base:
+                try:
+                    os.utime(previous.base + '.pages')  # recently used: kept by pruning
+                except OSError:
+                    pass
+            _prune(directory)
+        finally:
+            self.close()
+
+
+def _write_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _prune(directory):
+    records = sorted(glob.glob(os.path.join(directory, '*.pages')), key=os.path.getmtime, reverse=True)
+    for path in records[REVISIONS_KEEP:]:
+        base = path[:-len('.pages')]
+        for suffix in _SUFFIXES:
+            try:
+                os.remove(base + suffix)
+            except OSError:
+                pass
+
+
+def open_tracker(folder: str, name: str) -> Tracker:
+    """A Tracker for a new upload of `name`, matched against the user's stored records."""
+    candidates = {}
+    for path in glob.glob(os.path.join(folder, 'revisions', '*.pages')):
+        try:
+            with open(path, encoding='ascii') as f:
+                candidates[path[:-len('.pages')]] = set(f.read().split())
+        except OSError:
+            continue  # removed by storage GC meanwhile
+    return Tracker(folder, name, candidates)
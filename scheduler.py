@@ -0,0 +1,219 @@
+"""
+Fair per-user scheduling and admission control for pipeline jobs.
+
+Jobs ask for a run slot before starting the pipeline. The scheduler:
+
+- runs at most SCHEDULER_SLOTS jobs at once, and at most
+  SCHEDULER_PER_USER_SLOTS for any single user;
+- orders waiting jobs by weighted fair queueing: each user's jobs get
+  virtual finish tags advanced by cost / weight, so a user with ten big
+  scans does not starve others, and cheap jobs finish first;
+- rejects new jobs once SCHEDULER_MAX_QUEUE jobs (or
+  SCHEDULER_MAX_USER_QUEUE for one user) are waiting, with a Retry-After
+  estimate based on recent job durations.
+
+A waiting job holds the request thread that uploaded it. Under gunicorn the
+queue is therefore also capped by the worker's request threads (exported by
+gunicorn.conf.py as GUNICORN_WORKER_THREADS): running and waiting jobs
+together leave SCHEDULER_FREE_THREADS threads for status polls, event
+streams and downloads, and further uploads get a 429 instead of a thread.
+
+Cost is estimated from the PDF: pages x (1 + OCR_COST_FACTOR x fraction of
+sampled pages without a text layer).
+
+State is per process; each gunicorn worker schedules the requests it
+serves (use threaded workers so one worker can queue several jobs).
+"""
+
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import pdf_lock
+
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _parse_weights(raw):
+    weights = {}
+    for item in (raw or '').split(','):
+        if '=' in item:
+            user, _, weight = item.partition('=')
+            try:
+                weights[user.strip()] = max(0.01, float(weight))
+            except ValueError:
+                continue
+    return weights
+
+
+SCHEDULER_SLOTS = max(1, _env_int('SCHEDULER_SLOTS', 2))
+SCHEDULER_PER_USER_SLOTS = max(1, _env_int('SCHEDULER_PER_USER_SLOTS', 1))
+SCHEDULER_MAX_QUEUE = max(0, _env_int('SCHEDULER_MAX_QUEUE', 16))
+SCHEDULER_MAX_USER_QUEUE = max(0, _env_int('SCHEDULER_MAX_USER_QUEUE', 4))
+SCHEDULER_USER_WEIGHTS = _parse_weights(os.environ.get('SCHEDULER_USER_WEIGHTS'))
+SCHEDULER_FREE_THREADS = max(1, _env_int('SCHEDULER_FREE_THREADS', 2))
+# Requests one worker serves at once; 0 when unbounded (gevent, dev server).
+GUNICORN_WORKER_THREADS = max(0, _env_int('GUNICORN_WORKER_THREADS', 0))
+OCR_COST_FACTOR = float(os.environ.get('OCR_COST_FACTOR', '10'))
+
+
+class QueueFull(Exception):
+    """Raised when a job is not admitted; retry_after is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Ticket:
+    __slots__ = ('user', 'cost', 'seq', 'start_tag', 'finish_tag', 'granted', 'enqueued_at')
+
+    def __init__(self, user, cost, seq, start_tag, finish_tag):
+        self.user = user
+        self.cost = cost
+        self.seq = seq
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+
+class FairScheduler:
+    """Weighted fair queue with per-user limits and bounded waiting."""
+
+    def __init__(self, slots=SCHEDULER_SLOTS, per_user_slots=SCHEDULER_PER_USER_SLOTS,
+                 max_queue=SCHEDULER_MAX_QUEUE, max_user_queue=SCHEDULER_MAX_USER_QUEUE,
+                 weights=None, worker_threads=GUNICORN_WORKER_THREADS, free_threads=SCHEDULER_FREE_THREADS):
+        if worker_threads:
+            # Waiting jobs hold request threads; keep free_threads for everything else.
+            max_queue = min(max_queue, max(0, worker_threads - min(slots, worker_threads) - free_threads))
+        self.slots = slots
+        self.per_user_slots = per_user_slots
+        self.max_queue = max_queue
+        self.max_user_queue = max_user_queue
+        self.weights = SCHEDULER_USER_WEIGHTS if weights is None else weights
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._running = {}         # user -> running job count
+        self._last_finish = {}     # user -> last virtual finish tag
+        self._virtual_time = 0.0
+        self._seq = itertools.count()
+        self._seconds_per_cost = 1.0  # EWMA of job seconds per unit of cost
+
+    def _running_total(self):
+        return sum(self._running.values())
+
+    def _retry_after(self, extra_cost=0.0):
+        queued = sum(t.cost for t in self._waiting) + extra_cost
+        return max(1, int(queued * self._seconds_per_cost / self.slots))
+
+    def _dispatch(self):
+        # Grant free slots to the eligible waiters with the smallest finish tags.
+        while self._waiting and self._running_total() < self.slots:
+            eligible = [t for t in self._waiting if self._running.get(t.user, 0) < self.per_user_slots]
+            if not eligible:
+                return
+            ticket = min(eligible, key=lambda t: (t.finish_tag, t.seq))
+            self._waiting.remove(ticket)
+            ticket.granted = True
+            self._running[ticket.user] = self._running.get(ticket.user, 0) + 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._cond.notify_all()
+
+    def acquire(self, user: str, cost: float) -> _Ticket:
+        """Block until the job may run; raises QueueFull if not admitted."""
+        cost = max(1.0, float(cost))
+        with self._cond:
+            has_slot = (self._running_total() < self.slots
+                        and self._running.get(user, 0) < self.per_user_slots
+                        and not self._waiting)
+            if not has_slot:
+                user_waiting = sum(1 for t in self._waiting if t.user == user)
+                if len(self._waiting) >= self.max_queue:
+                    raise QueueFull("Server is busy; too many queued jobs", self._retry_after(cost))
+                if user_waiting >= self.max_user_queue:
+                    raise QueueFull("You already have too many queued jobs", self._retry_after(cost))
+            weight = self.weights.get(user, 1.0)
+            start_tag = max(self._virtual_time, self._last_finish.get(user, 0.0))
+            finish_tag = start_tag + cost / weight
+            self._last_finish[user] = finish_tag
+            ticket = _Ticket(user, cost, next(self._seq), start_tag, finish_tag)
+            self._waiting.append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+            return ticket
+
+    def release(self, ticket: _Ticket, elapsed: float = None) -> None:
+        with self._cond:
+            self._running[ticket.user] -= 1
+            if not self._running[ticket.user]:
+                del self._running[ticket.user]
+            if elapsed is not None:
+                sample = elapsed / ticket.cost
+                self._seconds_per_cost = 0.8 * self._seconds_per_cost + 0.2 * sample
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, user: str, cost: float):
+        """Context manager around acquire/release; yields seconds spent queued."""
+        queued_at = time.monotonic()
+        ticket = self.acquire(user, cost)
+        started = time.monotonic()
+        try:
+            yield started - queued_at
+        finally:
+            self.release(ticket, time.monotonic() - started)
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                'running': dict(self._running),
+                'waiting': len(self._waiting),
+                'slots': self.slots,
+            }
+
+
+def estimate_cost(pdf_path: str, sample_pages: int = 8, pages=None) -> float:
+    """Pages x (1 + OCR_COST_FACTOR x share of sampled pages needing OCR).
+
+    `pages` restricts the estimate to the selected 0-based page indices.
+    """
+    import fitz  # PyMuPDF
+    with pdf_lock.lock:
+        try:
+            doc = fitz.open(pdf_path)
+        except Exception:
+            return 1.0
+        try:
+            pages = range(len(doc)) if pages is None else pages
+            if not pages:
+                return 1.0
+            step = max(1, len(pages) // sample_pages)
+            sampled = pages[::step][:sample_pages]
+            needs_ocr = sum(1 for i in sampled if not (doc.load_page(i).get_text("text") or "").strip())
+            ocr_fraction = needs_ocr / len(sampled)
+            return len(pages) * (1 + OCR_COST_FACTOR * ocr_fraction)
+        finally:
+            doc.close()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> FairScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = FairScheduler()
+                print(f"[INFO] Scheduler: {_scheduler.slots} slot(s), up to {_scheduler.max_queue} queued job(s)")
+    return _scheduler
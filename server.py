@@ -1,66 +1,99 @@
 import os
-import io
 import tempfile
 import json
 import base64
+import time
+import threading
 from flask import Flask, request, jsonify, send_from_directory, Response, session
-from pypdf import PdfReader
-import google.generativeai as genai
-import pyttsx3
 from dotenv import load_dotenv
-import fitz  # PyMuPDF
-from PIL import Image
-import pytesseract
 
 # --- Configuration ---
 # Load environment variables from .env file
 load_dotenv()
 
-# Get API key from environment variable
-api_key = os.environ.get('GEMINI_API_KEY')
-model = None
-
-if not api_key:
-    print("[WARN] GEMINI_API_KEY not found in environment variables.")
-    print("[INFO] Proceeding with basic (non-AI) summary fallback. To enable AI, set GEMINI_API_KEY in a .env file.")
-else:
-    # Configure the Gemini API
-    genai.configure(api_key=api_key)
-    try:
-        # Initialize the model - try different model names
-        try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            print("[SUCCESS] Gemini client initialized with gemini-1.5-flash")
-        except:
-            try:
-                model = genai.GenerativeModel('gemini-1.5-pro')
-                print("[SUCCESS] Gemini client initialized with gemini-1.5-pro")
-            except:
-                model = genai.GenerativeModel('gemini-pro')
-                print("[SUCCESS] Gemini client initialized with gemini-pro")
-    except Exception as e:
-        print(f"[ERROR] Error initializing Gemini Client: {e}")
-        print(f"[ERROR] Please check your GEMINI_API_KEY in the .env file")
-        model = None
+# Local modules read their settings from the environment at import time,
+# so they are imported after .env has been loaded.
+import ocr
+import llm_client
+import text_compress
+import metrics
+import text_store
+import profiling
+import checkpoints
+import scheduler
+import pdf_writer
+import storage
+import audio
+import tts
+import outline
+import pdf_lock
+import static_assets
+import revisions
+import http_compression
+
+# The Gemini client (or offline stub) is created lazily per worker in
+# llm_client.py; see LLM_BACKEND, GEMINI_MODEL and LLM_TIMEOUT there.
 
 # --- App Setup ---
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'dev-secret-key')
+# index.html, app.js and styles.css: hashed, precompressed, served ahead of Flask.
+app.wsgi_app = static_assets.StaticAssets(
+    app.wsgi_app, *static_assets.load(app.root_path, os.path.join(app.root_path, static_assets.STATIC_DIR)))
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-TEMP_AUDIO_PATH = os.path.join(UPLOAD_FOLDER, 'podcast.wav') 
 
-# Optional: allow configuring the Tesseract binary path via env
-tesseract_cmd = os.environ.get('TESSERACT_CMD')
-if tesseract_cmd:
-    try:
-        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-        print(f"[INFO] Using custom Tesseract at: {tesseract_cmd}")
-    except Exception as _tess_err:
-        print(f"[WARN] Failed to set custom Tesseract path: {_tess_err}")
+# Bounded-memory extraction: when set (MB), page text is spilled to disk and
+# MuPDF's cache is trimmed so very large PDFs fit small containers.
+EXTRACT_MEMORY_LIMIT_MB = int(os.environ.get('EXTRACT_MEMORY_LIMIT_MB', '0') or 0)
+
+# Documents /api/process-batch runs at once across all batches of this
+# worker process (default: SCHEDULER_SLOTS), and batches it runs at once.
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', '0') or 0) or scheduler.SCHEDULER_SLOTS
+BATCH_MAX_RUNNING = max(1, int(os.environ.get('BATCH_MAX_RUNNING', '2') or 2))
+
+# Write the summary PDF after /api/process-pdf responds; downloading pdfUrl
+# before it is written waits for it.
+PDF_WRITE_ASYNC = os.environ.get('PDF_WRITE_ASYNC', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+# Speak synthesis sentences while the rest is still being generated.
+TTS_PIPELINE = os.environ.get('TTS_PIPELINE', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+# Output cap for each chunk summary, in model tokens.
+CHUNK_SUMMARY_MAX_TOKENS = int(os.environ.get('CHUNK_SUMMARY_MAX_TOKENS', '512') or 0)
+# Tokens allowed per target word when capping the synthesis (~1.3 tokens per
+# English word, plus headroom for headings and lists).
+SYNTHESIS_TOKENS_PER_WORD = 1.5
+
+# Longest time /api/status/<job_id>/events keeps a stream open.
+STATUS_STREAM_SECONDS = int(os.environ.get('STATUS_STREAM_SECONDS', '900') or 900)
+
+# OCR engine (tesserocr or pytesseract) is chosen in ocr.py via OCR_BACKEND;
+# TESSERACT_CMD still configures the tesseract binary for the pytesseract path.
+
+# --- Heavy dependencies ---
+# PyMuPDF, pypdf, Pillow, pyttsx3, pytesseract and google-generativeai are
+# imported inside the functions that use them, so importing this module (and
+# booting a gunicorn worker) stays cheap. With preload_app the master calls
+# preload_dependencies() once and workers inherit the loaded modules on fork.
+
+def preload_dependencies() -> None:
+    """Import heavy libraries up front (gunicorn master, before forking).
+
+    Only modules are loaded here: API clients and OCR engines are not
+    fork-safe and are still created lazily in each worker.
+    """
+    import importlib
+    for name in ('fitz', 'pypdf', 'PIL.Image', 'pyttsx3', 'pytesseract', 'google.generativeai'):
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"[WARN] Could not preload {name}: {e}")
 
 # --- Simple in-memory progress tracking ---
 progress_store = {}
+# A job in one of these states will not change again.
+FINAL_STATUSES = ('done', 'rejected', 'error')
 
 def _get_user_folder() -> str:
     user_id = session.get('user_id', 'anonymous')
@@ -84,64 +117,93 @@ def _get_summary_targets(length_key: str):
 
 def extract_text_from_pdf_pypdf(file_path):
     """Try extracting text with pypdf."""
+    from pypdf import PdfReader
     try:
         reader = PdfReader(file_path)
-        text = ""
+        parts = []
         for page_num, page in enumerate(reader.pages):
             try:
                 page_text = page.extract_text()
                 if page_text:
-                    text += page_text + "\n"
+                    parts.append(page_text)
             except Exception as page_error:
                 print(f"[WARN] pypdf: Could not extract text from page {page_num + 1}: {page_error}")
                 continue
-        return text.strip()
+        return "\n".join(parts).strip()
     except Exception as e:
         print(f"[ERROR] pypdf extraction error: {e}")
         return ""
 
 def extract_text_from_pdf_pymupdf(file_path):
     """Try extracting selectable text using PyMuPDF (faster and often more reliable than pypdf)."""
+    import fitz  # PyMuPDF
     try:
-        doc = fitz.open(file_path)
-        text_chunks = []
-        for page_index in range(len(doc)):
+        with pdf_lock.lock:
+            doc = fitz.open(file_path)
+            text_chunks = []
             try:
-                page = doc.load_page(page_index)
-                page_text = page.get_text("text") or ""
-                if page_text.strip():
-                    text_chunks.append(page_text)
-            except Exception as page_error:
-                print(f"[WARN] PyMuPDF text: Could not extract text from page {page_index + 1}: {page_error}")
-                continue
-        doc.close()
+                for page_index in range(len(doc)):
+                    try:
+                        page = doc.load_page(page_index)
+                        page_text = page.get_text("text") or ""
+                        if page_text.strip():
+                            text_chunks.append(page_text)
+                    except Exception as page_error:
+                        print(f"[WARN] PyMuPDF text: Could not extract text from page {page_index + 1}: {page_error}")
+                        continue
+                page = None
+            finally:
+                doc.close()
         return ("\n".join(text_chunks)).strip()
     except Exception as e:
         print(f"[ERROR] PyMuPDF text extraction error: {e}")
         return ""
 
+def _render_page_image(page, dpi=200):
+    """Render a page to a grayscale PIL image straight from the pixmap samples.
+
+    Skips the PNG encode/decode round trip and renders one byte per pixel
+    instead of three, which is all tesseract needs.
+    """
+    import fitz  # PyMuPDF
+    from PIL import Image
+    pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+    return Image.frombuffer("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride, 1)
+
 def extract_text_from_pdf_ocr(file_path, dpi=200):
-    """Extract text by rendering pages to images and running OCR with pytesseract."""
+    """Extract text by rendering pages to images and running OCR (see ocr.py)."""
+    import fitz  # PyMuPDF
     try:
-        doc = fitz.open(file_path)
+        with pdf_lock.lock:
+            doc = fitz.open(file_path)
+            page_count = len(doc)
         ocr_chunks = []
-        for page_index in range(len(doc)):
+        batch_size = ocr.OCR_BATCH_PAGES
+        for window_start in range(0, page_count, batch_size):
+            batch = []
+            # Render under the PyMuPDF lock, OCR after releasing it
+            with pdf_lock.lock:
+                for page_index in range(window_start, min(window_start + batch_size, page_count)):
+                    try:
+                        page = doc.load_page(page_index)
+                        batch.append((page_index, _render_page_image(page, dpi=dpi)))
+                    except Exception as page_error:
+                        print(f"[WARN] OCR: Could not process page {page_index + 1}: {page_error}")
+                        continue
+                page = None
+            if not batch:
+                continue
             try:
-                page = doc.load_page(page_index)
-                pix = page.get_pixmap(dpi=dpi, alpha=False)
-                img_bytes = pix.tobytes("png")
-                image = Image.open(io.BytesIO(img_bytes))
-                try:
-                    text = pytesseract.image_to_string(image)
-                except Exception as ocr_err:
-                    print(f"[ERROR] OCR failed on page {page_index + 1}: {ocr_err}")
-                    text = ""
+                texts = ocr.images_to_strings([image for _, image in batch])
+            except Exception as ocr_err:
+                pages = ", ".join(str(i + 1) for i, _ in batch)
+                print(f"[ERROR] OCR failed on page(s) {pages}: {ocr_err}")
+                texts = []
+            for text in texts:
                 if text and text.strip():
                     ocr_chunks.append(text)
-            except Exception as page_error:
-                print(f"[WARN] OCR: Could not process page {page_index + 1}: {page_error}")
-                continue
-        doc.close()
+        with pdf_lock.lock:
+            doc.close()
         return ("\n".join(ocr_chunks)).strip()
     except Exception as e:
         print(f"[ERROR] OCR extraction error: {e}")
@@ -175,6 +237,18 @@ def _normalize_text_for_dedupe(text: str) -> str:
     # Lowercase, collapse whitespace, strip
     return " ".join((text or "").lower().split())
 
+def _dedupe_digest(text: str):
+    """Fixed-size digest of the normalized text, or None if it is empty.
+
+    Seen-sets hold these instead of whole normalized pages, so dedupe memory
+    does not grow with the document's text.
+    """
+    norm = _normalize_text_for_dedupe(text)
+    if not norm:
+        return None
+    import hashlib
+    return hashlib.blake2b(norm.encode('utf-8'), digest_size=16).digest()
+
 def _clean_trailing_duplicates(text: str) -> str:
     """Remove duplicated trailing sentences/phrases and ensure a clean single ending."""
     if not text:
@@ -199,86 +273,152 @@ def _clean_trailing_duplicates(text: str) -> str:
     cleaned = re.sub(r"[.!?]+\s*$", ".", cleaned).strip()
     return cleaned
 
-def extract_text_chunks_from_pdf(file_path, pages_per_chunk=10):
-    """Extract text in chunks of N pages.
-    Per page: try selectable text first; only run OCR if empty.
-    Removes duplicate page texts and duplicate chunk texts to reduce repetition.
+def _iter_page_texts(doc, dpi=200, ocr_batch_pages=None, pages=None, known_text=None):
+    """Yield (page_index, text) for every page (or only `pages`), in order.
+
+    Selectable text is used when present; pages without it take their text
+    from `known_text(doc, page, page_index)` when that returns one (OCR text
+    from an earlier run), else they are rendered and OCR'd. With ocr_batch_pages > 1 (OCR_BATCH_PAGES) the scanned pages of
+    each window of N pages go to the OCR engine as a single batch.
+
+    Pages are read and rendered under pdf_lock.lock, one window at a time;
+    OCR runs and pages are yielded without holding it.
     """
+    batch_size = ocr_batch_pages or ocr.OCR_BATCH_PAGES
+    pages = range(len(doc)) if pages is None else pages
+    for window_start in range(0, len(pages), batch_size):
+        window = pages[window_start:window_start + batch_size]
+        texts = {}
+        pending = []
+        with pdf_lock.lock:
+            for page_index in window:
+                texts[page_index] = ""
+                try:
+                    page = doc.load_page(page_index)
+                    # 1) selectable text
+                    texts[page_index] = (page.get_text("text") or "").strip()
+                    # 2) OCR only if empty and not known from an earlier run
+                    if not texts[page_index] and known_text:
+                        texts[page_index] = known_text(doc, page, page_index) or ""
+                    if not texts[page_index]:
+                        pending.append((page_index, _render_page_image(page, dpi=dpi)))
+                except Exception as page_err:
+                    print(f"[WARN] Could not process page {page_index + 1}: {page_err}")
+            page = None
+        if pending:
+            ocr_start = time.perf_counter()
+            try:
+                results = ocr.images_to_strings([image for _, image in pending])
+            except Exception as ocr_err:
+                failed = ", ".join(str(i + 1) for i, _ in pending)
+                print(f"[WARN] OCR failed on page(s) {failed}: {ocr_err}")
+                results = [""] * len(pending)
+            per_page = (time.perf_counter() - ocr_start) / len(pending)
+            for _ in pending:
+                metrics.observe_stage('ocr_page', per_page)
+            for (page_index, _), text in zip(pending, results):
+                texts[page_index] = (text or "").strip()
+        for page_index in window:
+            yield page_index, texts[page_index]
+
+def _current_rss_mb() -> float:
+    """Resident set size of this process in MB (Linux /proc, else peak RSS)."""
     try:
-        doc = fitz.open(file_path)
-    except Exception as e:
-        print(f"[ERROR] Unable to open PDF for chunking: {e}")
-        return []
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def extract_text_chunks_from_pdf(file_path, pages_per_chunk=10, memory_limit_mb=None, pages=None, tracker=None):
+    """Extract text in chunks of up to N pages.
+    Per page: try selectable text first; only run OCR if empty
+    (batched per OCR_BATCH_PAGES).
+    Removes duplicate page texts and duplicate chunk texts to reduce repetition.
 
-    total_pages = len(doc)
-    chunks = []
+    `pages` limits extraction to those 0-based page indices. A new chunk
+    also starts where a section of the PDF outline begins.
+
+    With a revisions.Tracker, scanned pages unchanged since the previous
+    version reuse its OCR text, and chunks start where that version's chunks
+    started so unchanged runs of pages give identical chunks.
+
+    With a memory limit (EXTRACT_MEMORY_LIMIT_MB) chunk texts are spilled to
+    a temp file and returned as a SpilledTextList, and MuPDF's resource cache
+    is trimmed at every chunk boundary or whenever RSS nears the limit.
+    """
+    import fitz  # PyMuPDF
+    with pdf_lock.lock:
+        try:
+            doc = fitz.open(file_path)
+        except Exception as e:
+            print(f"[ERROR] Unable to open PDF for chunking: {e}")
+            return []
+        starts = outline.section_starts(doc)
+
+    if memory_limit_mb is None:
+        memory_limit_mb = EXTRACT_MEMORY_LIMIT_MB
+    bounded = bool(memory_limit_mb)
+    chunks = text_store.SpilledTextList() if bounded else []
     current_chunk = []
+    pages_in_chunk = 0
     seen_page_hashes = set()
+    seen_chunk_hashes = set()
+    # Don't cut a chunk at a section start before it holds this many pages,
+    # so outlines with an entry per page don't explode the number of chunks.
+    min_section_chunk = max(1, pages_per_chunk // 4)
+    chunk_first_page = None
 
-    for page_index in range(total_pages):
-        page_text = ""
-        try:
-            page = doc.load_page(page_index)
-            # 1) selectable text
-            page_text = (page.get_text("text") or "").strip()
-            # 2) OCR only if empty
-            if not page_text:
-                try:
-                    pix = page.get_pixmap(dpi=200, alpha=False)
-                    img_bytes = pix.tobytes("png")
-                    image = Image.open(io.BytesIO(img_bytes))
-                    page_text = (pytesseract.image_to_string(image) or "").strip()
-                except Exception as ocr_err:
-                    print(f"[WARN] OCR failed on page {page_index + 1}: {ocr_err}")
-                    page_text = ""
-        except Exception as page_err:
-            print(f"[WARN] Could not process page {page_index + 1}: {page_err}")
-            page_text = ""
+    def push_chunk():
+        # Remove duplicate chunk texts as we go
+        chunk_text = "\n".join(current_chunk).strip()
+        h = _dedupe_digest(chunk_text)
+        if h and h not in seen_chunk_hashes:
+            seen_chunk_hashes.add(h)
+            chunks.append(chunk_text)
+            if tracker:
+                tracker.record_chunk(chunk_first_page, chunk_text)
+        current_chunk.clear()
+
+    page_texts = _iter_page_texts(doc, dpi=200, pages=pages, known_text=tracker.known_ocr_text if tracker else None)
+    for page_index, page_text in page_texts:
+        if tracker:
+            tracker.record_page(page_index, page_text)
+        # Start a new chunk where an outline section or a previous version's chunk begins
+        if pages_in_chunk and ((tracker and tracker.starts_chunk(page_index))
+                               or (page_index in starts and pages_in_chunk >= min_section_chunk)):
+            push_chunk()
+            pages_in_chunk = 0
+        if not pages_in_chunk:
+            chunk_first_page = page_index
+        pages_in_chunk += 1
 
         # De-duplicate identical page texts
         if page_text:
-            ph = _normalize_text_for_dedupe(page_text)
+            ph = _dedupe_digest(page_text)
             if ph and ph not in seen_page_hashes:
                 seen_page_hashes.add(ph)
                 current_chunk.append(page_text)
 
         # push chunk boundary at every N pages
-        if (page_index + 1) % pages_per_chunk == 0:
-            chunk_text = "\n".join(current_chunk).strip()
-            if chunk_text:
-                chunks.append(chunk_text)
-            current_chunk = []
+        if pages_in_chunk == pages_per_chunk:
+            push_chunk()
+            pages_in_chunk = 0
+            if bounded:
+                with pdf_lock.lock:
+                    fitz.TOOLS.store_shrink(100 if _current_rss_mb() > 0.8 * memory_limit_mb else 50)
 
     # remaining pages
     if current_chunk:
-        chunk_text = "\n".join(current_chunk).strip()
-        if chunk_text:
-            chunks.append(chunk_text)
-
-    doc.close()
-
-    # Remove duplicate chunk texts
-    unique_chunks = []
-    seen_chunk_hashes = set()
-    for ch in chunks:
-        h = _normalize_text_for_dedupe(ch)
-        if h and h not in seen_chunk_hashes:
-            seen_chunk_hashes.add(h)
-            unique_chunks.append(ch)
-
-    return unique_chunks
+        push_chunk()
 
-def generate_summary_for_chunk(text, chunk_index=None, total_chunks=None):
-    """Summarize a chunk; fallback to truncated text if model unavailable."""
-    if not text or not text.strip():
-        return ""
-    if not model:
-        # basic fallback: first 400 words as a pseudo-summary
-        words = text.split()[:400]
-        return " ".join(words)
+    with pdf_lock.lock:
+        doc.close()
+    return chunks
 
+def _chunk_summary_prompt(text, chunk_index=None, total_chunks=None):
     tag = f" (Part {chunk_index + 1} of {total_chunks})" if chunk_index is not None and total_chunks is not None else ""
-    prompt = (
+    return (
         "You are summarizing a long document in parts" + tag + ".\n"
         "Write a clear, structured summary that captures key arguments, evidence, definitions, data, and action items.\n"
         "Prefer bullet points for lists, and short paragraphs for narratives.\n"
@@ -286,19 +426,135 @@ def generate_summary_for_chunk(text, chunk_index=None, total_chunks=None):
         "Chunk content follows:\n" + text
     )
 
+def _chunk_generation_config():
+    return {'max_output_tokens': CHUNK_SUMMARY_MAX_TOKENS} if CHUNK_SUMMARY_MAX_TOKENS else None
+
+def _stream_until_words(llm, prompt, max_words, generation_config=None, stage=None, on_piece=None):
+    """Stream a response and stop the model once max_words words have arrived.
+
+    The text is cut at exactly max_words words; `on_piece(text)` sees each
+    piece as it arrives.
+    """
+    pieces = []
+    words = 0
+    stream = llm.generate_stream(prompt, generation_config=generation_config, stage=stage)
     try:
-        response = model.generate_content(prompt)
-        if response and hasattr(response, 'text') and response.text:
-            return response.text.strip()
-    except Exception as e:
-        print(f"[ERROR] Chunk summary failed: {e}")
+        for piece in stream:
+            if pieces and piece[:1].strip() and pieces[-1][-1:].strip():
+                words -= 1  # a word split across two pieces
+            words += len(piece.split())
+            if words >= max_words:
+                excess = words - max_words
+                if excess:
+                    lead = piece[:len(piece) - len(piece.lstrip())]
+                    parts = piece.split()
+                    piece = lead + " ".join(parts[:len(parts) - excess])
+            pieces.append(piece)
+            if on_piece:
+                on_piece(piece)
+            if words >= max_words:
+                print(f"[INFO] Stopped generation at {max_words} words")
+                metrics.inc('pdf2podcast_llm_early_stops_total', {'stage': stage or 'unknown'})
+                break
+    finally:
+        stream.close()
+    return "".join(pieces).strip()
 
-    # fallback
+def _fallback_chunk_summary(text):
+    # basic fallback: first 400 words as a pseudo-summary
     words = text.split()[:400]
     return " ".join(words)
 
-def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, target_max_words=2000, source_chunks=None):
-    """Combine chunk summaries into one clean 1500–2000 word synthesis without repetition."""
+def generate_summary_for_chunk(text, chunk_index=None, total_chunks=None):
+    """Summarize a chunk; fallback to truncated text if model unavailable."""
+    if not text or not text.strip():
+        return ""
+    llm = llm_client.get_client()
+    if not llm:
+        return _fallback_chunk_summary(text)
+
+    compressed, _, _ = text_compress.compress_for_prompt(text)
+    try:
+        return llm.generate(_chunk_summary_prompt(compressed, chunk_index, total_chunks),
+                            generation_config=_chunk_generation_config(), stage='summarize_chunk')
+    except llm_client.LLMError as e:
+        print(f"[ERROR] Chunk summary failed: {e}")
+
+    metrics.record_fallback('chunk_summary')
+    return _fallback_chunk_summary(text)
+
+def generate_summaries_for_chunks(chunks, done=None, on_result=None, fallbacks=None):
+    """Summarize all chunks, keeping up to LLM_CONCURRENCY model calls in flight.
+
+    Prompts are built a window at a time so only a few chunk texts are held
+    in memory at once (chunks may be a disk-backed SpilledTextList).
+    `done` maps chunk index to an already-known summary (skipped here), and
+    `on_result(index, summary)` is called as each new model summary
+    completes. Fallback pseudo-summaries are not reported; they add
+    'chunk_summary' to the `fallbacks` set instead.
+    """
+    done = done or {}
+    llm = llm_client.get_client()
+    if not llm:
+        summaries = []
+        for i, c in enumerate(chunks):
+            if i not in done and c and c.strip():
+                summary = _fallback_chunk_summary(c)
+                if fallbacks is not None:
+                    fallbacks.add('chunk_summary')
+            else:
+                summary = done.get(i, "")
+            summaries.append(summary)
+        return summaries
+    total = len(chunks)
+    window = max(1, llm.concurrency * 2)
+    summaries = [done.get(i, "") for i in range(total)]
+    tokens_before = tokens_after = 0
+    for window_start in range(0, total, window):
+        todo = []
+        prompts = []
+        for i in range(window_start, min(window_start + window, total)):
+            if i in done:
+                continue
+            chunk = chunks[i]
+            if not chunk or not chunk.strip():
+                continue
+            compressed, before, after = text_compress.compress_for_prompt(chunk)
+            tokens_before += before
+            tokens_after += after
+            todo.append(i)
+            prompts.append(_chunk_summary_prompt(compressed, i, total))
+        results = llm.generate_many(prompts, generation_config=_chunk_generation_config(), stage='summarize_chunk')
+        for i, result in zip(todo, results):
+            if isinstance(result, llm_client.LLMError):
+                print(f"[ERROR] Chunk summary failed: {result}")
+                metrics.record_fallback('chunk_summary')
+                if fallbacks is not None:
+                    fallbacks.add('chunk_summary')
+                summaries[i] = _fallback_chunk_summary(chunks[i])
+                continue  # not reported, so a retried job asks the model again
+            summaries[i] = result
+            if on_result:
+                on_result(i, result)
+    if tokens_before and tokens_after < tokens_before:
+        saved = 100.0 * (tokens_before - tokens_after) / tokens_before
+        print(f"[INFO] Prompt compression: ~{tokens_before} -> ~{tokens_after} tokens ({saved:.0f}% saved)")
+    return summaries
+
+def _iter_sentences(texts):
+    """Yield sentences from each text in turn, without joining them all first."""
+    import re
+    for text in texts:
+        for sentence in re.split(r"(?<=[.!?])\s+", text or ""):
+            yield sentence
+
+def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, target_max_words=2000, source_chunks=None,
+                                       on_text=None, fallbacks=None):
+    """Combine chunk summaries into one clean 1500–2000 word synthesis without repetition.
+
+    When the model is used, `on_text(piece)` receives the synthesis as it streams.
+    A synthesis built without the model adds 'synthesis' to the `fallbacks` set.
+    """
     # 1) Drop empty and duplicate summaries
     cleaned = []
     seen = set()
@@ -314,7 +570,11 @@ def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, t
     if not joined:
         return ""
 
-    if not model:
+    llm = llm_client.get_client()
+    if not llm:
+        metrics.record_fallback('no_model')
+        if fallbacks is not None:
+            fallbacks.add('synthesis')
         # Fallback: take unique sentences from summaries; if too short, augment from source chunks
         import re
         sentences = re.split(r"(?<=[.!?])\s+", joined)
@@ -328,15 +588,15 @@ def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, t
         text_accum = " ".join(uniq_sent).strip()
 
         # If not enough words, try to augment from original chunk text (deduped sentences)
-        if source_chunks and len(text_accum.split()) < target_min_words:
-            src_joined = "\n\n".join(source_chunks)
-            src_sentences = re.split(r"(?<=[.!?])\s+", src_joined)
-            for s in src_sentences:
+        word_count = len(text_accum.split())
+        if source_chunks and word_count < target_min_words:
+            for s in _iter_sentences(source_chunks):
                 k = _normalize_text_for_dedupe(s)
                 if k and k not in sent_seen:
                     sent_seen.add(k)
                     uniq_sent.append(s.strip())
-                if len(" ".join(uniq_sent).split()) >= target_min_words:
+                    word_count += len(s.split())
+                if word_count >= target_min_words:
                     break
 
         words = (" ".join(uniq_sent)).split()
@@ -359,9 +619,12 @@ def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, t
     )
 
     try:
-        response = model.generate_content(synthesis_prompt)
-        if response and hasattr(response, 'text') and response.text:
-            txt = response.text.strip()
+        # Stream so the call ends as soon as the word budget is reached.
+        txt = _stream_until_words(
+            llm, synthesis_prompt, target_max_words,
+            generation_config={'max_output_tokens': int(target_max_words * SYNTHESIS_TOKENS_PER_WORD)},
+            stage='synthesis_call', on_piece=on_text)
+        if txt:
             w = txt.split()
             # If too short, augment from chunk summaries and optionally source chunks
             if len(w) < target_min_words:
@@ -379,9 +642,7 @@ def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, t
                         break
                 # still short? try raw source chunks
                 if source_chunks and len(w) < target_min_words:
-                    src_pool = "\n\n".join(source_chunks)
-                    sentences = re.split(r"(?<=[.!?])\s+", src_pool)
-                    for s in sentences:
+                    for s in _iter_sentences(source_chunks):
                         k = _normalize_text_for_dedupe(s)
                         if k and k not in seen:
                             w.extend(s.strip().split())
@@ -392,10 +653,13 @@ def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, t
             if len(w) > target_max_words:
                 w = w[:target_max_words]
             return _clean_trailing_duplicates(" ".join(w))
-    except Exception as e:
+    except llm_client.LLMError as e:
         print(f"[ERROR] Final synthesis failed: {e}")
 
     # final fallback: take unique sentences up to target_max_words
+    metrics.record_fallback('synthesis')
+    if fallbacks is not None:
+        fallbacks.add('synthesis')
     import re
     sentences = re.split(r"(?<=[.!?])\s+", joined)
     uniq_sent = []
@@ -410,85 +674,45 @@ def generate_final_summary_from_chunks(chunk_summaries, target_min_words=1500, t
 
 def generate_summary(text):
     """Generate summary using Gemini API."""
-    if not model:
+    llm = llm_client.get_client()
+    if not llm:
         raise Exception("Gemini client not initialized. Check API key.")
     
     prompt = f"Create a comprehensive summary of the following document that would be suitable for an engaging audio podcast. Please provide a detailed summary that captures all the key points and main ideas. Make it informative and complete:\n\n{text}"
     
     try:
         print(f"[INFO] Sending request to Gemini API...")
-        response = model.generate_content(prompt)
+        summary = llm.generate(prompt)
         print(f"[INFO] Gemini API response received")
-        
-        if response and hasattr(response, 'text'):
-            print(f"[SUCCESS] Generated summary length: {len(response.text)} characters")
-            return response.text
-        else:
-            print(f"[ERROR] No response text in Gemini API response")
-            raise Exception("No response text received from Gemini API")
-    except Exception as e:
+        print(f"[SUCCESS] Generated summary length: {len(summary)} characters")
+        return summary
+    except llm_client.LLMError as e:
         print(f"[ERROR] Gemini API error details: {e}")
-        print(f"[ERROR] Error type: {type(e).__name__}")
         # Fallback: return a longer summary without truncation
         words = text.split()[:500]  # First 500 words for better fallback
         return " ".join(words) + "\n\n[This is a basic summary of your document. For a more detailed AI-generated summary, please check your API configuration.]"
 
-def write_wav_header(stream, pcm_data_length, sample_rate):
-    """Writes the WAV header to a stream."""
-    stream.write(b'RIFF')
-    stream.write((pcm_data_length + 36).to_bytes(4, 'little'))
-    stream.write(b'WAVE')
-    stream.write(b'fmt ')
-    stream.write((16).to_bytes(4, 'little'))
-    stream.write((1).to_bytes(2, 'little'))
-    stream.write((1).to_bytes(2, 'little'))
-    stream.write(int(sample_rate).to_bytes(4, 'little'))
-    byte_rate = int(sample_rate) * 1 * (16 // 8)
-    stream.write(int(byte_rate).to_bytes(4, 'little'))
-    block_align = 1 * (16 // 8)
-    stream.write(int(block_align).to_bytes(2, 'little'))
-    stream.write((16).to_bytes(2, 'little'))
-    stream.write(b'data')
-    stream.write(pcm_data_length.to_bytes(4, 'little'))
-
-def generate_tts_audio(text, output_path):
-    """Generate TTS audio using pyttsx3 (offline TTS)."""
+def generate_tts_audio(text, output_path, fallbacks=None):
+    """Generate TTS audio using pyttsx3 (offline TTS).
+
+    Silent placeholder audio adds 'tts' to the `fallbacks` set.
+    """
     try:
         print(f"[INFO] TTS Request: Converting {len(text)} characters to speech...")
-        
-        # Initialize the TTS engine
-        engine = pyttsx3.init()
-        
-        # Configure voice properties
-        voices = engine.getProperty('voices')
-        if voices:
-            # Try to use a female voice if available
-            for voice in voices:
-                if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
-                    engine.setProperty('voice', voice.id)
-                    break
-        
-        # Set speech rate and volume
-        engine.setProperty('rate', 150)  # Speed of speech
-        engine.setProperty('volume', 0.9)  # Volume level (0.0 to 1.0)
-        
         # Generate output file path
         output_wav_path = output_path.replace('.mp3', '.wav')
-        
-        # Save to file
-        engine.save_to_file(text, output_wav_path)
-        engine.runAndWait()
-        
-        # Check if file was created successfully
-        if not os.path.exists(output_wav_path):
-            raise Exception("TTS audio file was not created")
+        with tts.engine_session() as engine:
+            tts.speak(engine, text, output_wav_path)
         
         print(f"[SUCCESS] Generated TTS audio: {output_wav_path}")
-        return f'/{UPLOAD_FOLDER}/{os.path.basename(output_wav_path)}'
+        return _artifact_url(output_wav_path)
         
     except Exception as e:
         print(f"[ERROR] TTS generation error: {e}")
         # Fallback: create a simple audio file
+        metrics.record_fallback('tts_silence')
+        if fallbacks is not None:
+            fallbacks.add('tts')
         try:
             print("[INFO] Using fallback audio generation...")
             sample_rate = 24000
@@ -498,43 +722,112 @@ def generate_tts_audio(text, output_path):
             
             output_wav_path = output_path.replace('.mp3', '.wav')
             with open(output_wav_path, 'wb') as f:
-                write_wav_header(f, len(silence_data), sample_rate)
+                audio.write_wav_header(f, len(silence_data), sample_rate)
                 f.write(silence_data)
             
             print(f"[SUCCESS] Generated fallback audio: {output_wav_path}")
-            return f'/{UPLOAD_FOLDER}/{os.path.basename(output_wav_path)}'
+            return _artifact_url(output_wav_path)
         except Exception as fallback_error:
             print(f"[ERROR] Fallback TTS also failed: {fallback_error}")
             raise Exception(f"TTS generation failed: {e}")
 
-def save_text_summary(text: str, job_id: str) -> str:
-    folder = _get_user_folder()
+def _artifact_url(path: str, publish: bool = True) -> str:
+    """URL for a finished output file, handing it to artifact storage first."""
+    store = storage.get_storage(UPLOAD_FOLDER)
+    key = store.key_for(path)
+    if key is None:
+        # Working files (batch outputs) are served from /uploads/<path>
+        return f"/{os.path.relpath(path).replace('\\', '/')}"
+    if publish:
+        store.publish(path)
+    return f"/artifacts/{key}"
+
+def _artifact_exists(url: str, folder: str) -> bool:
+    """Whether the file behind an artifact, chunk-page or /uploads URL is still there."""
+    if url.startswith('/artifacts/'):
+        return storage.get_storage(UPLOAD_FOLDER).exists(url[len('/artifacts/'):])
+    if url.startswith('/api/jobs/'):
+        path = _chunk_pages_path(url.split('/')[3], folder)
+        return bool(path) and os.path.exists(path)
+    return os.path.exists(url.lstrip('/'))
+
+def save_text_summary(text: str, job_id: str, folder: str = None) -> str:
+    folder = folder or _get_user_folder()
     path = os.path.join(folder, f"{job_id}_summary.txt")
     with open(path, 'w', encoding='utf-8') as f:
         f.write(text)
-    # static route available via send_from_directory at '/<path>'
-    return f"/{os.path.relpath(path).replace('\\', '/')}"
+    return _artifact_url(path)
+
+def save_chunk_summaries(chunk_summaries, job_id: str, folder: str = None) -> str:
+    folder = folder or _get_user_folder()
+    path = os.path.join(folder, f"{job_id}_chunks.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(list(chunk_summaries), f)
+    return _artifact_url(path)
 
-def save_pdf_summary(text: str, job_id: str) -> str:
-    folder = _get_user_folder()
+def _chunk_pages_path(job_id: str, folder: str = None):
+    """Where a job's chunk summaries are kept for paging; None for a malformed id."""
+    import uuid
+    try:
+        job_id = str(uuid.UUID(job_id))
+    except ValueError:
+        return None
+    return os.path.join(folder or _get_user_folder(), 'chunk_summaries', f"{job_id}.jsonl")
+
+def save_chunk_summary_pages(chunk_summaries, job_id: str, folder: str = None) -> str:
+    """Store chunk summaries one per line for /api/jobs/<job_id>/chunk-summaries."""
+    path = _chunk_pages_path(job_id, folder)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        for summary in chunk_summaries:
+            f.write(json.dumps(summary) + "\n")
+    os.replace(path + '.tmp', path)
+    return f"/api/jobs/{job_id}/chunk-summaries"
+
+def save_pdf_summary(text: str, job_id: str, folder: str = None, background: bool = False,
+                     timings: dict = None) -> str:
+    """Write the paginated summary PDF, on the background writer thread if asked."""
+    folder = folder or _get_user_folder()
     path = os.path.join(folder, f"{job_id}_summary.pdf")
-    doc = fitz.open()
-    page = doc.new_page()
-    rect = fitz.Rect(36, 36, 559, 806)
-    page.insert_textbox(rect, text, fontsize=11, lineheight=1.2)
-    doc.save(path)
-    doc.close()
-    return f"/{os.path.relpath(path).replace('\\', '/')}"
+    if background:
+        pdf_writer.write_summary_pdf_background(text, path, then=storage.get_storage(UPLOAD_FOLDER).publish)
+        return _artifact_url(path, publish=False)
+    pdf_writer.write_summary_pdf(text, path, timings)
+    return _artifact_url(path)
 
 # --- Flask Routes ---
 
-@app.route('/')
-def serve_index():
-    return send_from_directory('.', 'index.html')
-
-@app.route('/<path:filename>')
-def serve_static(filename):
-    return send_from_directory('.', filename)
+@app.route('/artifacts/<path:key>')
+def serve_artifact(key):
+    store = storage.get_storage(UPLOAD_FOLDER)
+    if key.endswith('_summary.pdf') and not store.exists(key):
+        _finish_summary_pdf(store, key)
+    return store.response(key)
+
+def _finish_summary_pdf(store, key: str) -> None:
+    """Make a summary PDF that isn't there yet: wait for its background write,
+    or rebuild it from the summary text if that write was lost or failed."""
+    path = os.path.join(UPLOAD_FOLDER, key)
+    if store.key_for(path) != key:
+        return
+    if pdf_writer.wait_pending(path, timeout=60) and store.exists(key):
+        return
+    # Read through the backend: in s3 mode the local text file is already gone
+    data = store.read(key[:-len('_summary.pdf')] + '_summary.txt')
+    if data is None:
+        return
+    text = data.decode('utf-8')
+    print(f"[INFO] Rebuilding missing summary PDF {key}")
+    pdf_writer.write_summary_pdf(text, path)
+    store.publish(path)
+
+@app.after_request
+def _compress_response(response):
+    return http_compression.compress_response(response, request.headers.get('Accept-Encoding', ''))
+
+@app.before_request
+def _start_background_tasks():
+    storage.ensure_gc_running()
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -560,6 +853,76 @@ def me():
 def status(job_id):
     return jsonify(progress_store.get(job_id, {"status": "unknown", "detail": ""}))
 
+@app.route('/api/status/<job_id>/events', methods=['GET'])
+def status_events(job_id):
+    """Stream the job's progress as server-sent events until it finishes.
+
+    Progress is kept per worker process: for a job this worker does not know
+    the stream sends one "unknown" event and ends instead of holding a
+    thread until STATUS_STREAM_SECONDS.
+    """
+    def stream():
+        last = None
+        deadline = time.time() + STATUS_STREAM_SECONDS
+        while time.time() < deadline:
+            state = progress_store.get(job_id, {"status": "unknown", "detail": ""})
+            if state != last:
+                yield f"data: {json.dumps(state)}\n\n"
+                last = state
+            if state["status"] in FINAL_STATUSES or state["status"] == 'unknown':
+                return
+            time.sleep(0.5)
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/jobs/<job_id>/chunk-summaries', methods=['GET'])
+def chunk_summaries_page(job_id):
+    """One page of a finished job's chunk summaries: ?offset=0&limit=20 (max 100)."""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({"error": "offset must be >= 0 and limit >= 1"}), 400
+    limit = min(100, limit)
+    path = _chunk_pages_path(job_id)
+    if not path or not os.path.exists(path):
+        return jsonify({"error": "Unknown job"}), 404
+    items, total = [], 0
+    with open(path, encoding='utf-8') as f:
+        for total, line in enumerate(f, 1):
+            if offset < total <= offset + limit:
+                items.append({"index": total - 1, "summary": json.loads(line)})
+    next_url = None
+    if offset + limit < total:
+        next_url = f"/api/jobs/{job_id}/chunk-summaries?offset={offset + limit}&limit={limit}"
+    return jsonify({"jobId": job_id, "total": total, "offset": offset, "limit": limit,
+                    "items": items, "next": next_url})
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/outline', methods=['POST'])
+def pdf_outline():
+    """Page count and outline sections of an uploaded PDF, for choosing `sections`."""
+    pdf_file = request.files.get('pdfFile')
+    if not pdf_file or not pdf_file.filename.endswith('.pdf'):
+        return jsonify({"error": "Upload a PDF as pdfFile"}), 400
+    import fitz  # PyMuPDF
+    data = pdf_file.read()
+    with pdf_lock.lock:
+        try:
+            doc = fitz.open(stream=data, filetype='pdf')
+        except Exception as e:
+            return jsonify({"error": f"Unable to open PDF: {e}"}), 400
+        try:
+            page_count, sections = len(doc), outline.get_outline(doc)
+        finally:
+            doc.close()
+    return jsonify({"pageCount": page_count, "sections": sections})
+
 @app.route('/api/process-pdf', methods=['POST'])
 def process_pdf():
     if 'pdfFile' not in request.files:
@@ -571,88 +934,518 @@ def process_pdf():
         return jsonify({"error": "No selected file"}), 400
     
     if pdf_file and pdf_file.filename.endswith('.pdf'):
-        temp_file_path = os.path.join(UPLOAD_FOLDER, pdf_file.filename)
-        pdf_file.save(temp_file_path)
+        temp_file_path = _save_upload(pdf_file)
         # Default medium length (~1000 words) now that dropdown is removed
         length_choice = 'medium'
-        min_words, max_words = _get_summary_targets(length_choice)
+        pages_spec = (request.form.get('pages') or '').strip()
+        section_ids = (request.form.get('sections') or '').strip()
+        try:
+            pages, total_pages = _select_pages(temp_file_path, pages_spec, section_ids)
+        except ValueError as e:
+            os.remove(temp_file_path)
+            return jsonify({"error": str(e)}), 400
         import uuid
         job_id = str(uuid.uuid4())
-        _update_progress(job_id, 'received', 'PDF uploaded')
+        checkpoint = None
+        if checkpoints.CHECKPOINTS_ENABLED:
+            # A retried upload of the same PDF maps to the same job directory.
+            selection = (pages_spec, section_ids) if pages is not None else ()
+            key = checkpoints.job_key(temp_file_path, length_choice, *selection)
+            checkpoint = checkpoints.JobCheckpoint(os.path.join(_get_user_folder(), 'jobs', key))
+            if not checkpoint.claim():
+                # The same upload is running in another request; it owns the job directory.
+                os.remove(temp_file_path)
+                response = jsonify({"error": "This PDF is already being processed; retry shortly",
+                                    "jobId": checkpoint.job_id, "retryAfter": 10})
+                response.headers['Retry-After'] = '10'
+                return response, 409
 
+        lease = None
+        try:
+            if checkpoint:
+                checkpoint.start(job_id)
+                job_id = checkpoint.job_id
+                # Storage GC leaves the checkpoint (and its artifacts) alone while this request uses it
+                lease = storage.take_lease(checkpoint.job_dir)
+            if _checkpointed_result(checkpoint, _get_user_folder()) is not None:
+                # Finished earlier; no need to wait for a slot to return it.
+                body, status_code = _run_pdf_job(temp_file_path, job_id, length_choice, checkpoint=checkpoint)
+                return jsonify(_select_fields(body) if status_code == 200 else body), status_code
+
+            user_id = session.get('user_id', 'anonymous')
+            cost = scheduler.estimate_cost(temp_file_path, pages=pages)
+            _update_progress(job_id, 'queued', 'Waiting for a free processing slot')
+            try:
+                with scheduler.get_scheduler().slot(user_id, cost) as queued_seconds:
+                    metrics.observe_stage('queue_wait', queued_seconds)
+                    try:
+                        body, status_code = _run_profiled_job(temp_file_path, job_id, length_choice, checkpoint, pages)
+                    except Exception as e:
+                        _update_progress(job_id, 'error', str(e))
+                        raise
+            except scheduler.QueueFull as e:
+                if os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+                metrics.inc('pdf2podcast_rejected_jobs_total')
+                _update_progress(job_id, 'rejected', str(e))
+                print(f"[WARN] Rejected job for user {user_id}: {e} (retry after {e.retry_after}s)")
+                response = jsonify({"error": str(e), "retryAfter": e.retry_after})
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response, 429
+            body.setdefault("timings", {})["queue_wait"] = round(queued_seconds, 4)
+            if pages is not None and status_code == 200:
+                body["selection"] = {"pages": pages_spec, "sections": section_ids,
+                                     "selectedPages": len(pages), "totalPages": total_pages}
+            return jsonify(_select_fields(body) if status_code == 200 else body), status_code
+        finally:
+            if lease:
+                storage.drop_lease(lease)
+            if checkpoint:
+                checkpoint.release()
+
+    else:
+        return jsonify({"error": "Invalid file type, only PDF files are allowed."}), 400
+
+def _save_upload(pdf_file) -> str:
+    """Save an uploaded PDF under a name no other upload can take; returns its path.
+
+    Jobs may wait in the scheduler queue before reading their input, so two
+    uploads of "report.pdf" must not share a file.
+    """
+    import uuid
+    from werkzeug.utils import secure_filename
+    name = secure_filename(pdf_file.filename) or 'document.pdf'
+    path = os.path.join(UPLOAD_FOLDER, f"{uuid.uuid4().hex}_{name}")
+    pdf_file.save(path)
+    return path
+
+def _upload_name(path: str) -> str:
+    """The client's file name for a path from _save_upload (other paths unchanged)."""
+    import re
+    return re.sub(r"^[0-9a-f]{32}_", "", os.path.basename(path))
+
+def _select_fields(body: dict) -> dict:
+    """Only the top-level keys listed in `fields` (?fields=audioUrl,summary), else all."""
+    spec = (request.values.get('fields') or '').strip()
+    if not spec:
+        return body
+    wanted = {name.strip() for name in spec.split(',')}
+    return {key: value for key, value in body.items() if key in wanted}
+
+def _select_pages(pdf_path, pages_spec, section_ids):
+    """(selected 0-based pages or None for all, total page count); ValueError if invalid."""
+    import fitz  # PyMuPDF
+    with pdf_lock.lock:
+        try:
+            doc = fitz.open(pdf_path)
+        except Exception as e:
+            raise ValueError(f"Unable to open PDF: {e}")
+        try:
+            return outline.select_pages(doc, pages_spec, section_ids), len(doc)
+        finally:
+            doc.close()
+
+def _run_profiled_job(temp_file_path, job_id, length_choice, checkpoint, pages=None):
+    """_run_pdf_job, under cProfile when the request asked for a profile.
+
+    Only one job per process is profiled at a time; others run unprofiled.
+    """
+    requested = profiling.is_requested(request)
+    profiler = profiling.JobProfiler(job_id) if requested else None
+    if profiler and not profiler.start():
+        profiler = None
+    try:
+        body, status_code = _run_pdf_job(temp_file_path, job_id, length_choice, checkpoint=checkpoint,
+                                         defer_pdf=PDF_WRITE_ASYNC, pages=pages)
+    finally:
+        if profiler:
+            paths = profiler.save(_get_user_folder())
+            profile_urls = {kind: _artifact_url(path) for kind, path in paths.items()}
+    if profiler:
+        body["profile"] = profile_urls
+    elif requested:
+        body["profile"] = {"skipped": "Profiling is busy in this worker; try again later"}
+    return body, status_code
+
+# Response fields pointing at files the finished job wrote.
+_RESULT_URL_FIELDS = ('audioUrl', 'textUrl', 'pdfUrl', 'chunkSummariesUrl', 'chunkSummariesPages')
+
+def _checkpointed_result(checkpoint, folder: str):
+    """A finished job's stored response body, or None.
+
+    If a file the result links to is gone (storage GC, a lost volume), the
+    result is dropped and the checkpoint steps back to its last intact
+    stage, so the job runs again and rebuilds its outputs.
+    """
+    if not checkpoint or not checkpoint.completed('done'):
+        return None
+    result = checkpoint.load_result()
+    if result:
+        missing = [field for field in _RESULT_URL_FIELDS
+                   if result.get(field) and not _artifact_exists(result[field], folder)]
+        if not missing:
+            return result
+        print(f"[WARN] Job {checkpoint.job_id}: {', '.join(missing)} no longer available; rebuilding outputs")
+    checkpoint.rewind(audio_present=_artifact_exists(checkpoint.get('audioUrl') or '', folder))
+    return None
+
+def _run_pdf_job(temp_file_path: str, job_id: str, length_choice: str,
+                 folder: str = None, audio_path: str = None, keep_input: bool = False,
+                 checkpoint=None, defer_pdf: bool = False, pages=None, track_revisions: bool = True):
+    """Run the extract → summarize → synthesize → TTS pipeline for one upload.
+
+    Artifacts go to `folder` (the session user's folder by default). The
+    input PDF is deleted afterwards unless keep_input is set (batch runs).
+    With a checkpoints.JobCheckpoint, each stage's output is saved as it
+    completes and stages already completed by an earlier attempt are skipped.
+    Output produced by a fallback (no model, failed model call, silent
+    audio) is never checkpointed, so a retry tries the real thing again.
+    With defer_pdf the summary PDF is written after this returns. `pages`
+    limits the job to those 0-based page indices. track_revisions=False
+    skips revision records (batch documents, whose folder is not a user's).
+    Returns (response_body, status_code).
+    """
+    def cleanup_input():
+        if not keep_input and os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+            print("[INFO] Cleaned up temporary files")
+
+    folder = folder or _get_user_folder()
+    audio_path = audio_path or os.path.join(folder, f"{job_id}_podcast.wav")
+    min_words, max_words = _get_summary_targets(length_choice)
+    timings = {}
+    fallbacks = set()  # stages that fell back to non-model output
+    tracker = None
+    _update_progress(job_id, 'received', 'PDF uploaded')
+
+    result = _checkpointed_result(checkpoint, folder)
+    if result:
+        print(f"[INFO] Job {job_id} already completed; returning checkpointed result")
+        cleanup_input()
+        _update_progress(job_id, 'done', 'Completed')
+        return result, 200
+
+    if checkpoint and checkpoint.completed('extract'):
+        print(f"[INFO] Resuming job {job_id} after stage '{checkpoint.stage}'")
+        # Bounded mode streams the stored chunks straight back to disk
+        chunks = checkpoint.load_chunks(text_store.SpilledTextList() if EXTRACT_MEMORY_LIMIT_MB else None)
+    else:
         # Prefer chunked extraction so we can summarize large docs progressively
         _update_progress(job_id, 'extracting', 'Extracting text and running OCR when needed')
-        chunks = extract_text_chunks_from_pdf(temp_file_path, pages_per_chunk=10)
-        # If chunking failed, fallback to whole-document extraction
+        with metrics.stage_timer('extract', timings):
+            if revisions.REVISIONS_ENABLED and track_revisions:
+                tracker = revisions.open_tracker(folder, _upload_name(temp_file_path))
+            try:
+                chunks = extract_text_chunks_from_pdf(temp_file_path, pages_per_chunk=10, pages=pages,
+                                                      tracker=tracker)
+            except BaseException:
+                if tracker:
+                    tracker.close()
+                raise
+            # If chunking failed, fallback to whole-document extraction
+            whole_text = None
+            if not chunks and pages is None:
+                metrics.record_fallback('whole_document_extraction')
+                whole_text = extract_text_from_pdf(temp_file_path)
+        if tracker and tracker.previous:
+            print(f"[INFO] {tracker.unchanged_pages()} page(s) unchanged since {tracker.previous_name}")
         if not chunks:
-            whole_text = extract_text_from_pdf(temp_file_path)
+            if tracker:
+                tracker.close()
+            tracker = None
             if not whole_text or len(whole_text.strip()) < 50:
-                if os.path.exists(temp_file_path):
-                    os.remove(temp_file_path)
-                return jsonify({
+                cleanup_input()
+                metrics.inc('pdf2podcast_jobs_total', {'status': 'no_text'})
+                _update_progress(job_id, 'error', 'Could not extract sufficient text from PDF')
+                return {
                     "error": "Could not extract sufficient text from PDF.",
                     "hint": "If your PDF is scanned/image-based, install Tesseract OCR and set TESSERACT_CMD env to its binary path."
-                }), 400
+                }, 400
             chunks = [whole_text]
+        if checkpoint:
+            checkpoint.save_chunks(chunks)
 
-        try:
-            # Summarize each chunk
-            print(f"[INFO] Summarizing {len(chunks)} chunk(s)...")
-            _update_progress(job_id, 'summarizing', f'Summarizing {len(chunks)} chunk(s)')
-            chunk_summaries = []
-            for idx, chunk_text in enumerate(chunks):
-                cs = generate_summary_for_chunk(chunk_text, chunk_index=idx, total_chunks=len(chunks))
-                chunk_summaries.append(cs)
-
-            # Synthesize final long summary
+    audio_url = None
+    try:
+        # Summarize each chunk
+        if checkpoint and checkpoint.completed('synthesis'):
+            final_summary = checkpoint.load_synthesis()
+            done = checkpoint.load_summaries()
+            chunk_summaries = [done.get(i, "") for i in range(len(chunks))]
+        else:
+            done = checkpoint.load_summaries() if checkpoint else {}
+            if tracker and tracker.previous:
+                # Chunks unchanged since the previous version keep their summaries
+                for i, summary in tracker.reused_summaries().items():
+                    if i not in done:
+                        done[i] = summary
+                        if checkpoint:
+                            checkpoint.add_summary(i, summary)
+                print(f"[INFO] Reusing {tracker.reused_chunks} chunk summary(ies) from {tracker.previous_name}")
+
+            def on_result(i, summary):
+                if checkpoint:
+                    checkpoint.add_summary(i, summary)
+                if tracker:
+                    tracker.add_summary(i, summary)
+
+            print(f"[INFO] Summarizing {len(chunks) - len(done)} of {len(chunks)} chunk(s)...")
+            _update_progress(job_id, 'summarizing', f'Summarizing {len(chunks) - len(done)} chunk(s)')
+            with metrics.stage_timer('summarize', timings):
+                chunk_summaries = generate_summaries_for_chunks(chunks, done=done, on_result=on_result,
+                                                                fallbacks=fallbacks)
+            if checkpoint:
+                checkpoint.mark('summarize')
+            if tracker:
+                tracker.save()
+
+            # Synthesize final long summary, speaking sentences as they stream in
             print("[INFO] Generating final synthesis...")
             _update_progress(job_id, 'synthesizing', 'Combining chunk summaries')
-            final_summary = generate_final_summary_from_chunks(
-                chunk_summaries,
-                target_min_words=min_words,
-                target_max_words=max_words,
-                source_chunks=chunks
-            )
-
+            speech = tts.SpeechPipeline(audio_path) if TTS_PIPELINE else None
+            try:
+                with metrics.stage_timer('synthesis', timings):
+                    final_summary = generate_final_summary_from_chunks(
+                        chunk_summaries,
+                        target_min_words=min_words,
+                        target_max_words=max_words,
+                        source_chunks=chunks,
+                        on_text=speech.feed if speech else None,
+                        fallbacks=fallbacks
+                    )
+                if checkpoint and not fallbacks:
+                    checkpoint.save_synthesis(final_summary)
+                if speech:
+                    _update_progress(job_id, 'audio', 'Finishing audio')
+                    with metrics.stage_timer('tts', timings):
+                        if speech.finish(final_summary):
+                            audio_url = _artifact_url(audio_path)
+                            if checkpoint and not fallbacks:
+                                checkpoint.mark('audio', audioPath=audio_path, audioUrl=audio_url)
+            finally:
+                if speech:
+                    speech.cancel()
+
+        if checkpoint and checkpoint.completed('audio') and _artifact_exists(checkpoint.get('audioUrl') or '', folder):
+            audio_url = checkpoint.get('audioUrl')
+        elif audio_url is None:
             print("[INFO] Generating audio...")
             _update_progress(job_id, 'audio', 'Generating audio file')
-            audio_url = generate_tts_audio(final_summary, TEMP_AUDIO_PATH)
-
-            text_url = save_text_summary(final_summary, job_id)
-            pdf_url = save_pdf_summary(final_summary, job_id)
-
-            # Clean up temporary PDF file
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-                print("[INFO] Cleaned up temporary files")
-
-            print("[SUCCESS] Processing completed successfully")
-            _update_progress(job_id, 'done', 'Completed')
-            return jsonify({
-                "summary": final_summary,
-                "chunkSummaries": chunk_summaries,
-                "audioUrl": audio_url,
-                "textUrl": text_url,
-                "pdfUrl": pdf_url,
-                "jobId": job_id,
-                "length": {
-                    "choice": length_choice,
-                    "targetMin": min_words,
-                    "targetMax": max_words
-                }
-            })
+            with metrics.stage_timer('tts', timings):
+                audio_url = generate_tts_audio(final_summary, audio_path, fallbacks=fallbacks)
+            if checkpoint and not fallbacks:
+                checkpoint.mark('audio', audioPath=audio_path, audioUrl=audio_url)
+
+        with metrics.stage_timer('save_artifacts', timings):
+            chunk_pages_url = save_chunk_summary_pages(chunk_summaries, job_id, folder)
+            text_url = save_text_summary(final_summary, job_id, folder)
+            pdf_url = save_pdf_summary(final_summary, job_id, folder, background=defer_pdf, timings=timings)
+
+        # Clean up temporary PDF file
+        cleanup_input()
+
+        print("[SUCCESS] Processing completed successfully")
+        _update_progress(job_id, 'done', 'Completed')
+        metrics.inc('pdf2podcast_jobs_total', {'status': 'done'})
+        body = {
+            "summary": final_summary,
+            "chunkSummaries": chunk_summaries,
+            "chunkSummariesPages": chunk_pages_url,
+            "chunkCount": len(chunk_summaries),
+            "audioUrl": audio_url,
+            "textUrl": text_url,
+            "pdfUrl": pdf_url,
+            "jobId": job_id,
+            "length": {
+                "choice": length_choice,
+                "targetMin": min_words,
+                "targetMax": max_words
+            },
+            "timings": timings
+        }
+        if tracker and tracker.previous:
+            body["revision"] = {
+                "previous": tracker.previous_name,
+                "unchangedPages": tracker.unchanged_pages(),
+                "reusedChunks": tracker.reused_chunks,
+            }
+        if EXTRACT_MEMORY_LIMIT_MB:
+            # Bounded mode keeps the response small: chunk summaries go to a file.
+            body["chunkSummariesUrl"] = save_chunk_summaries(body.pop("chunkSummaries"), job_id, folder)
+        if fallbacks:
+            body["fallbacks"] = sorted(fallbacks)
+            print(f"[WARN] Job {job_id} used fallbacks for {', '.join(sorted(fallbacks))}; result not checkpointed")
+        elif checkpoint and defer_pdf:
+            # The result links the PDF, so it is stored once the file exists
+            import copy
+            result = copy.deepcopy(body)
+            pdf_writer.when_written(os.path.join(folder, f"{job_id}_summary.pdf"),
+                                    lambda: checkpoint.save_result(result),
+                                    exists=lambda: _artifact_exists(pdf_url, folder))
+        elif checkpoint:
+            checkpoint.save_result(body)
+        return body, 200
 
+    except Exception as e:
+        print(f"[ERROR] Processing failed: {e}")
+        metrics.inc('pdf2podcast_jobs_total', {'status': 'error'})
+        _update_progress(job_id, 'error', str(e))
+        # Clean up on error
+        cleanup_input()
+        return {"error": str(e)}, 500
+    finally:
+        if isinstance(chunks, text_store.SpilledTextList):
+            chunks.close()
+        if tracker:
+            tracker.close()  # already closed by save() when the job got that far
+
+# --- Batch processing ---
+# One bounded document pool shared by every batch; each document also takes
+# a scheduler slot, so batches obey the same global and per-user limits as
+# single uploads. Whether a batch runs is kept on disk (batch.claim), so
+# every worker process sees it.
+_batch_pool = None
+_batch_runners = None
+_batch_pool_lock = threading.Lock()
+_batch_capacity = threading.BoundedSemaphore(BATCH_MAX_RUNNING)
+
+def _batch_dir(batch_id: str, user_id: str = None):
+    import uuid
+    try:
+        batch_id = str(uuid.UUID(batch_id))
+    except ValueError:
+        return None
+    folder = os.path.join(UPLOAD_FOLDER, user_id) if user_id else _get_user_folder()
+    return os.path.join(folder, 'batches', batch_id)
+
+def _user_batch_running(user_id: str) -> bool:
+    import glob
+    import batch
+    return any(batch.is_running(os.path.join(d, 'outputs'))
+               for d in glob.glob(os.path.join(UPLOAD_FOLDER, user_id, 'batches', '*')))
+
+def _batch_slot(user_id: str):
+    """Context-manager factory running one batch document in a scheduler slot."""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def slot(path):
+        cost = scheduler.estimate_cost(path)
+        while True:
+            try:
+                with scheduler.get_scheduler().slot(user_id, cost) as queued_seconds:
+                    metrics.observe_stage('queue_wait', queued_seconds)
+                    yield
+                return
+            except scheduler.QueueFull as e:
+                # Batch documents wait for room instead of failing
+                time.sleep(e.retry_after)
+
+    return slot
+
+def _start_batch(batch_id: str, batch_dir: str, length_choice: str, user_id: str):
+    """Run a batch in the background; returns None, or (error, status) if it can't start now."""
+    global _batch_pool, _batch_runners
+    from concurrent.futures import ThreadPoolExecutor
+    import batch
+    output_dir = os.path.join(batch_dir, 'outputs')
+    if not _batch_capacity.acquire(blocking=False):
+        return "Too many batches are running; try again later", 429
+    if not batch.claim(output_dir):
+        _batch_capacity.release()
+        return "Batch is already running", 409
+    with _batch_pool_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch-doc')
+            _batch_runners = ThreadPoolExecutor(max_workers=BATCH_MAX_RUNNING, thread_name_prefix='batch')
+    lease = None
+
+    def release():
+        if lease:
+            storage.drop_lease(lease)
+        batch.release(output_dir)
+        _batch_capacity.release()
+
+    def run():
+        try:
+            batch.run_batch(inputs, output_dir, length_choice=length_choice,
+                            executor=_batch_pool, slot=_batch_slot(user_id))
         except Exception as e:
-            print(f"[ERROR] Processing failed: {e}")
-            # Clean up on error
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            return jsonify({"error": str(e)}), 500
+            print(f"[ERROR] Batch {batch_id} failed: {e}")
+        finally:
+            release()
 
-    else:
+    try:
+        lease = storage.take_lease(batch_dir)  # keeps storage GC out while it runs
+        inputs = batch.discover_inputs(os.path.join(batch_dir, 'inputs'))
+        batch.prepare_batch(inputs, output_dir, length_choice)
+        info = batch.batch_status(output_dir)
+        _batch_runners.submit(run)
+    except Exception:
+        release()  # the slot and the claim must not outlive a batch that never started
+        raise
+    print(f"[INFO] Started batch {batch_id} ({len(inputs)} PDF(s), {info['done']} already done)")
+    return None
+
+@app.route('/api/process-batch', methods=['POST'])
+def process_batch():
+    pdf_files = [f for f in request.files.getlist('pdfFiles') if f and f.filename]
+    if not pdf_files:
+        return jsonify({"error": "No files in the request (use the 'pdfFiles' field)"}), 400
+    if not all(f.filename.endswith('.pdf') for f in pdf_files):
         return jsonify({"error": "Invalid file type, only PDF files are allowed."}), 400
 
-@app.route(f'/{UPLOAD_FOLDER}/<filename>')
+    user_id = session.get('user_id', 'anonymous')
+    if _user_batch_running(user_id):
+        return jsonify({"error": "You already have a batch running"}), 429
+
+    import uuid
+    from werkzeug.utils import secure_filename
+    batch_id = str(uuid.uuid4())
+    batch_dir = _batch_dir(batch_id, user_id)
+    inputs_dir = os.path.join(batch_dir, 'inputs')
+    os.makedirs(inputs_dir, exist_ok=True)
+    for index, pdf_file in enumerate(pdf_files):
+        name = secure_filename(pdf_file.filename) or 'document.pdf'
+        pdf_file.save(os.path.join(inputs_dir, f"{index:04d}_{name}"))
+
+    length_choice = (request.form.get('length') or 'medium').lower()
+    refused = _start_batch(batch_id, batch_dir, length_choice, user_id)
+    if refused:
+        import shutil
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({"error": refused[0]}), refused[1]
+    return jsonify({
+        "batchId": batch_id,
+        "documents": len(pdf_files),
+        "statusUrl": f"/api/batch/{batch_id}"
+    }), 202
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    import batch
+    batch_dir = _batch_dir(batch_id)
+    info = batch.batch_status(os.path.join(batch_dir, 'outputs')) if batch_dir else None
+    if info is None:
+        return jsonify({"error": "Unknown batch"}), 404
+    return jsonify(info)
+
+@app.route('/api/batch/<batch_id>/resume', methods=['POST'])
+def resume_batch(batch_id):
+    import batch
+    batch_dir = _batch_dir(batch_id)
+    if not batch_dir or not os.path.isdir(os.path.join(batch_dir, 'inputs')):
+        return jsonify({"error": "Unknown batch"}), 404
+    user_id = session.get('user_id', 'anonymous')
+    if not batch.is_running(os.path.join(batch_dir, 'outputs')) and _user_batch_running(user_id):
+        return jsonify({"error": "You already have a batch running"}), 429
+    length_choice = (request.form.get('length') or 'medium').lower()
+    refused = _start_batch(batch_id, batch_dir, length_choice, user_id)
+    if refused:
+        return jsonify({"error": refused[0]}), refused[1]
+    return jsonify({"batchId": batch_id, "statusUrl": f"/api/batch/{batch_id}"}), 202
+
+@app.route(f'/{UPLOAD_FOLDER}/<path:filename>')
 def serve_audio(filename):
     return send_from_directory(UPLOAD_FOLDER, filename)
 
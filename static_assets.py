@@ -0,0 +1,198 @@
+"""
+Static front-end assets for PDF to Podcast Generator.
+
+index.html, app.js and styles.css are built into STATIC_DIR:
+
+- app.js and styles.css get content-hashed names (/assets/app.<hash>.js)
+  and index.html is rewritten to reference them;
+- every file is stored precompressed next to the original: .gz always,
+  .br when the `brotli` package is installed.
+
+StaticAssets is WSGI middleware in front of Flask. It answers GET/HEAD for
+the built files without routing, sessions or before_request hooks:
+
+- the encoding comes from Accept-Encoding (br, then gzip, then identity);
+- hashed assets are cached for a year as immutable;
+- index.html and the legacy /app.js and /styles.css URLs are revalidated
+  (no-cache with an ETag, 304 when unchanged);
+- bodies go out through wsgi.file_wrapper (sendfile under gunicorn).
+
+Only files in the build manifest are served; nothing else from the project
+directory is reachable. Behind nginx or a CDN, STATIC_DIR can be served
+directly (gzip_static / brotli_static) so these requests never reach
+gunicorn at all.
+
+The build runs on startup when the sources changed since the last one, or
+ahead of time with `python static_assets.py`.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import http_compression
+
+STATIC_DIR = os.environ.get('STATIC_DIR', 'static_build')
+
+INDEX = 'index.html'
+HASHED_SOURCES = ('app.js', 'styles.css')
+MANIFEST = 'manifest.json'
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+_TYPES = {
+    '.html': 'text/html; charset=utf-8',
+    '.js': 'text/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+}
+_REFERENCE = re.compile(r'''((?:href|src)=["'])/?(%s)(["'])''' % '|'.join(re.escape(n) for n in HASHED_SOURCES))
+
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _compressed(data: bytes) -> dict:
+    """Precompressed variants worth keeping, by Content-Encoding."""
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        variants['br'] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    return {enc: body for enc, body in variants.items() if len(body) < len(data)}
+
+
+def _source_hashes(src_root: str) -> dict:
+    hashes = {}
+    for name in (INDEX,) + HASHED_SOURCES:
+        with open(os.path.join(src_root, name), 'rb') as f:
+            hashes[name] = _digest(f.read())
+    return hashes
+
+
+def build(src_root: str = '.', out_dir: str = STATIC_DIR) -> dict:
+    """Write hashed, precompressed assets to out_dir; returns the manifest.
+
+    The manifest maps URL paths to {'file', 'type', 'cache', 'etag',
+    'encodings'}; it is also saved as out_dir/manifest.json.
+    """
+    os.makedirs(os.path.join(out_dir, 'assets'), exist_ok=True)
+    routes, renamed = {}, {}
+
+    def add(urls, rel_path, data, cache):
+        _write_atomic(os.path.join(out_dir, rel_path), data)
+        variants = _compressed(data)
+        for encoding, body in variants.items():
+            _write_atomic(os.path.join(out_dir, rel_path + ('.br' if encoding == 'br' else '.gz')), body)
+        entry = {
+            'file': rel_path,
+            'type': _TYPES.get(os.path.splitext(rel_path)[1], 'application/octet-stream'),
+            'cache': cache,
+            'etag': _digest(data)[:16],
+            'encodings': sorted(variants, key=lambda e: e != 'br'),  # br preferred
+        }
+        for url in urls:
+            routes[url] = entry
+
+    for name in HASHED_SOURCES:
+        with open(os.path.join(src_root, name), 'rb') as f:
+            data = f.read()
+        stem, ext = os.path.splitext(name)
+        hashed = f"assets/{stem}.{_digest(data)[:12]}{ext}"
+        renamed[name] = '/' + hashed
+        add(['/' + hashed], hashed, data, IMMUTABLE)
+        add(['/' + name], name, data, REVALIDATE)  # pages cached before the rename
+
+    with open(os.path.join(src_root, INDEX), 'rb') as f:
+        html = f.read().decode('utf-8')
+    html = _REFERENCE.sub(lambda m: m.group(1) + renamed[m.group(2)] + m.group(3), html)
+    add(['/', '/' + INDEX], INDEX, html.encode('utf-8'), REVALIDATE)
+
+    manifest = {'sources': _source_hashes(src_root), 'routes': routes}
+    _write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1).encode('utf-8'))
+    return manifest
+
+
+def load(src_root: str = '.', out_dir: str = STATIC_DIR):
+    """(manifest, out_dir) for serving, rebuilding if the sources changed.
+
+    Falls back to a temporary directory when out_dir is not writable.
+    """
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('sources') == _source_hashes(src_root):
+            return manifest, out_dir
+    except (OSError, ValueError):
+        pass
+    try:
+        manifest = build(src_root, out_dir)
+    except OSError as e:
+        fallback = tempfile.mkdtemp(prefix='pdf2podcast_static_')
+        print(f"[WARN] Cannot write static assets to {out_dir} ({e}); using {fallback}")
+        out_dir = fallback
+        manifest = build(src_root, out_dir)
+    print(f"[INFO] Built static assets in {out_dir}")
+    return manifest, out_dir
+
+
+class StaticAssets:
+    """WSGI middleware serving the built assets ahead of the Flask app."""
+
+    def __init__(self, app, manifest: dict, root: str):
+        self.app = app
+        self.routes = manifest['routes']
+        self.root = os.path.abspath(root)
+
+    def __call__(self, environ, start_response):
+        asset = self.routes.get(environ.get('PATH_INFO', ''))
+        method = environ.get('REQUEST_METHOD')
+        if asset is None or method not in ('GET', 'HEAD'):
+            return self.app(environ, start_response)
+
+        accepted = http_compression.accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = next((e for e in asset['encodings'] if e in accepted), None)
+        etag = f'"{asset["etag"]}{"-" + encoding if encoding else ""}"'
+        headers = [('Cache-Control', asset['cache']), ('ETag', etag), ('Vary', 'Accept-Encoding')]
+        if etag in environ.get('HTTP_IF_NONE_MATCH', ''):
+            start_response('304 Not Modified', headers)
+            return []
+
+        path = os.path.join(self.root, asset['file'])
+        if encoding:
+            path += '.br' if encoding == 'br' else '.gz'
+            headers.append(('Content-Encoding', encoding))
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            return self.app(environ, start_response)
+        headers += [('Content-Type', asset['type']), ('Content-Length', str(os.fstat(f.fileno()).st_size))]
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            f.close()
+            return []
+        from werkzeug.wsgi import FileWrapper
+        return environ.get('wsgi.file_wrapper', FileWrapper)(f, 1 << 16)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Build hashed, precompressed front-end assets.")
+    parser.add_argument('--src', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--out', default=STATIC_DIR)
+    args = parser.parse_args()
+    routes = build(args.src, args.out)['routes']
+    for url, entry in sorted(routes.items()):
+        print(f"{url:<32} {entry['file']:<32} {','.join(entry['encodings']) or '-'}")
@@ -0,0 +1,416 @@
+"""
+Artifact storage and disk cleanup for PDF to Podcast Generator.
+
+Artifacts are the files a job hands back to the user: the summary text and
+PDF, the audio, chunk summaries and profiles, written directly in
+`uploads/<user>/`. They are served from /artifacts/<user>/<file> by one of
+two backends (STORAGE_BACKEND):
+
+    local  files stay on disk (default)
+    s3     each artifact is uploaded to S3_BUCKET (under S3_PREFIX) when it is
+           complete and the local copy removed; S3_ENDPOINT_URL points at any
+           S3-compatible service (MinIO, moto server, ...)
+
+Code that needs a published artifact again goes through the backend
+(exists, read) rather than the local path, which is gone in s3 mode.
+
+Working state in subfolders (jobs/ checkpoints, batches/) always stays on
+local disk.
+
+A background thread in each worker deletes, every STORAGE_GC_INTERVAL
+seconds:
+
+- anything not used for ARTIFACT_MAX_AGE_HOURS;
+- a user's least recently used artifacts and working folders while they
+  use more than ARTIFACT_USER_QUOTA_MB.
+
+Serving a local artifact marks it as used. Items touched in the last few
+minutes are never removed, so a job's own outputs survive the quota pass.
+
+A job's checkpoint folder (jobs/<key>) and the artifacts its job wrote
+(<job id>_* and chunk_summaries/<job id>.jsonl) are one item: they are kept
+or removed together, so a finished checkpoint never points at deleted
+files. Folders holding a lease (take_lease) from a live process on this
+host, such as the checkpoint of a running or queued job or a running
+batch, are skipped.
+"""
+
+import json
+import mimetypes
+import os
+import shutil
+import threading
+import time
+import uuid
+
+import metrics
+
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local').strip().lower()
+S3_BUCKET = os.environ.get('S3_BUCKET', '')
+S3_PREFIX = os.environ.get('S3_PREFIX', 'pdf2podcast/').lstrip('/')
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None
+ARTIFACT_MAX_AGE_HOURS = float(os.environ.get('ARTIFACT_MAX_AGE_HOURS', '72') or 0)
+ARTIFACT_USER_QUOTA_MB = float(os.environ.get('ARTIFACT_USER_QUOTA_MB', '500') or 0)
+STORAGE_GC_INTERVAL = int(os.environ.get('STORAGE_GC_INTERVAL', '600') or 0)
+
+# Never collect items used this recently (seconds); protects running jobs.
+GC_GRACE_SECONDS = 300
+
+_LEASE_PREFIX = '.lease-'
+
+
+class Entry:
+    """One collectable item: an artifact or a working folder."""
+    __slots__ = ('key', 'user', 'size', 'last_used', 'remote', 'members')
+
+    def __init__(self, key, user, size, last_used, remote=False):
+        self.key = key
+        self.user = user
+        self.size = size
+        self.last_used = last_used
+        self.remote = remote
+        self.members = []  # artifacts removed together with this item
+
+
+class LocalStorage:
+    """Artifacts stay in the uploads folder and are served from disk."""
+
+    name = 'local'
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def key_for(self, path: str):
+        """'<user>/<file>' for an artifact under root, else None."""
+        rel = os.path.relpath(os.path.abspath(path), self.root)
+        parts = rel.replace('\\', '/').split('/')
+        if len(parts) != 2 or parts[0] in ('', '.', '..'):
+            return None
+        return '/'.join(parts)
+
+    def publish(self, path: str) -> None:
+        pass
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(os.path.join(self.root, key))
+
+    def read(self, key: str):
+        """An artifact's bytes, or None if it is not there."""
+        try:
+            with open(os.path.join(self.root, key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def response(self, key: str):
+        from flask import send_from_directory
+        path = os.path.join(self.root, key)
+        if os.path.isfile(path):
+            try:
+                os.utime(path)  # mark as recently used for LRU
+            except OSError:
+                pass
+        return send_from_directory(self.root, key)
+
+    def entries(self):
+        """Artifacts, working folders and stray uploads under root."""
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path):
+                # An upload waiting for its job; only the age limit applies.
+                yield Entry(name, None, _size(path), os.path.getmtime(path))
+                continue
+            for item in os.listdir(path):
+                item_path = os.path.join(path, item)
+                if os.path.isfile(item_path):
+                    yield Entry(f"{name}/{item}", name, _size(item_path), os.path.getmtime(item_path))
+                else:
+                    for sub in os.listdir(item_path):
+                        sub_path = os.path.join(item_path, sub)
+                        yield Entry(f"{name}/{item}/{sub}", name, *_tree_usage(sub_path))
+
+    def delete(self, key: str) -> None:
+        path = os.path.join(self.root, key)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class S3Storage(LocalStorage):
+    """Artifacts are uploaded to an S3-compatible bucket and streamed back."""
+
+    name = 's3'
+
+    def __init__(self, root: str, bucket: str, prefix: str = S3_PREFIX, endpoint_url: str = S3_ENDPOINT_URL,
+                 client=None):
+        super().__init__(root)
+        if not bucket:
+            raise ValueError("S3_BUCKET is required when STORAGE_BACKEND=s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        if client is None:
+            import boto3
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+
+    def publish(self, path: str) -> None:
+        key = self.key_for(path)
+        if key is None or not os.path.exists(path):
+            return
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self.client.upload_file(path, self.bucket, self.prefix + key, ExtraArgs={'ContentType': content_type})
+        os.remove(path)
+
+    def exists(self, key: str) -> bool:
+        if super().exists(key):
+            return True  # not uploaded yet
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.ClientError:
+            return False
+        return True
+
+    def read(self, key: str):
+        data = super().read(key)
+        if data is not None:
+            return data  # not uploaded yet
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)['Body'].read()
+        except self.client.exceptions.NoSuchKey:
+            return None
+
+    def response(self, key: str):
+        from flask import Response, abort
+        if '..' in key.split('/'):
+            abort(404)
+        try:
+            obj = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except self.client.exceptions.NoSuchKey:
+            # Not uploaded yet (e.g. the PDF is still being written) or collected.
+            return super().response(key)
+        return Response(obj['Body'].iter_chunks(1 << 16), mimetype=obj.get('ContentType'),
+                        headers={'Content-Length': str(obj['ContentLength'])})
+
+    def entries(self):
+        yield from super().entries()
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix):
+            for obj in page.get('Contents', []):
+                key = obj['Key'][len(self.prefix):]
+                yield Entry(key, key.split('/')[0], obj['Size'], obj['LastModified'].timestamp(), remote=True)
+
+    def delete_remote(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _tree_usage(path):
+    """(total bytes, latest mtime) of a file or folder."""
+    if not os.path.isdir(path):
+        return _size(path), os.path.getmtime(path)
+    total, latest = 0, os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                st = os.stat(os.path.join(root, f))
+            except OSError:
+                continue
+            total += st.st_size
+            latest = max(latest, st.st_mtime)
+    return total, latest
+
+
+def take_lease(folder: str) -> str:
+    """Keep storage GC away from `folder` until drop_lease; returns the lease path."""
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{_LEASE_PREFIX}{os.getpid()}-{uuid.uuid4().hex}")
+    open(path, 'w').close()
+    return path
+
+
+def drop_lease(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def pid_alive(pid: int) -> bool:
+    """True if process `pid` exists on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def is_leased(folder: str) -> bool:
+    """True if a live process on this host holds a lease on `folder`."""
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return False
+    for name in names:
+        if name.startswith(_LEASE_PREFIX):
+            try:
+                if pid_alive(int(name[len(_LEASE_PREFIX):].split('-')[0])):
+                    return True
+            except ValueError:
+                continue
+    return False
+
+
+def _job_id(job_dir: str):
+    try:
+        with open(os.path.join(job_dir, 'job.json'), encoding='utf-8') as f:
+            return json.load(f).get('jobId')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _artifact_owner(entry):
+    """(user, job id) for an artifact named after its job, else None."""
+    parts = entry.key.split('/')
+    if len(parts) == 2 and '_' in parts[1]:
+        return parts[0], parts[1].split('_', 1)[0]
+    if len(parts) == 3 and parts[1] == 'chunk_summaries':
+        return parts[0], parts[2].split('.', 1)[0]
+    return None
+
+
+def group_entries(root: str, entries) -> list:
+    """Fold each job's artifacts into its checkpoint entry; drop leased folders."""
+    entries = list(entries)
+    owners, leased = {}, set()  # (user, job id) -> checkpoint entry, or None while leased
+    for entry in entries:
+        parts = entry.key.split('/')
+        path = os.path.join(root, entry.key)
+        if entry.remote or len(parts) != 3 or not os.path.isdir(path):
+            continue
+        if is_leased(path):
+            leased.add(entry.key)
+        job_id = _job_id(path) if parts[1] == 'jobs' else None
+        if job_id:
+            owners[(entry.user, job_id)] = None if entry.key in leased else entry
+    grouped = []
+    for entry in entries:
+        if entry.key in leased:
+            continue
+        owner_id = _artifact_owner(entry)
+        if owner_id in owners:
+            owner = owners[owner_id]
+            if owner is not None:
+                owner.members.append(entry)
+                owner.size += entry.size
+                owner.last_used = max(owner.last_used, entry.last_used)
+            continue
+        grouped.append(entry)
+    return grouped
+
+
+def select_for_removal(entries, now: float, max_age_seconds: float, quota_bytes: float) -> list:
+    """Entries past the age limit, then each user's LRU entries over quota."""
+    victims, by_user = [], {}
+    for entry in entries:
+        idle = now - entry.last_used
+        if max_age_seconds and idle > max(max_age_seconds, GC_GRACE_SECONDS):
+            victims.append(entry)
+        else:
+            by_user.setdefault(entry.user, []).append(entry)
+    if quota_bytes:
+        for user, items in by_user.items():
+            if user is None:
+                continue
+            used = sum(e.size for e in items)
+            for entry in sorted(items, key=lambda e: e.last_used):
+                if used <= quota_bytes:
+                    break
+                if now - entry.last_used < GC_GRACE_SECONDS:
+                    break  # everything after this is newer still
+                victims.append(entry)
+                used -= entry.size
+    return victims
+
+
+def collect_garbage(store=None, now: float = None) -> dict:
+    """Run one cleanup pass; returns counts of removed items and bytes."""
+    store = store or get_storage()
+    now = now or time.time()
+    if not os.path.isdir(store.root):
+        return {'removed': 0, 'bytes': 0}
+    victims = select_for_removal(group_entries(store.root, store.entries()), now, ARTIFACT_MAX_AGE_HOURS * 3600,
+                                 ARTIFACT_USER_QUOTA_MB * 1024 * 1024)
+    removed = freed = 0
+    for entry in victims:
+        try:
+            # The checkpoint goes first, so it never outlives its artifacts
+            for item in [entry] + entry.members:
+                if item.remote:
+                    store.delete_remote(item.key)
+                else:
+                    store.delete(item.key)
+        except Exception as e:
+            print(f"[WARN] Storage GC could not remove {entry.key}: {e}")
+            continue
+        removed += 1
+        freed += entry.size
+    if removed:
+        metrics.inc('pdf2podcast_gc_removed_total', amount=removed)
+        metrics.inc('pdf2podcast_gc_bytes_total', amount=freed)
+        print(f"[INFO] Storage GC removed {removed} item(s), freed {freed / (1024 * 1024):.1f} MB")
+    return {'removed': removed, 'bytes': freed}
+
+
+metrics.describe('pdf2podcast_gc_removed_total', 'counter', 'Artifacts and working folders removed by storage GC.')
+metrics.describe('pdf2podcast_gc_bytes_total', 'counter', 'Bytes freed by storage GC.')
+
+_storage = None
+_gc_pid = None
+_lock = threading.Lock()
+
+
+def get_storage(root: str = 'uploads'):
+    """The configured storage backend (created once per process)."""
+    global _storage
+    if _storage is None:
+        with _lock:
+            if _storage is None:
+                if STORAGE_BACKEND == 's3':
+                    _storage = S3Storage(root, S3_BUCKET)
+                else:
+                    _storage = LocalStorage(root)
+                print(f"[INFO] Artifact storage: {_storage.name}")
+    return _storage
+
+
+def ensure_gc_running() -> None:
+    """Start this process's GC thread if it is not running (fork-safe)."""
+    global _gc_pid
+    if not STORAGE_GC_INTERVAL or _gc_pid == os.getpid():
+        return
+    with _lock:
+        if _gc_pid == os.getpid():
+            return
+        _gc_pid = os.getpid()
+
+    def loop():
+        while True:
+            time.sleep(STORAGE_GC_INTERVAL)
+            try:
+                collect_garbage()
+            except Exception as e:
+                print(f"[WARN] Storage GC failed: {e}")
+
+    threading.Thread(target=loop, name='storage-gc', daemon=True).start()
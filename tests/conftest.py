@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# No background cleanup thread in tests.
+os.environ.setdefault('STORAGE_GC_INTERVAL', '0')
+
+import pytest
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """Build a PDF from a list of page texts; None makes an image-only page."""
+    import fitz  # PyMuPDF
+
+    def make(pages, name='doc.pdf', toc=None):
+        doc = fitz.open()
+        for text in pages:
+            page = doc.new_page()
+            if text is None:
+                pix = fitz.Pixmap(fitz.csGRAY, fitz.IRect(0, 0, 40, 40), False)
+                pix.set_rect(pix.irect, ((len(doc) * 37) % 256,))
+                page.insert_image(fitz.Rect(72, 72, 272, 272), pixmap=pix)
+            elif text:
+                page.insert_text((72, 72), text)
+        if toc:
+            doc.set_toc(toc)
+        path = str(tmp_path / name)
+        doc.save(path)
+        doc.close()
+        return path
+
+    return make
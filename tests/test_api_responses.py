@@ -0,0 +1,49 @@
+import pytest
+
+import server
+
+JOB_ID = '00000000-0000-4000-8000-000000000050'
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'UPLOAD_FOLDER', str(tmp_path))
+    folder = tmp_path / 'anonymous'
+    folder.mkdir()
+    server.save_chunk_summary_pages([f"summary {n}" for n in range(5)], JOB_ID, str(folder))
+    return server.app.test_client()
+
+
+def test_fields_selects_top_level_keys():
+    body = {"summary": "s", "audioUrl": "/a.wav", "jobId": "j", "chunkSummaries": ["c"]}
+    with server.app.test_request_context('/api/process-pdf?fields=audioUrl, jobId,nope'):
+        assert server._select_fields(body) == {"audioUrl": "/a.wav", "jobId": "j"}
+    with server.app.test_request_context('/api/process-pdf', method='POST', data={'fields': 'summary'}):
+        assert server._select_fields(body) == {"summary": "s"}
+    with server.app.test_request_context('/api/process-pdf?fields='):
+        assert server._select_fields(body) == body
+
+
+def test_chunk_summaries_are_paged(client):
+    url = f'/api/jobs/{JOB_ID}/chunk-summaries'
+    first = client.get(url + '?limit=2').get_json()
+    assert first['total'] == 5 and first['offset'] == 0 and first['limit'] == 2
+    assert first['items'] == [{"index": 0, "summary": "summary 0"}, {"index": 1, "summary": "summary 1"}]
+    last = client.get(first['next']).get_json()
+    last = client.get(last['next']).get_json()
+    assert last['items'] == [{"index": 4, "summary": "summary 4"}] and last['next'] is None
+    assert client.get(url + '?offset=9').get_json()['items'] == []
+    assert client.get(url + '?limit=500').get_json()['limit'] == 100
+
+
+@pytest.mark.parametrize('query', ['offset=-5', 'limit=abc', 'limit=0', 'offset=1.5', 'offset=-5&limit=abc'])
+def test_invalid_paging_is_rejected(client, query):
+    response = client.get(f'/api/jobs/{JOB_ID}/chunk-summaries?{query}')
+    assert response.status_code == 400
+    response = client.get(f'/api/jobs/00000000-0000-4000-8000-000000000999/chunk-summaries?{query}')
+    assert response.status_code == 400
+
+
+def test_unknown_or_malformed_job_is_404(client):
+    assert client.get('/api/jobs/00000000-0000-4000-8000-000000000999/chunk-summaries').status_code == 404
+    assert client.get('/api/jobs/not-a-job/chunk-summaries').status_code == 404
@@ -0,0 +1,39 @@
+import pytest
+
+import audio
+
+# audio.py tolerates a missing numpy (tts then joins segments unprocessed).
+np = pytest.importorskip('numpy')
+
+
+def _write(path, samples, rate=16000):
+    data = np.asarray(samples, dtype='<i2').tobytes()
+    with open(path, 'wb') as f:
+        audio.write_wav_header(f, len(data), rate)
+        f.write(data)
+
+
+def test_trim_silence_keeps_padding():
+    samples = np.zeros((16000, 1), dtype='<i2')
+    samples[8000:8100] = 10000
+    trimmed = audio.trim_silence(samples, 16000, pad_ms=10)
+    assert len(trimmed) == 100 + 2 * 160
+
+
+def test_loudness_gain_never_clips():
+    samples = np.full((1000, 1), 100, dtype='<i2')
+    samples[500] = -30000  # quiet overall, but one peak limits the gain
+    assert audio.loudness_gain(samples, target_dbfs=-20) == pytest.approx(32767 / 30000)
+
+
+def test_assemble_joins_segments_with_gaps(tmp_path):
+    tone = (np.sin(np.arange(1600) / 5) * 8000).astype('<i2').reshape(-1, 1)
+    _write(tmp_path / 'a.wav', tone)
+    _write(tmp_path / 'silent.wav', np.zeros((1600, 1)))
+    _write(tmp_path / 'b.wav', tone)
+    seconds = audio.assemble([str(tmp_path / n) for n in ('a.wav', 'silent.wav', 'b.wav')],
+                             str(tmp_path / 'out.wav'), gap_ms=100)
+    samples, rate = audio.read_pcm(str(tmp_path / 'out.wav'))
+    assert rate == 16000
+    assert len(samples) == pytest.approx(2 * 1600 + 1600, abs=20)  # silent segment dropped, one gap
+    assert seconds == pytest.approx(len(samples) / rate)
@@ -0,0 +1,77 @@
+import io
+import os
+import threading
+import time
+
+import pytest
+
+import batch
+import scheduler
+import server
+import storage
+
+
+def test_lease_is_shared_through_disk(tmp_path, monkeypatch):
+    out = str(tmp_path / 'outputs')
+    assert batch.claim(out)
+    assert batch.is_running(out) and not batch.claim(out)
+    # A lease nobody renewed belongs to a dead process and can be taken over.
+    lease = os.path.join(out, batch.LEASE_NAME)
+    os.utime(lease, (time.time() - batch.BATCH_LEASE_SECONDS - 1,) * 2)
+    assert not batch.is_running(out)
+    assert batch.claim(out)
+    batch.release(out)
+    assert not batch.is_running(out)
+
+
+def test_batches_share_the_pool_and_scheduler(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('uploads')
+    fair = scheduler.FairScheduler(slots=1, per_user_slots=1, max_queue=8, max_user_queue=8, worker_threads=0)
+    monkeypatch.setattr(scheduler, 'get_scheduler', lambda: fair)
+    release = threading.Event()
+    running, peak = [], []
+
+    def fake_job(path, job_id, length_choice, folder=None, audio_path=None, keep_input=False, track_revisions=True):
+        running.append(job_id)
+        peak.append(len(running))
+        release.wait(5)
+        running.remove(job_id)
+        return {'timings': {}}, 200
+
+    monkeypatch.setattr(server, '_run_pdf_job', fake_job)
+    pdf = open(make_pdf(["Some text"]), 'rb').read()
+    client = server.app.test_client()
+
+    def upload():
+        files = [(io.BytesIO(pdf + str(n).encode()), f"d{n}.pdf") for n in range(3)]
+        return client.post('/api/process-batch', data={'pdfFiles': files}, content_type='multipart/form-data')
+
+    response = upload()
+    assert response.status_code == 202
+    status_url = response.get_json()['statusUrl']
+    assert client.get(status_url).get_json()['running']
+    assert upload().status_code == 429  # one batch per user at a time
+
+    release.set()
+    for _ in range(100):
+        info = client.get(status_url).get_json()
+        if not info['running']:
+            break
+        time.sleep(0.05)
+    assert info['done'] == 3 and info['pending'] == 0
+    assert max(peak) == 1  # documents waited for the single scheduler slot
+    assert fair.snapshot()['running'] == {}
+
+
+def test_failed_start_returns_the_slot_and_claim(tmp_path, monkeypatch):
+    def broken(source):
+        raise OSError("inputs unreadable")
+
+    monkeypatch.setattr(batch, 'discover_inputs', broken)
+    batch_dir = str(tmp_path / 'b')
+    for _ in range(server.BATCH_MAX_RUNNING + 1):
+        with pytest.raises(OSError):
+            server._start_batch('00000000-0000-4000-8000-000000000003', batch_dir, 'short', 'alice')
+        assert not batch.is_running(os.path.join(batch_dir, 'outputs'))
+    assert not [n for n in os.listdir(batch_dir) if n.startswith(storage._LEASE_PREFIX)]
@@ -0,0 +1,161 @@
+import os
+
+import pytest
+
+import audio
+import checkpoints
+import llm_client
+import server
+import text_store
+import tts
+
+
+def test_stages_and_incremental_summaries(tmp_path):
+    checkpoint = checkpoints.JobCheckpoint(str(tmp_path / 'job'))
+    checkpoint.start('job-1')
+    checkpoint.start('job-2')  # a retry keeps the first id
+    assert checkpoint.job_id == 'job-1'
+    assert not checkpoint.completed('extract')
+
+    checkpoint.save_chunks(["one", "two"])
+    checkpoint.add_summary(0, "first")
+    with open(os.path.join(checkpoint.job_dir, 'summaries.jsonl'), 'a') as f:
+        f.write('{"i": 1, "summ')  # cut short by a crash
+    reopened = checkpoints.JobCheckpoint(checkpoint.job_dir)
+    assert reopened.completed('extract') and not reopened.completed('summarize')
+    assert reopened.load_chunks() == ["one", "two"]
+    spilled = reopened.load_chunks(text_store.SpilledTextList())
+    assert isinstance(spilled, text_store.SpilledTextList) and list(spilled) == ["one", "two"]
+    spilled.close()
+    assert reopened.load_summaries() == {0: "first"}
+
+
+def test_rewind_to_last_intact_stage(tmp_path):
+    checkpoint = checkpoints.JobCheckpoint(str(tmp_path / 'job'))
+    checkpoint.start('job-1')
+    checkpoint.save_chunks(["one"])
+    checkpoint.save_synthesis("summary")
+    wav = tmp_path / 'a.wav'
+    wav.write_bytes(b'RIFF')
+    checkpoint.mark('audio', audioPath=str(wav), audioUrl='/a.wav')
+    checkpoint.save_result({'summary': 'summary'})
+
+    checkpoint.rewind()
+    assert checkpoint.stage == 'audio'
+    wav.unlink()
+    checkpoint.rewind()
+    assert checkpoint.stage == 'synthesis'
+    os.remove(os.path.join(checkpoint.job_dir, 'synthesis.txt'))
+    checkpoint.rewind()
+    assert checkpoint.stage == 'extract'
+
+
+def test_one_request_runs_a_job_at_a_time(tmp_path):
+    first = checkpoints.JobCheckpoint(str(tmp_path / 'job'))
+    second = checkpoints.JobCheckpoint(str(tmp_path / 'job'))
+    assert first.claim()
+    assert not second.claim()
+    first.release()
+    assert second.claim()
+    second.release()
+
+    # A lock left by a process that died is taken over.
+    (tmp_path / 'job' / checkpoints.RUN_LOCK_NAME).write_text('999999999')
+    assert first.claim()
+    first.release()
+
+
+def test_concurrent_writes_use_separate_temp_files(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+    checkpoint = checkpoints.JobCheckpoint(str(tmp_path / 'job'))
+    checkpoint.start('job-1')
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda n: checkpoint.save_chunks([f"chunk {n}"] * 50), range(40)))
+    assert len(set(checkpoint.load_chunks())) == 1
+    assert sorted(os.listdir(checkpoint.job_dir)) == ['chunks.jsonl', 'job.json']
+
+
+def test_job_key_depends_on_content_and_params(tmp_path):
+    a = tmp_path / 'a.pdf'
+    a.write_bytes(b'%PDF-1 a')
+    b = tmp_path / 'b.pdf'
+    b.write_bytes(b'%PDF-1 a')
+    assert checkpoints.job_key(str(a), 'medium') == checkpoints.job_key(str(b), 'medium')
+    assert checkpoints.job_key(str(a), 'medium') != checkpoints.job_key(str(a), 'short')
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """Run _run_pdf_job on a small PDF with a checkpoint; audio is a short WAV."""
+    def speak(engine, text, path):
+        with open(path, 'wb') as f:
+            audio.write_wav_header(f, 2, 24000)
+            f.write(b'\0\0')
+
+    monkeypatch.setattr(tts, 'init_engine', lambda: None)
+    monkeypatch.setattr(tts, '_engine', None)
+    monkeypatch.setattr(tts, 'speak', speak)
+    monkeypatch.setattr(server, 'TTS_PIPELINE', False)
+    folder = tmp_path / 'user'
+    folder.mkdir()
+    source = tmp_path / 'source.pdf'
+    import fitz
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"Section {n} explains topic {n} in detail. " * 3)
+    doc.save(str(source))
+
+    def run():
+        upload = tmp_path / 'upload.pdf'
+        upload.write_bytes(source.read_bytes())
+        checkpoint = checkpoints.JobCheckpoint(str(folder / 'jobs' / checkpoints.job_key(str(upload), 'short')))
+        checkpoint.start('00000000-0000-4000-8000-000000000001')
+        return server._run_pdf_job(str(upload), checkpoint.job_id, 'short', folder=str(folder),
+                                   checkpoint=checkpoint)
+
+    return run
+
+
+def test_fallback_results_are_not_checkpointed(pipeline, monkeypatch):
+    monkeypatch.setattr(llm_client, 'get_client', lambda: None)
+    body, status = pipeline()
+    assert status == 200
+    assert body['fallbacks'] == ['chunk_summary', 'synthesis']
+
+    # Once a model is configured, the retry asks it instead of replaying the fallback.
+    monkeypatch.setattr(llm_client, 'get_client', lambda: llm_client.LLMClient(llm_client.StubBackend()))
+    body, status = pipeline()
+    assert status == 200
+    assert 'fallbacks' not in body
+
+    monkeypatch.setattr(llm_client, 'get_client', lambda: None)
+    cached, status = pipeline()
+    assert status == 200 and cached['summary'] == body['summary']
+
+
+def test_result_with_missing_artifacts_is_rebuilt(pipeline, monkeypatch):
+    monkeypatch.setattr(llm_client, 'get_client', lambda: llm_client.LLMClient(llm_client.StubBackend()))
+    body, _ = pipeline()
+    os.remove(body['textUrl'].lstrip('/'))
+    rebuilt, status = pipeline()
+    assert status == 200
+    assert rebuilt['summary'] == body['summary']
+    assert os.path.exists(rebuilt['textUrl'].lstrip('/'))
+
+
+def test_identical_upload_is_turned_away_while_running(tmp_path, monkeypatch, make_pdf):
+    import io
+    monkeypatch.setattr(server, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    path = make_pdf(["Some text on the page."])
+    key = checkpoints.job_key(path, 'medium')
+    running = checkpoints.JobCheckpoint(str(tmp_path / 'uploads' / 'anonymous' / 'jobs' / key))
+    assert running.claim()
+    running.start('00000000-0000-4000-8000-000000000001')
+    with open(path, 'rb') as f:
+        data = f.read()
+    response = server.app.test_client().post('/api/process-pdf',
+                                              data={'pdfFile': (io.BytesIO(data), 'doc.pdf')})
+    assert response.status_code == 409
+    assert response.get_json()['jobId'] == running.job_id
+    assert os.listdir(tmp_path / 'uploads') == ['anonymous']  # the upload was removed
+    running.release()
@@ -0,0 +1,42 @@
+import fitz
+import pytest
+
+import ocr
+import server
+
+
+def _failing_ocr(images):
+    raise RuntimeError("tesseract is not installed")
+
+
+@pytest.mark.parametrize('batch_pages', [1, 2, 3, 4])
+def test_ocr_failure_keeps_later_text_pages(make_pdf, monkeypatch, batch_pages):
+    monkeypatch.setattr(ocr, 'images_to_strings', _failing_ocr)
+    path = make_pdf(["Page one", None, "Page three", "Page four", None, "Page six"])
+    with fitz.open(path) as doc:
+        result = list(server._iter_page_texts(doc, ocr_batch_pages=batch_pages))
+    assert [i for i, _ in result] == [0, 1, 2, 3, 4, 5]
+    assert [t for _, t in result] == ["Page one", "", "Page three", "Page four", "", "Page six"]
+
+
+def test_selected_pages_with_ocr_failure(make_pdf, monkeypatch):
+    monkeypatch.setattr(ocr, 'images_to_strings', _failing_ocr)
+    path = make_pdf(["Page one", None, "Page three", None, "Page five"])
+    with fitz.open(path) as doc:
+        result = list(server._iter_page_texts(doc, ocr_batch_pages=2, pages=[1, 2, 4]))
+    assert result == [(1, ""), (2, "Page three"), (4, "Page five")]
+
+
+def test_known_ocr_text_skips_the_engine(make_pdf, monkeypatch):
+    monkeypatch.setattr(ocr, 'images_to_strings', _failing_ocr)
+    path = make_pdf(["Page one", None])
+    with fitz.open(path) as doc:
+        asked = []
+
+        def known_text(doc, page, page_index):
+            asked.append(page_index)
+            return "Scanned text"
+
+        result = list(server._iter_page_texts(doc, known_text=known_text))
+    assert result == [(0, "Page one"), (1, "Scanned text")]
+    assert asked == [1]
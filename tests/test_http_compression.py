@@ -0,0 +1,23 @@
+import gzip
+
+from flask import Flask, jsonify
+
+import http_compression
+
+
+def test_accepted_encodings():
+    assert http_compression.accepted_encodings("gzip;q=0.5, br, deflate;q=0") == {'gzip', 'br'}
+    assert http_compression.accepted_encodings("") == set()
+
+
+def test_compresses_large_json_only():
+    app = Flask(__name__)
+    with app.test_request_context():
+        big = http_compression.compress_response(jsonify(text="word " * 1000), "gzip")
+        assert big.headers['Content-Encoding'] == 'gzip'
+        assert b'word word' in gzip.decompress(big.get_data())
+        assert 'Accept-Encoding' in big.headers['Vary']
+        small = http_compression.compress_response(jsonify(ok=True), "gzip")
+        assert 'Content-Encoding' not in small.headers
+        plain = http_compression.compress_response(jsonify(text="word " * 1000), "identity")
+        assert 'Content-Encoding' not in plain.headers
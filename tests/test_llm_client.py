@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import llm_client
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from model_stub_server import ModelStubServer  # noqa: E402
+
+
+class BlockingBackend(llm_client.StubBackend):
+    """Never answers until released, like a hung connection."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def generate(self, prompt, generation_config=None, timeout=None):
+        self.release.wait()
+        return super().generate(prompt, generation_config, timeout)
+
+    def stream(self, prompt, generation_config=None, timeout=None):
+        yield "first "
+        self.release.wait()
+        yield from super().stream(prompt, generation_config, timeout)
+
+
+@pytest.fixture
+def blocking():
+    backend = BlockingBackend()
+    yield llm_client.LLMClient(backend, timeout=0.3)
+    backend.release.set()
+
+
+@pytest.fixture
+def model():
+    pytest.importorskip('google.generativeai')
+    server = ModelStubServer(('127.0.0.1', 0), latency_ms=20, token_ms=50, jitter=0).start()
+    yield server
+    server.shutdown()
+
+
+def test_rest_stream_arrives_in_pieces(model):
+    backend = llm_client.GeminiBackend('test-key', endpoint=model.url)
+    prompt = "Intro\n\n" + "One two three. " * 20
+    pieces = list(backend.stream(prompt, {'max_output_tokens': 40}))
+    assert len(pieces) > 1
+    expected = llm_client.StubBackend().generate(prompt, {'max_output_tokens': 40})
+    assert " ".join("".join(pieces).split()) == expected
+
+
+def test_closing_a_rest_stream_cancels_the_call(model):
+    backend = llm_client.GeminiBackend('test-key', endpoint=model.url)
+    started = time.monotonic()
+    stream = backend.stream("Intro\n\n" + "Word after word goes here. " * 100)
+    assert next(stream)
+    stream.close()
+    assert time.monotonic() - started < 5  # the full reply would take ~35s
+    for _ in range(100):
+        stats = model.stats.snapshot()
+        if not stats['in_flight']:
+            break
+        time.sleep(0.02)
+    assert stats['in_flight'] == 0 and stats['cancelled'] == 1
+
+
+def test_iter_json_array_handles_split_pieces():
+    data = '[{"a": "é"},\r\n{"b": [1, 2]}]'.encode('utf-8')
+    pieces = [data[i:i + 3] for i in range(0, len(data), 3)]
+    assert list(llm_client._iter_json_array(pieces)) == [{"a": "é"}, {"b": [1, 2]}]
+
+
+def test_blocked_call_times_out_within_budget(blocking):
+    started = time.monotonic()
+    with pytest.raises(llm_client.LLMError, match="timed out"):
+        blocking.generate("Intro\n\nText.")
+    assert time.monotonic() - started < 2
+
+
+def test_blocked_stream_times_out_within_budget(blocking):
+    started = time.monotonic()
+    stream = blocking.generate_stream("Intro\n\nText.")
+    assert next(stream) == "first "
+    with pytest.raises(llm_client.LLMError, match="timed out"):
+        next(stream)
+    assert time.monotonic() - started < 2
+
+
+def test_transport_deadline_aborts_a_slow_call():
+    pytest.importorskip('google.generativeai')
+    server = ModelStubServer(('127.0.0.1', 0), latency_ms=5000, jitter=0).start()
+    try:
+        backend = llm_client.GeminiBackend('test-key', endpoint=server.url)
+        started = time.monotonic()
+        with pytest.raises(Exception):
+            backend.generate("Intro\n\nText.", timeout=0.5)
+        assert time.monotonic() - started < 3
+    finally:
+        server.shutdown()
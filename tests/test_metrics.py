@@ -0,0 +1,32 @@
+import metrics
+import server
+
+
+def test_render_counters_and_histograms(monkeypatch):
+    monkeypatch.setattr(metrics, '_counters', {})
+    monkeypatch.setattr(metrics, '_histograms', {})
+    metrics.inc('pdf2podcast_fallbacks_total', {'kind': 'synthesis'}, amount=2)
+    metrics.observe('pdf2podcast_stage_seconds', 0.3, {'stage': 'ocr_page'})
+    lines = metrics.render_prometheus().splitlines()
+    assert '# TYPE pdf2podcast_fallbacks_total counter' in lines
+    assert 'pdf2podcast_fallbacks_total{kind="synthesis"} 2' in lines
+    assert '# TYPE pdf2podcast_stage_seconds histogram' in lines
+    assert 'pdf2podcast_stage_seconds_bucket{stage="ocr_page",le="0.25"} 0' in lines
+    assert 'pdf2podcast_stage_seconds_bucket{stage="ocr_page",le="0.5"} 1' in lines
+    assert 'pdf2podcast_stage_seconds_bucket{stage="ocr_page",le="+Inf"} 1' in lines
+    assert 'pdf2podcast_stage_seconds_count{stage="ocr_page"} 1' in lines
+
+
+def test_label_values_are_escaped(monkeypatch):
+    monkeypatch.setattr(metrics, '_counters', {})
+    monkeypatch.setattr(metrics, '_histograms', {})
+    metrics.inc('pdf2podcast_test_total', {'user': 'a"b\\c\nd'})
+    assert 'pdf2podcast_test_total{user="a\\"b\\\\c\\nd"} 1' in metrics.render_prometheus().splitlines()
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(metrics, '_counters', {})
+    metrics.inc('pdf2podcast_jobs_total', {'status': 'done'})
+    response = server.app.test_client().get('/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    assert b'pdf2podcast_jobs_total{status="done"} 1' in response.data
@@ -0,0 +1,29 @@
+import fitz
+import pytest
+
+import outline
+
+
+def test_parse_page_ranges():
+    assert outline.parse_page_ranges("1-3, 5,9-", 10) == [0, 1, 2, 4, 8, 9]
+    assert outline.parse_page_ranges("-2,2", 10) == [0, 1]
+    for spec in ("", "0", "4-2", "11", "a-b", "3-12"):
+        with pytest.raises(ValueError):
+            outline.parse_page_ranges(spec, 10)
+
+
+def test_outline_ids_and_spans(make_pdf):
+    toc = [[1, "Intro", 1], [1, "Methods", 3], [2, "Setup", 3], [2, "Runs", 5], [1, "Results", 7]]
+    with fitz.open(make_pdf([f"Page {n}" for n in range(1, 9)], toc=toc)) as doc:
+        sections = outline.get_outline(doc)
+        assert [(s['id'], s['startPage'], s['endPage']) for s in sections] == [
+            ("1", 1, 2), ("2", 3, 6), ("2.1", 3, 4), ("2.2", 5, 6), ("3", 7, 8)]
+        assert outline.select_pages(doc) is None
+        assert outline.select_pages(doc, "1", "2.2,3") == [0, 4, 5, 6, 7]
+        assert outline.section_starts(doc) == {0, 2, 4, 6}
+        with pytest.raises(ValueError):
+            outline.select_pages(doc, section_ids="4")
+        with pytest.raises(ValueError, match="No pages selected"):
+            outline.select_pages(doc, section_ids=",")
+        with pytest.raises(ValueError, match="No pages selected"):
+            outline.select_pages(doc, " , ", "")
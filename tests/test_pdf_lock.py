@@ -0,0 +1,61 @@
+import threading
+
+import fitz
+
+import pdf_lock
+import pdf_writer
+import revisions
+import scheduler
+import server
+
+
+def _require_lock(monkeypatch):
+    """Make fitz.open fail unless the caller holds pdf_lock.lock."""
+    real_open = fitz.open
+
+    def checked_open(*args, **kwargs):
+        assert pdf_lock.lock._is_owned(), "fitz.open called without pdf_lock.lock"
+        return real_open(*args, **kwargs)
+
+    monkeypatch.setattr(fitz, 'open', checked_open)
+
+
+def test_pdf_entry_points_hold_the_lock(make_pdf, tmp_path, monkeypatch):
+    path = make_pdf(["Intro text", "More text", None], toc=[[1, "Intro", 1], [1, "Scan", 3]])
+    _require_lock(monkeypatch)
+    assert scheduler.estimate_cost(path) > 3
+    assert server._select_pages(path, "1-2", "") == ([0, 1], 3)
+    assert server.extract_text_chunks_from_pdf(path, pages_per_chunk=2)
+    tracker = revisions.open_tracker(str(tmp_path), 'doc.pdf')
+    assert server.extract_text_chunks_from_pdf(path, pages_per_chunk=2, tracker=tracker)
+    tracker.save()
+    assert server.extract_text_from_pdf_pymupdf(path)
+    pdf_writer.write_summary_pdf("Summary text. " * 200, str(tmp_path / 'out.pdf'))
+
+
+def test_concurrent_jobs_get_their_own_text(make_pdf, tmp_path):
+    paths = [make_pdf([f"Document {n} page {p}" for p in range(12)], name=f"d{n}.pdf") for n in range(6)]
+    results, errors = {}, []
+
+    def extract(n):
+        try:
+            results[n] = list(server.extract_text_chunks_from_pdf(paths[n], pages_per_chunk=5))
+        except Exception as e:
+            errors.append(e)
+
+    def write(n):
+        try:
+            pdf_writer.write_summary_pdf(f"Summary {n}. " * 500, str(tmp_path / f"s{n}.pdf"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=extract, args=(n,)) for n in range(6)]
+    threads += [threading.Thread(target=write, args=(n,)) for n in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    for n, chunks in results.items():
+        assert len(chunks) == 3
+        assert all(f"Document {n} " in chunk for chunk in chunks)
@@ -0,0 +1,42 @@
+import os
+import threading
+
+import pdf_writer
+import server
+import storage
+
+
+def test_download_waits_for_the_background_write(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('uploads/alice')
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage('uploads'))
+    gate = threading.Event()
+    real_write = pdf_writer.write_summary_pdf
+
+    def slow_write(text, path, timings=None):
+        gate.wait(5)
+        return real_write(text, path, timings)
+
+    monkeypatch.setattr(pdf_writer, 'write_summary_pdf', slow_write)
+    saved = []
+    future = pdf_writer.write_summary_pdf_background("Summary. " * 50, 'uploads/alice/job_summary.pdf')
+    pdf_writer.when_written('uploads/alice/job_summary.pdf', lambda: saved.append(True))
+    assert not saved
+    threading.Timer(0.2, gate.set).start()
+    response = server.app.test_client().get('/artifacts/alice/job_summary.pdf')
+    assert response.status_code == 200 and response.data.startswith(b'%PDF')
+    future.result()
+    assert saved == [True]
+
+
+def test_lost_pdf_is_rebuilt_from_the_summary_text(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('uploads/alice')
+    monkeypatch.setattr(storage, '_storage', storage.LocalStorage('uploads'))
+    with open('uploads/alice/job_summary.txt', 'w') as f:
+        f.write("Summary. " * 50)
+    client = server.app.test_client()
+    response = client.get('/artifacts/alice/job_summary.pdf')
+    assert response.status_code == 200 and response.data.startswith(b'%PDF')
+    assert client.get('/artifacts/alice/other_summary.pdf').status_code == 404
+    assert client.get('/artifacts/alice/../../etc/x_summary.pdf').status_code == 404
@@ -0,0 +1,34 @@
+import os
+import tracemalloc
+
+import profiling
+
+
+def test_one_profiled_job_at_a_time(tmp_path):
+    first = profiling.JobProfiler('job-1')
+    second = profiling.JobProfiler('job-2')
+    assert first.start()
+    try:
+        assert not second.start()
+        sum(range(1000))
+    finally:
+        paths = first.save(str(tmp_path))
+    assert all(os.path.getsize(p) for p in paths.values())
+    assert not tracemalloc.is_tracing()
+
+    third = profiling.JobProfiler('job-3')
+    assert third.start()
+    third.save(str(tmp_path))
+
+
+def test_profiler_skipped_when_cprofile_is_busy(tmp_path):
+    import cProfile
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        assert not profiling.JobProfiler('job-1').start()
+    finally:
+        other.disable()
+    profiler = profiling.JobProfiler('job-2')
+    assert profiler.start()
+    profiler.save(str(tmp_path))
@@ -0,0 +1,130 @@
+import fitz
+
+import llm_client
+import ocr
+import revisions
+import server
+import tts
+
+
+def _extract(path, folder, name='doc.pdf'):
+    tracker = revisions.open_tracker(str(folder), name)
+    chunks = list(server.extract_text_chunks_from_pdf(path, pages_per_chunk=3, tracker=tracker))
+    return tracker, chunks
+
+
+def test_unchanged_pages_reuse_ocr_and_chunk_starts(make_pdf, tmp_path, monkeypatch):
+    calls = []
+
+    def fake_ocr(images):
+        calls.append(len(images))
+        return [f"Scanned words {len(calls)}.{n}" for n in range(len(images))]
+
+    monkeypatch.setattr(ocr, 'images_to_strings', fake_ocr)
+    folder = tmp_path / 'user'
+    v1 = make_pdf(["Intro text", None, "Body one", "Body two", None, "Body three"], name='v1.pdf')
+    tracker, first = _extract(v1, folder, 'v1.pdf')
+    for i, chunk in enumerate(first):
+        tracker.add_summary(i, f"summary {i}")
+    tracker.save()
+    assert calls
+
+    # v2 revises one page; the rest, including both scanned pages, is unchanged.
+    calls.clear()
+    v2 = make_pdf(["Intro text", None, "Body one", "Body two, revised", None, "Body three"], name='v2.pdf')
+    tracker, second = _extract(v2, folder, 'v2.pdf')
+    assert not calls  # both scanned pages came from the stored OCR text
+    assert tracker.previous_name == 'v1.pdf'
+    assert tracker.unchanged_pages() == 5
+    assert second[0] == first[0] and second[1] != first[1]
+    assert tracker.reused_summaries() == {0: "summary 0"}
+    tracker.save()
+
+
+def test_fingerprints_reuse_the_extracted_text(make_pdf, tmp_path, monkeypatch):
+    path = make_pdf([f"Page {n}" for n in range(5)])
+    calls = []
+    real_get_text = fitz.Page.get_text
+
+    def counting_get_text(self, *args, **kwargs):
+        calls.append(self.number)
+        return real_get_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(fitz.Page, 'get_text', counting_get_text)
+    tracker, _ = _extract(path, tmp_path)
+    tracker.save()
+    assert sorted(calls) == [0, 1, 2, 3, 4]
+
+
+def test_new_ocr_text_is_spilled(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(ocr, 'images_to_strings', lambda images: ["Scanned page"] * len(images))
+    tracker, _ = _extract(make_pdf([None, None]), tmp_path)
+    assert len(tracker._ocr_out) == 2 and not isinstance(tracker._ocr_out, list)
+    tracker.save()
+    record = next((tmp_path / 'revisions').glob('*.ocr.jsonl')).read_text()
+    assert record.count("Scanned page") == 2
+
+
+def test_fallback_summaries_are_not_stored(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_client, 'get_client', lambda: None)
+    monkeypatch.setattr(server, 'TTS_PIPELINE', False)
+    monkeypatch.setattr(tts, 'init_engine', lambda: None)
+    monkeypatch.setattr(tts, '_engine', None)
+    monkeypatch.setattr(tts, 'speak', lambda engine, text, path: open(path, 'wb').close())
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"Section {n} explains topic {n} in detail. " * 3)
+    upload = tmp_path / 'upload.pdf'
+    doc.save(str(upload))
+    folder = tmp_path / 'user'
+    folder.mkdir()
+    body, status = server._run_pdf_job(str(upload), '00000000-0000-4000-8000-000000000002', 'short',
+                                       folder=str(folder))
+    assert status == 200 and 'chunk_summary' in body['fallbacks']
+    records = list((folder / 'revisions').glob('*.json'))
+    assert records and '"summaries": {}' in records[0].read_text()
+
+
+def test_pruning_keeps_recent_records(make_pdf, tmp_path, monkeypatch):
+    monkeypatch.setattr(revisions, 'REVISIONS_KEEP', 2)
+    for n in range(3):
+        tracker, _ = _extract(make_pdf([f"Version {n}"], name=f"v{n}.pdf"), tmp_path, f"v{n}.pdf")
+        tracker.save()
+    assert len(list((tmp_path / 'revisions').glob('*.pages'))) == 2
+    assert not any(p.name.endswith('.tmp') for p in (tmp_path / 'revisions').iterdir())
+
+
+def test_chunks_follow_previous_starts_after_an_insert(make_pdf, tmp_path):
+    pages = [f"Page {n} text" for n in range(6)]
+    tracker, first = _extract(make_pdf(pages, name='v1.pdf'), tmp_path, 'v1.pdf')
+    tracker.save()
+    tracker, second = _extract(make_pdf(["New preface"] + pages, name='v2.pdf'), tmp_path, 'v2.pdf')
+    assert second == ["New preface"] + first
+
+
+def test_tracker_is_closed_when_the_job_fails(make_pdf, tmp_path, monkeypatch):
+    closed = []
+    monkeypatch.setattr(revisions.Tracker, 'close', lambda self: closed.append(self))
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("model exploded")
+
+    monkeypatch.setattr(server, 'generate_summaries_for_chunks', fail)
+    folder = tmp_path / 'user'
+    folder.mkdir()
+    body, status = server._run_pdf_job(make_pdf(["Some text " * 20]), '00000000-0000-4000-8000-000000000003',
+                                       'short', folder=str(folder))
+    assert status == 500 and closed
+    assert not (folder / 'revisions').exists()
+
+
+def test_batch_documents_keep_no_revision_records(make_pdf, tmp_path, monkeypatch):
+    import batch
+    monkeypatch.setattr(llm_client, 'get_client', lambda: None)
+    monkeypatch.setattr(server, 'TTS_PIPELINE', False)
+    monkeypatch.setattr(tts, 'init_engine', lambda: None)
+    monkeypatch.setattr(tts, '_engine', None)
+    monkeypatch.setattr(tts, 'speak', lambda engine, text, path: open(path, 'wb').close())
+    entry = batch._process_document(make_pdf(["Some text " * 20]), str(tmp_path / 'out'), 'short')
+    assert entry['status'] == 'done'
+    assert not list((tmp_path / 'out').rglob('revisions'))
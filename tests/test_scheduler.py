@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+import scheduler
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def _queue(sched, user, cost, order, hold=True):
+    """Acquire a slot on a new thread and record the user once granted.
+
+    With hold=False the slot is released again straight away.
+    """
+    def run():
+        ticket = sched.acquire(user, cost)
+        order.append(user)
+        if not hold:
+            sched.release(ticket)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_first_jobs_run_immediately():
+    sched = scheduler.FairScheduler(slots=2, per_user_slots=2, max_queue=4, max_user_queue=4)
+    a = sched.acquire('alice', 1)
+    b = sched.acquire('bob', 1)
+    assert sched.snapshot()['running'] == {'alice': 1, 'bob': 1}
+    sched.release(a)
+    sched.release(b)
+    assert sched.snapshot()['running'] == {}
+
+
+def test_fair_order_between_users():
+    sched = scheduler.FairScheduler(slots=1, per_user_slots=1, max_queue=10, max_user_queue=10)
+    running = sched.acquire('alice', 1)
+    order, threads = [], []
+    # alice queues three big jobs before bob queues one small one
+    for user, cost in [('alice', 50), ('alice', 50), ('alice', 50), ('bob', 5)]:
+        threads.append(_queue(sched, user, cost, order, hold=False))
+        _wait_until(lambda n=len(threads): sched.snapshot()['waiting'] == n)
+    sched.release(running)
+    for thread in threads:
+        thread.join(2)
+    assert order == ['bob', 'alice', 'alice', 'alice']
+
+
+def test_per_user_slot_limit():
+    sched = scheduler.FairScheduler(slots=2, per_user_slots=1, max_queue=4, max_user_queue=4)
+    first = sched.acquire('alice', 1)
+    order = []
+    thread = _queue(sched, 'alice', 1, order)
+    _wait_until(lambda: sched.snapshot()['waiting'] == 1)
+    assert sched.acquire('bob', 1)  # the free slot goes to another user
+    sched.release(first)
+    thread.join(2)
+    assert order == ['alice']
+
+
+def test_queue_limits_raise_queue_full():
+    sched = scheduler.FairScheduler(slots=1, per_user_slots=1, max_queue=2, max_user_queue=1)
+    sched.acquire('alice', 1)
+    order = []
+    _queue(sched, 'alice', 1, order)
+    _wait_until(lambda: sched.snapshot()['waiting'] == 1)
+    with pytest.raises(scheduler.QueueFull, match="too many queued jobs") as e:
+        sched.acquire('alice', 1)
+    assert e.value.retry_after >= 1
+    _queue(sched, 'bob', 1, order)
+    _wait_until(lambda: sched.snapshot()['waiting'] == 2)
+    with pytest.raises(scheduler.QueueFull, match="Server is busy"):
+        sched.acquire('carol', 1)
+
+
+@pytest.mark.parametrize('threads, expected', [(8, 4), (5, 1), (3, 0), (1, 0), (0, 16)])
+def test_queue_capped_by_worker_threads(threads, expected):
+    sched = scheduler.FairScheduler(slots=2, max_queue=16, worker_threads=threads, free_threads=2)
+    assert sched.max_queue == expected
+
+
+def test_waiting_jobs_leave_free_threads():
+    # 8 request threads, 2 slots, 2 kept free: the 7th upload is turned away
+    sched = scheduler.FairScheduler(slots=2, per_user_slots=2, max_queue=16, max_user_queue=16,
+                                    worker_threads=8, free_threads=2)
+    held = [sched.acquire('alice', 1), sched.acquire('alice', 1)]
+    order = []
+    for _ in range(4):
+        _queue(sched, 'alice', 1, order)
+    _wait_until(lambda: sched.snapshot()['waiting'] == 4)
+    with pytest.raises(scheduler.QueueFull):
+        sched.acquire('bob', 1)
+    for ticket in held:
+        sched.release(ticket)
+
+
+def test_estimate_cost_weights_scanned_pages(make_pdf):
+    text_only = make_pdf(["text"] * 4, name='text.pdf')
+    scanned = make_pdf([None] * 4, name='scan.pdf')
+    assert scheduler.estimate_cost(text_only) == 4
+    assert scheduler.estimate_cost(scanned) == 4 * (1 + scheduler.OCR_COST_FACTOR)
+    assert scheduler.estimate_cost(text_only, pages=[0, 1]) == 2
@@ -0,0 +1,34 @@
+import json
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def client():
+    return server.app.test_client()
+
+
+def _events(response):
+    return [json.loads(line[len('data: '):]) for line in response.get_data(as_text=True).splitlines()
+            if line.startswith('data: ')]
+
+
+def test_unknown_job_stream_ends_immediately(client):
+    response = client.get('/api/status/no-such-job/events')
+    assert _events(response) == [{"status": "unknown", "detail": ""}]
+
+
+@pytest.mark.parametrize('status', server.FINAL_STATUSES)
+def test_final_status_ends_stream(client, status):
+    server._update_progress('job-final', status, 'detail')
+    response = client.get('/api/status/job-final/events')
+    assert _events(response) == [{"status": status, "detail": "detail"}]
+
+
+def test_failed_job_publishes_error(make_pdf, tmp_path):
+    path = make_pdf([""], name='blank.pdf')
+    body, status = server._run_pdf_job(path, 'job-blank', 'short', folder=str(tmp_path))
+    assert status == 400
+    assert server.progress_store['job-blank']['status'] == 'error'
@@ -0,0 +1,217 @@
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+import pytest
+
+import storage
+
+HOUR = 3600
+
+
+def _age(path, hours):
+    then = time.time() - hours * HOUR
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            os.utime(os.path.join(root, name), (then, then))
+    os.utime(path, (then, then))
+
+
+def _job(root, user, key, job_id, hours):
+    job_dir = root / user / 'jobs' / key
+    job_dir.mkdir(parents=True)
+    (job_dir / 'job.json').write_text(json.dumps({'jobId': job_id, 'stage': 'done'}))
+    (root / user / f"{job_id}_summary.txt").write_text("summary")
+    (root / user / f"{job_id}_podcast.wav").write_bytes(b'RIFF' * 100)
+    (root / user / 'chunk_summaries').mkdir(exist_ok=True)
+    (root / user / 'chunk_summaries' / f"{job_id}.jsonl").write_text('"chunk"\n')
+    for path in (job_dir, root / user / f"{job_id}_summary.txt", root / user / f"{job_id}_podcast.wav",
+                 root / user / 'chunk_summaries' / f"{job_id}.jsonl"):
+        _age(path, hours)
+    return job_dir
+
+
+def _gc(root, monkeypatch, max_age_hours=72, quota_mb=0):
+    monkeypatch.setattr(storage, 'ARTIFACT_MAX_AGE_HOURS', max_age_hours)
+    monkeypatch.setattr(storage, 'ARTIFACT_USER_QUOTA_MB', quota_mb)
+    return storage.collect_garbage(storage.LocalStorage(str(root)))
+
+
+def test_select_by_age_then_quota():
+    now = 10 * HOUR
+    old = storage.Entry('u/old.txt', 'u', 10, now - 5 * HOUR)
+    lru = storage.Entry('u/lru.txt', 'u', 60, now - 2 * HOUR)
+    fresh = storage.Entry('u/new.txt', 'u', 60, now - 10)
+    victims = storage.select_for_removal([old, lru, fresh], now, 4 * HOUR, 100)
+    assert victims == [old, lru]
+
+
+def test_checkpoint_and_artifacts_go_together(tmp_path, monkeypatch):
+    job_dir = _job(tmp_path, 'alice', 'k1', 'job-1', hours=100)
+    assert _gc(tmp_path, monkeypatch)['removed'] == 1
+    assert not job_dir.exists()
+    assert sorted(os.listdir(tmp_path / 'alice')) == ['chunk_summaries', 'jobs']
+    assert not os.listdir(tmp_path / 'alice' / 'chunk_summaries')
+
+
+def test_recent_checkpoint_keeps_old_artifacts(tmp_path, monkeypatch):
+    job_dir = _job(tmp_path, 'alice', 'k1', 'job-1', hours=100)
+    os.utime(job_dir / 'job.json')  # the job was just resumed
+    assert _gc(tmp_path, monkeypatch)['removed'] == 0
+    assert (tmp_path / 'alice' / 'job-1_summary.txt').exists()
+
+
+def test_leased_folders_are_skipped(tmp_path, monkeypatch):
+    job_dir = _job(tmp_path, 'alice', 'k1', 'job-1', hours=100)
+    lease = storage.take_lease(str(job_dir))
+    _age(job_dir, 100)
+    assert _gc(tmp_path, monkeypatch, quota_mb=0.0001)['removed'] == 0
+    assert (tmp_path / 'alice' / 'job-1_podcast.wav').exists()
+
+    # A lease left behind by a process that died does not count.
+    storage.drop_lease(lease)
+    (job_dir / f"{storage._LEASE_PREFIX}999999999-dead").write_text("")
+    _age(job_dir, 100)
+    assert _gc(tmp_path, monkeypatch)['removed'] == 1
+    assert not job_dir.exists()
+
+
+class FakeS3:
+    """The parts of a boto3 S3 client that S3Storage uses, kept in a dict."""
+
+    class exceptions:
+        class ClientError(Exception):
+            pass
+
+        class NoSuchKey(ClientError):
+            pass
+
+    class _Body(io.BytesIO):
+        def iter_chunks(self, size):
+            return iter(lambda: self.read(size), b'')
+
+    def __init__(self):
+        self.objects = {}  # key -> (bytes, content type, mtime)
+
+    def upload_file(self, path, bucket, key, ExtraArgs=None):
+        with open(path, 'rb') as f:
+            self.objects[key] = (f.read(), (ExtraArgs or {}).get('ContentType'), time.time())
+
+    def head_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.ClientError(Key)
+        return {}
+
+    def get_object(self, Bucket, Key):
+        if Key not in self.objects:
+            raise self.exceptions.NoSuchKey(Key)
+        data, content_type, _ = self.objects[Key]
+        return {'Body': self._Body(data), 'ContentType': content_type, 'ContentLength': len(data)}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+    def get_paginator(self, name):
+        outer = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                yield {'Contents': [{'Key': key, 'Size': len(data), 'LastModified': datetime.fromtimestamp(mtime)}
+                                    for key, (data, _, mtime) in outer.objects.items() if key.startswith(Prefix)]}
+
+        return Paginator()
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    """S3Storage over FakeS3, installed as the server's artifact storage."""
+    root = tmp_path / 'uploads'
+    (root / 'alice').mkdir(parents=True)
+    store = storage.S3Storage(str(root), 'bucket', prefix='p/', client=FakeS3())
+    monkeypatch.setattr(storage, '_storage', store)
+    return store
+
+
+def test_s3_publish_serve_and_collect(s3, monkeypatch):
+    path = os.path.join(s3.root, 'alice', 'job-1_summary.txt')
+    with open(path, 'w') as f:
+        f.write("summary")
+    assert s3.exists('alice/job-1_summary.txt') and s3.read('alice/job-1_summary.txt') == b"summary"
+    s3.publish(path)
+    assert not os.path.exists(path)
+    assert s3.client.objects['p/alice/job-1_summary.txt'][1] == 'text/plain'
+    assert s3.exists('alice/job-1_summary.txt') and s3.read('alice/job-1_summary.txt') == b"summary"
+    assert not s3.exists('alice/other.txt') and s3.read('alice/other.txt') is None
+
+    import server
+    response = server.app.test_client().get('/artifacts/alice/job-1_summary.txt')
+    assert response.status_code == 200 and response.data == b"summary"
+
+    s3.client.objects['p/alice/job-1_summary.txt'] = (b"summary", 'text/plain', time.time() - 100 * HOUR)
+    monkeypatch.setattr(storage, 'ARTIFACT_MAX_AGE_HOURS', 72)
+    monkeypatch.setattr(storage, 'ARTIFACT_USER_QUOTA_MB', 0)
+    assert storage.collect_garbage(s3)['removed'] == 1
+    assert not s3.client.objects
+
+
+def test_s3_job_reads_published_artifacts_back(s3, tmp_path, monkeypatch):
+    import audio
+    import checkpoints
+    import llm_client
+    import pdf_writer
+    import server
+    import tts
+
+    def speak(engine, text, path):
+        with open(path, 'wb') as f:
+            audio.write_wav_header(f, 2, 24000)
+            f.write(b'\0\0')
+
+    monkeypatch.setattr(server, 'UPLOAD_FOLDER', s3.root)
+    monkeypatch.setattr(server, 'TTS_PIPELINE', False)
+    monkeypatch.setattr(tts, 'init_engine', lambda: None)
+    monkeypatch.setattr(tts, '_engine', None)
+    monkeypatch.setattr(tts, 'speak', speak)
+    monkeypatch.setattr(llm_client, 'get_client', lambda: llm_client.LLMClient(llm_client.StubBackend()))
+    import fitz
+    doc = fitz.open()
+    for n in range(3):
+        doc.new_page().insert_text((72, 72), f"Section {n} explains topic {n} in detail. " * 3)
+    source = tmp_path / 'source.pdf'
+    doc.save(str(source))
+    folder = os.path.join(s3.root, 'alice')
+
+    def run():
+        upload = tmp_path / 'upload.pdf'
+        upload.write_bytes(source.read_bytes())
+        checkpoint = checkpoints.JobCheckpoint(os.path.join(folder, 'jobs', checkpoints.job_key(str(upload), 'short')))
+        checkpoint.start('00000000-0000-4000-8000-000000000001')
+        body, status = server._run_pdf_job(str(upload), checkpoint.job_id, 'short', folder=folder,
+                                           checkpoint=checkpoint, defer_pdf=True)
+        pdf_writer.wait_pending(os.path.join(folder, f"{checkpoint.job_id}_summary.pdf"), timeout=30)
+        return body, status, checkpoint
+
+    body, status, checkpoint = run()
+    assert status == 200
+    pdf_key = 'p/' + body['pdfUrl'][len('/artifacts/'):]
+    assert pdf_key in s3.client.objects and not os.path.exists(os.path.join(s3.root, pdf_key[2:]))
+    # The result waited for the PDF, which was already uploaded by then
+    for _ in range(100):
+        if checkpoint.completed('done'):
+            break
+        time.sleep(0.02)
+    assert checkpoint.completed('done')
+
+    # A lost PDF is rebuilt from the summary text stored in S3
+    del s3.client.objects[pdf_key]
+    response = server.app.test_client().get(body['pdfUrl'])
+    assert response.status_code == 200 and response.data.startswith(b'%PDF')
+
+    # Audio that lives only in S3 still counts as done
+    monkeypatch.setattr(tts, 'speak', lambda *args: pytest.fail("audio regenerated"))
+    checkpoint.rewind(audio_present=server._artifact_exists(body['audioUrl'], folder))
+    assert checkpoint.stage == 'audio'
+    again, status, _ = run()
+    assert status == 200 and again['audioUrl'] == body['audioUrl']
@@ -0,0 +1,33 @@
+import server
+
+
+class _Client:
+    """generate_stream stand-in that records how far the stream was read."""
+
+    def __init__(self, pieces):
+        self.pieces = pieces
+        self.sent = 0
+        self.closed = False
+
+    def generate_stream(self, prompt, generation_config=None, stage=None):
+        try:
+            for piece in self.pieces:
+                self.sent += 1
+                yield piece
+        finally:
+            self.closed = True
+
+
+def test_stops_at_the_word_budget():
+    client = _Client(["One two ", "three fo", "ur five six ", "seven eight"])
+    seen = []
+    text = server._stream_until_words(client, "prompt", 5, on_piece=seen.append)
+    assert text == "One two three four five"
+    assert client.sent == 3 and client.closed  # the last piece was never requested
+    assert "".join(seen).strip() == text
+
+
+def test_short_responses_are_kept_whole():
+    client = _Client(["Just ", "a few words."])
+    assert server._stream_until_words(client, "prompt", 50) == "Just a few words."
+    assert client.closed
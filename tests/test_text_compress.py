@@ -0,0 +1,59 @@
+import text_compress
+
+
+def test_table_keeps_each_row():
+    text = "Results below.\nRegion Q1 Q2 Q3\nNorth 10 20 30\nSouth 5 6 7\nEast 1,200 3 4\nThe end."
+    assert text_compress.compress_text(text).splitlines() == [
+        "Results below.",
+        "[Table, 3 rows x 4 columns: Region | Q1 | Q2 | Q3; North: 10 20 30; South: 5 6 7; East: 1,200 3 4]",
+        "The end.",
+    ]
+
+
+def test_numeric_header_row_is_not_data():
+    text = "2019 2020 2021\nRevenue 10 20 30\nCosts 5 6 7\nProfit 5 14 23"
+    summary = text_compress.compress_text(text)
+    assert summary.startswith("[Table, 3 rows x 4 columns: 2019 | 2020 | 2021; Revenue: 10 20 30;")
+
+
+def test_short_runs_stay_as_text():
+    assert text_compress.compress_text("Revenue 10 20 30\nCosts 5 6 7") == "Revenue 10 20 30\nCosts 5 6 7"
+
+
+def test_drops_page_numbers_and_specks():
+    assert text_compress.compress_text("Intro  text\n\n12\n-----\nPage 3 of 9\nMore text") == "Intro text\nMore text"
+
+
+def test_line_break_hyphens():
+    text = "the infor-\nmation is self-\naware and non-\nlinear, says the Co-\nauthor"
+    assert text_compress.compress_text(text) == "the information is self-aware and non-linear, says the Co-author"
+
+
+def test_formulas_and_bullets_are_kept():
+    text = "x = (a + b) / 2;\n• A\n• B\n* * *\n'"
+    assert text_compress.compress_text(text) == "x = (a + b) / 2;\n• A\n• B"
+
+
+def test_numeric_prose_next_to_a_table_stays_prose():
+    text = ("In 2019 45 300 people moved.\nFigure 3 shows 12 34 56\nSales by quarter.\nQ1 Q2 Q3 Q4\n"
+            "North 10 20 30 40\nSouth 5 6 7 8\nEast 1 2 3 4\nOnly 4 5 6 were left.")
+    assert text_compress.compress_text(text).splitlines() == [
+        "In 2019 45 300 people moved.",
+        "Figure 3 shows 12 34 56",
+        "Sales by quarter.",
+        "[Table, 3 rows x 5 columns: Q1 | Q2 | Q3 | Q4; North: 10 20 30 40; South: 5 6 7 8; East: 1 2 3 4]",
+        "Only 4 5 6 were left.",
+    ]
+
+
+def test_rows_need_consistent_columns():
+    assert text_compress.compress_text("Revenue 10 20 30\nCosts 5 6\nProfit 5 14 23") == \
+        "Revenue 10 20 30\nCosts 5 6\nProfit 5 14 23"
+    text = "Name\tQ1\tQ2\nNorth America\t10\t20\nSouth\t5\t6\nWest\t7\t8"
+    assert text_compress.compress_text(text) == \
+        "[Table, 3 rows x 3 columns: Name | Q1 | Q2; North America: 10 20; South: 5 6; West: 7 8]"
+
+
+def test_running_headers_are_kept_once():
+    text = "Annual Report\nText one.\n3\nAnnual Report\nText two.\n4\nAnnual Report\nText three."
+    assert text_compress.compress_text(text) == "Annual Report\nText one.\nText two.\nText three."
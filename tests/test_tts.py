@@ -0,0 +1,135 @@
+import os
+import shutil
+import threading
+import time
+import wave
+
+import pytest
+
+import audio
+import tts
+
+
+class FakeEngine:
+    """Stands in for the shared pyttsx3 engine and notices overlapping use."""
+
+    def __init__(self):
+        self.queued = []
+        self.active = 0
+        self.overlaps = 0
+        self._lock = threading.Lock()
+
+    def getProperty(self, name):
+        return {'voice': 'fake', 'rate': 150, 'volume': 0.9}[name]
+
+    def save_to_file(self, text, path):
+        self.queued.append((text, path))
+
+    def runAndWait(self):
+        with self._lock:
+            self.active += 1
+            self.overlaps += self.active > 1
+        time.sleep(0.002)
+        queued, self.queued = self.queued, []
+        for text, path in queued:
+            with open(path, 'wb') as f:
+                frames = b'\x10\x00' * 240 * len(text.split())
+                audio.write_wav_header(f, len(frames), 24000)
+                f.write(frames)
+        with self._lock:
+            self.active -= 1
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    fake = FakeEngine()
+    monkeypatch.setattr(tts, 'init_engine', lambda: fake)
+    monkeypatch.setattr(tts, '_engine', None)
+    return fake
+
+
+def test_engine_is_configured_once_per_process(monkeypatch):
+    created = []
+    monkeypatch.setattr(tts, 'init_engine', lambda: created.append(FakeEngine()) or created[-1])
+    monkeypatch.setattr(tts, '_engine', None)
+    for _ in range(3):
+        with tts.engine_session() as engine:
+            assert engine is created[0]
+    with pytest.raises(RuntimeError):
+        with tts.engine_session():
+            raise RuntimeError("engine stuck")
+    with tts.engine_session() as engine:
+        assert engine is created[1]
+    assert len(created) == 2
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_concurrent_pipelines_take_turns_on_the_engine(engine, tmp_path, monkeypatch, cached):
+    cache = tts.SentenceCache(str(tmp_path / 'cache'), 50 * 1024 * 1024) if cached else None
+    monkeypatch.setattr(tts, 'get_cache', lambda: cache)
+    results = {}
+
+    def job(n):
+        speech = tts.SpeechPipeline(str(tmp_path / f"out{n}.wav"), segment_words=5)
+        text = " ".join(f"Job {n} sentence {i} is spoken here." for i in range(12))
+        for word in text.split(" "):
+            speech.feed(word + " ")
+        results[n] = speech.finish(text)
+
+    threads = [threading.Thread(target=job, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {n: True for n in range(4)}
+    assert engine.overlaps == 0
+
+
+def test_sentence_cache_reuses_audio(engine, tmp_path):
+    cache = tts.SentenceCache(str(tmp_path / 'cache'), 50 * 1024 * 1024)
+    first = tts.synthesize_sentences(engine, ["Hello there.", "General remarks."], cache)
+    again = tts.synthesize_sentences(engine, ["Hello   there.", "Something new."], cache)
+    assert again[0] == first[0]  # whitespace-normalized key
+    assert again[1] != first[1]
+
+
+def test_sentence_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(tts, 'CACHE_GRACE_SECONDS', 0)
+    cache = tts.SentenceCache(str(tmp_path / 'cache'), 3000)
+    paths = []
+    for n in range(4):
+        scratch = cache.scratch_path()
+        with open(scratch, 'wb') as f:
+            f.write(b'x' * 1000)
+        paths.append(cache.put(cache.key(f"s{n}", ()), scratch))
+        time.sleep(0.01)
+    kept = [p for p in paths if os.path.exists(p)]
+    assert paths[-1] in kept and paths[0] not in kept
+    assert len(kept) * 1000 <= 3000
+
+
+def test_concat_wavs_rejects_mismatched_formats(tmp_path):
+    for name, rate in (('a.wav', 24000), ('b.wav', 16000)):
+        with open(tmp_path / name, 'wb') as f:
+            audio.write_wav_header(f, 4, rate)
+            f.write(b'\0' * 4)
+    with pytest.raises(ValueError):
+        tts.concat_wavs([str(tmp_path / 'a.wav'), str(tmp_path / 'b.wav')], str(tmp_path / 'out.wav'))
+    tts.concat_wavs([str(tmp_path / 'a.wav')] * 2, str(tmp_path / 'out.wav'))
+    with wave.open(str(tmp_path / 'out.wav')) as w:
+        assert w.getnframes() == 4
+
+
+def test_finish_reports_failure_when_a_segment_is_gone(engine, tmp_path, monkeypatch):
+    cache = tts.SentenceCache(str(tmp_path / 'cache'), 50 * 1024 * 1024)
+    monkeypatch.setattr(tts, 'get_cache', lambda: cache)
+    speech = tts.SpeechPipeline(str(tmp_path / 'out.wav'), segment_words=3)
+    speech.feed("First sentence here. Second one too. ")
+    real_join = tts.join_wavs
+
+    def join_after_eviction(paths, output_path):
+        shutil.rmtree(cache.root)  # another worker evicted them meanwhile
+        real_join(paths, output_path)
+
+    monkeypatch.setattr(tts, 'join_wavs', join_after_eviction)
+    assert speech.finish("First sentence here. Second one too.") is False
@@ -0,0 +1,17 @@
+import io
+import os
+
+from werkzeug.datastructures import FileStorage
+
+import server
+
+
+def test_uploads_with_the_same_name_get_separate_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, 'UPLOAD_FOLDER', str(tmp_path))
+    first = server._save_upload(FileStorage(io.BytesIO(b'%PDF-1 first'), filename='report.pdf'))
+    second = server._save_upload(FileStorage(io.BytesIO(b'%PDF-1 second'), filename='report.pdf'))
+    assert first != second
+    assert open(first, 'rb').read() == b'%PDF-1 first'
+    assert server._upload_name(first) == server._upload_name(second) == 'report.pdf'
+    hostile = server._save_upload(FileStorage(io.BytesIO(b'%PDF-1'), filename='../../etc/x.pdf'))
+    assert os.path.dirname(hostile) == str(tmp_path)
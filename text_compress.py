@@ -0,0 +1,172 @@
+"""
+Prompt compression for extracted PDF text.
+
+Cleans up what pypdf/PyMuPDF/OCR hand us before it is sent to the model:
+joins words hyphenated across line breaks, collapses whitespace, drops lines
+that carry no information (page numbers, rule lines and OCR specks with no
+letters or digits, running headers and footers repeated on every page) and
+folds runs of numeric table rows into one compact line that keeps each
+row's label and values. Smaller prompts mean cheaper and faster chunk calls.
+
+A line is a table row only if its cells are split by tabs, "|" or runs of
+spaces and mostly numeric, or if it is a label followed by nothing but
+numbers. A table is folded only when at least _MIN_TABLE_ROWS consecutive
+rows have the same number of value columns, so prose that happens to
+contain numbers stays as written.
+
+Disable with PROMPT_COMPRESSION=0.
+"""
+
+import os
+import re
+from collections import Counter
+
+PROMPT_COMPRESSION = (os.environ.get('PROMPT_COMPRESSION', '1').strip().lower() not in ('0', 'false', 'no', 'off'))
+
+# Rows with at least this many cells, mostly numeric, count as table rows.
+_MIN_TABLE_CELLS = 3
+# Fold a table only when it has at least this many consecutive rows.
+_MIN_TABLE_ROWS = 3
+# A short line seen this often in one text is a running header or footer;
+# only its first occurrence is kept.
+_FURNITURE_REPEATS = 3
+_FURNITURE_MAX_LENGTH = 80
+
+_HYPHEN_BREAK = re.compile(r"(\w+)-[ \t]*\n[ \t]*([a-z])")
+# A line ending in one of these plus "-" is a real compound ("self-aware",
+# "non-linear"), so the hyphen stays when the lines are joined.
+_COMPOUND_PREFIXES = {'self', 'non', 'co', 'ex', 'quasi', 'anti', 'cross', 'half'}
+_SPACES = re.compile(r"[ \t\u00a0\u200b]+")
+_INVISIBLE = re.compile(r"[\u00a0\u200b]")
+_SEPARATOR = re.compile(r"\t|\s*\|\s*| {2,}")
+_NUMBER = re.compile(r"^[-+(]?[$€£]?\d[\d,]*(\.\d+)?%?\)?$")
+_PAGE_NUMBER = re.compile(r"^(page\s*)?\d{1,4}(\s*(of|/)\s*\d{1,4})?$", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text or "") + 3) // 4
+
+
+def _join_hyphenated(match) -> str:
+    word = match.group(1)
+    if word.lower() in _COMPOUND_PREFIXES:
+        return f"{word}-{match.group(2)}"
+    return word + match.group(2)
+
+
+def _is_noise(line: str) -> bool:
+    """Page numbers and lines without a single letter or digit ("-----", specks)."""
+    return bool(_PAGE_NUMBER.match(line)) or not any(ch.isalnum() for ch in line)
+
+
+def _table_row(raw_line: str):
+    """(cells, value columns) if the line looks like a numeric table row, else None.
+
+    `raw_line` keeps its tabs and runs of spaces, which separate cells.
+    """
+    line = _INVISIBLE.sub(" ", raw_line).strip()
+    if _SEPARATOR.search(line):
+        cells = [c for c in _SEPARATOR.split(line) if c]
+        numeric = sum(1 for c in cells if _NUMBER.match(c))
+        if len(cells) >= _MIN_TABLE_CELLS and numeric >= max(2, len(cells) * 0.6):
+            return cells, len(cells) - (0 if _NUMBER.match(cells[0]) else 1)
+    # Single spaces: a label without numbers, then only numbers ("North 10 20 30")
+    words = line.split()
+    count = 0
+    while count < len(words) and _NUMBER.match(words[-1 - count]):
+        count += 1
+    label = words[:len(words) - count]
+    if count < 2 or count + bool(label) < _MIN_TABLE_CELLS or any(any(ch.isdigit() for ch in w) for w in label):
+        return None
+    return ([" ".join(label)] if label else []) + words[len(words) - count:], count
+
+
+def _header_cells(line: str, columns: int):
+    """Cells of a line that could head a table of `columns` columns, else None."""
+    cells = [c for c in re.split(r"\s*\|\s*", line) if c] if "|" in line else line.split()
+    if line.endswith(('.', ':', ';', '!', '?', ',')):
+        return None  # a sentence introducing the table, not its header
+    if len(cells) in (columns, columns - 1) and not any(_NUMBER.match(c) for c in cells):
+        return cells
+    return None
+
+
+def _summarize_table(rows, header=None) -> str:
+    """One line per table: the header, then each row as 'label: values'."""
+    columns = max(len(r) for r in rows)
+    parts = [" | ".join(header)] if header else []
+    for row in rows:
+        if _NUMBER.match(row[0]):
+            parts.append(" ".join(row))
+        else:
+            parts.append(f"{row[0]}: {' '.join(row[1:])}")
+    return f"[Table, {len(rows)} rows x {columns} columns: " + "; ".join(parts) + "]"
+
+
+def _flush_table(out, table):
+    """Append a run of table rows (cells, line) to `out`, folded if long enough."""
+    if len(table) < _MIN_TABLE_ROWS:
+        out.extend(line for _, line in table)
+        return
+    rows = [cells for cells, _ in table]
+    header = None
+    if all(_NUMBER.match(c) for c in rows[0]) and not _NUMBER.match(rows[1][0]):
+        # An all-numeric row above labelled rows names the columns (years, quarters)
+        header, rows = rows[0], rows[1:]
+    elif out:
+        # The line just above the numbers often names the columns
+        header = _header_cells(out[-1], max(len(r) for r in rows))
+        if header:
+            out.pop()
+    out.append(_summarize_table(rows, header))
+
+
+def compress_text(text: str) -> str:
+    """Return a normalized, compressed copy of extracted text."""
+    if not text:
+        return ""
+    text = _HYPHEN_BREAK.sub(_join_hyphenated, text)
+    raw_lines = text.splitlines()
+    lines = [_SPACES.sub(" ", raw).strip() for raw in raw_lines]
+    repeats = Counter(line for line in lines if line and len(line) <= _FURNITURE_MAX_LENGTH)
+    seen = set()
+    out = []
+    table, columns = [], None
+    for raw_line, line in zip(raw_lines, lines):
+        if not line:
+            continue
+        row = _table_row(raw_line)
+        if row:
+            cells, row_columns = row
+            if table and row_columns != columns:
+                _flush_table(out, table)
+                table = []
+            table.append((cells, line))
+            columns = row_columns
+            continue
+        if table:
+            _flush_table(out, table)
+            table = []
+        if _is_noise(line):
+            continue
+        if repeats[line] >= _FURNITURE_REPEATS:
+            if line in seen:
+                continue  # running header or footer
+            seen.add(line)
+        out.append(line)
+    if table:
+        _flush_table(out, table)
+    return "\n".join(out)
+
+
+def compress_for_prompt(text: str):
+    """Compress text if PROMPT_COMPRESSION is on.
+
+    Returns (text, tokens_before, tokens_after).
+    """
+    before = estimate_tokens(text)
+    if not PROMPT_COMPRESSION:
+        return text, before, before
+    compressed = compress_text(text)
+    return compressed, before, estimate_tokens(compressed)
@@ -0,0 +1,51 @@
+"""
+Disk-backed list of strings for bounded-memory extraction.
+
+SpilledTextList behaves like a read-mostly list of str, but each item is
+appended to an anonymous temp file and only its offset is kept in memory.
+Items are read back on access, so a 2000-page document costs a few bytes of
+RAM per chunk instead of its full text.
+"""
+
+import tempfile
+
+
+class SpilledTextList:
+    """Append-only list of strings stored in a temporary file."""
+
+    def __init__(self, prefix='pdf2podcast_text_'):
+        self._file = tempfile.TemporaryFile(mode='w+b', prefix=prefix)
+        self._spans = []  # (offset, length) per item
+
+    def append(self, text: str) -> None:
+        data = (text or "").encode('utf-8')
+        self._file.seek(0, 2)
+        self._spans.append((self._file.tell(), len(data)))
+        self._file.write(data)
+
+    def __len__(self) -> int:
+        return len(self._spans)
+
+    def __bool__(self) -> bool:
+        return bool(self._spans)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        offset, length = self._spans[index]
+        self._file.seek(offset)
+        return self._file.read(length).decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self._spans)):
+            yield self[i]
+
+    def close(self) -> None:
+        self._file.close()
+        self._spans = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
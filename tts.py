@@ -0,0 +1,379 @@
+"""
+Text-to-speech for PDF to Podcast Generator.
+
+Holds the pyttsx3 engine setup used for whole-text synthesis, and
+SpeechPipeline, which speaks a summary while it is still being generated:
+complete sentences from the streaming synthesis are grouped into segments
+of about TTS_SEGMENT_WORDS words and rendered on a background thread, and
+the segment WAVs are joined once the text is final (trimmed and levelled
+by audio.assemble when numpy is installed). End-to-end time is then close
+to the longer of generation and speech rather than their sum.
+
+With TTS_CACHE_MB > 0, speech is synthesized per sentence and kept in
+SentenceCache under TTS_CACHE_DIR, keyed by the normalized sentence and the
+voice, rate and volume. Repeated sentences (re-runs, recurring takeaways,
+related documents) are then assembled from cached audio instead of being
+spoken by pyttsx3 again. The cache is shared by all workers and trimmed to
+TTS_CACHE_MB, least recently used first.
+
+pyttsx3.init() hands every caller in a process the same engine, which can
+only render one batch at a time. All speech goes through engine_session(),
+which holds a process-wide lock while the engine is used, so concurrent jobs
+in a threaded worker take turns (per segment, when streaming). The engine is
+configured once per process and reused by every session.
+"""
+
+import hashlib
+import os
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import unicodedata
+import wave
+from contextlib import contextmanager
+
+import audio
+import metrics
+
+TTS_SEGMENT_WORDS = int(os.environ.get('TTS_SEGMENT_WORDS', '40') or 40)
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', 'tts_cache')
+TTS_CACHE_MB = float(os.environ.get('TTS_CACHE_MB', '200') or 0)
+
+# Cached sentences used this recently (seconds) are never evicted, so another
+# worker cannot remove audio a job is about to join.
+CACHE_GRACE_SECONDS = 120
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+_engine_lock = threading.RLock()
+_engine = None
+_engine_pid = None
+
+
+def init_engine():
+    """A configured pyttsx3 engine (female voice when available, rate 150)."""
+    import pyttsx3
+    engine = pyttsx3.init()
+    voices = engine.getProperty('voices')
+    if voices:
+        # Try to use a female voice if available
+        for voice in voices:
+            if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
+                engine.setProperty('voice', voice.id)
+                break
+    engine.setProperty('rate', 150)  # Speed of speech
+    engine.setProperty('volume', 0.9)  # Volume level (0.0 to 1.0)
+    return engine
+
+
+@contextmanager
+def engine_session():
+    """The process's pyttsx3 engine, for this thread's exclusive use inside the block.
+
+    Created on first use (and again after fork); a session that fails drops
+    it, so the next one starts from a fresh engine.
+    """
+    global _engine, _engine_pid
+    with _engine_lock:
+        if _engine is None or _engine_pid != os.getpid():
+            _engine = init_engine()
+            _engine_pid = os.getpid()
+        try:
+            yield _engine
+        except BaseException:
+            _engine = None
+            raise
+
+
+def synthesize(engine, text: str, path: str) -> None:
+    """Render `text` to a WAV file at `path`."""
+    engine.save_to_file(text, path)
+    engine.runAndWait()
+    if not os.path.exists(path):
+        raise RuntimeError("TTS audio file was not created")
+
+
+def split_sentences(text: str) -> list:
+    return [sentence.strip() for sentence in _SENTENCE_END.split(text) if sentence.strip()]
+
+
+def voice_settings(engine) -> tuple:
+    """The engine properties that change how a sentence sounds."""
+    return tuple(str(engine.getProperty(name)) for name in ('voice', 'rate', 'volume'))
+
+
+class SentenceCache:
+    """Bounded on-disk LRU of synthesized sentences, shared by all workers."""
+
+    def __init__(self, root: str, max_bytes: float):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk; None until first scanned
+        self._evict_at = max_bytes  # size that triggers the next scan
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def key(sentence: str, settings: tuple) -> str:
+        normalized = " ".join(unicodedata.normalize('NFKC', sentence).split())
+        digest = hashlib.sha256("\0".join((normalized,) + tuple(settings)).encode('utf-8'))
+        return digest.hexdigest()[:40]
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + '.wav')
+
+    def get(self, key: str):
+        """Path of the cached WAV (marked as just used), or None."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            metrics.record_cache('tts_sentence', False)
+            return None
+        metrics.record_cache('tts_sentence', True)
+        return path
+
+    def scratch_path(self) -> str:
+        """Where to synthesize a miss: same filesystem as the cache, so put() is a rename."""
+        return os.path.join(self.root, f"tmp-{os.getpid()}-{threading.get_ident()}-{time.monotonic_ns()}.wav")
+
+    def put(self, key: str, wav_path: str) -> str:
+        """Move a freshly synthesized WAV into the cache; returns its cached path."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = os.path.getsize(wav_path)
+        os.replace(wav_path, path)
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            over = self._size is None or self._size > self._evict_at
+        if over:
+            self.evict()
+        return path
+
+    def evict(self) -> None:
+        """Remove least recently used sentences until the cache fits max_bytes."""
+        items, total = [], 0
+        for dirpath, _, files in os.walk(self.root):
+            for name in files:
+                full = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(full)
+                except OSError:
+                    continue
+                total += st.st_size
+                if name.startswith('tmp-') and time.time() - st.st_mtime < 3600:
+                    continue  # a miss still being synthesized (older ones were abandoned)
+                items.append((st.st_mtime, st.st_size, full))
+        removed = 0
+        if total > self.max_bytes:
+            # Go down to 90% so a busy cache is not rescanned on every put.
+            target = self.max_bytes * 0.9
+            now = time.time()
+            for mtime, size, full in sorted(items):
+                if total <= target or now - mtime < CACHE_GRACE_SECONDS:
+                    break
+                try:
+                    os.remove(full)
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+        with self._lock:
+            self._size = total
+            # Still over (everything recent): wait for 5% growth before rescanning.
+            self._evict_at = max(self.max_bytes, total * 1.05)
+        if removed:
+            print(f"[INFO] TTS cache evicted {removed} sentence(s); {total / (1024 * 1024):.1f} MB in use")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """The process's SentenceCache, or None when TTS_CACHE_MB is 0."""
+    global _cache
+    if _cache is None and TTS_CACHE_MB > 0:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SentenceCache(TTS_CACHE_DIR, TTS_CACHE_MB * 1024 * 1024)
+    return _cache
+
+
+def synthesize_sentences(engine, sentences, cache) -> list:
+    """WAV paths for `sentences`, speaking only those not in `cache`.
+
+    All misses are queued on the engine and rendered in one runAndWait.
+    """
+    settings = voice_settings(engine)
+    paths, misses = [], []
+    for sentence in sentences:
+        key = cache.key(sentence, settings)
+        path = cache.get(key)
+        if path is None:
+            path = cache.scratch_path()
+            engine.save_to_file(sentence, path)
+            misses.append((len(paths), key, path))
+        paths.append(path)
+    if misses:
+        try:
+            engine.runAndWait()
+            for index, key, path in misses:
+                if not os.path.exists(path):
+                    raise RuntimeError("TTS audio file was not created")
+                paths[index] = cache.put(key, path)
+        finally:
+            for _, _, path in misses:
+                if os.path.exists(path):
+                    os.remove(path)
+    return paths
+
+
+def speak(engine, text: str, output_path: str) -> None:
+    """Render `text` to output_path, through the sentence cache when enabled."""
+    cache = get_cache()
+    sentences = split_sentences(text)
+    if cache is None or not sentences:
+        synthesize(engine, text, output_path)
+        return
+    join_wavs(synthesize_sentences(engine, sentences, cache), output_path)
+
+
+def join_wavs(paths, output_path: str) -> None:
+    """Join speech WAVs, trimmed and levelled when numpy is available."""
+    if audio.available():
+        audio.assemble(paths, output_path)
+    else:
+        concat_wavs(paths, output_path)
+
+
+def concat_wavs(paths, output_path: str) -> None:
+    """Join WAV files with identical formats into one."""
+    with wave.open(output_path, 'wb') as out:
+        fmt = None
+        for path in paths:
+            with wave.open(path, 'rb') as part:
+                part_fmt = (part.getnchannels(), part.getsampwidth(), part.getframerate())
+                if fmt is None:
+                    fmt = part_fmt
+                    out.setnchannels(fmt[0])
+                    out.setsampwidth(fmt[1])
+                    out.setframerate(fmt[2])
+                elif part_fmt != fmt:
+                    raise ValueError(f"WAV format mismatch in {path}: {part_fmt} != {fmt}")
+                while True:
+                    frames = part.readframes(1 << 16)
+                    if not frames:
+                        break
+                    out.writeframes(frames)
+
+
+def _norm_word(word):
+    return re.sub(r"\W+", "", word.lower())
+
+
+class SpeechPipeline:
+    """Speaks streamed text sentence by sentence on a background thread."""
+
+    def __init__(self, output_path: str, segment_words: int = TTS_SEGMENT_WORDS):
+        self.output_path = output_path
+        self.segment_words = segment_words
+        self._dir = tempfile.mkdtemp(prefix='pdf2podcast_tts_')
+        self._queue = queue.Queue()
+        self._pending = ""       # streamed text not yet ending a sentence
+        self._segment = []       # complete sentences waiting for a full segment
+        self._segment_len = 0
+        self._spoken_words = []  # words handed to the TTS thread so far
+        self._paths = []
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='tts-pipeline', daemon=True)
+        self._thread.start()
+
+    def feed(self, text: str) -> None:
+        """Add streamed text; complete sentences are queued for speech."""
+        if self._error:
+            return
+        self._pending += text
+        parts = _SENTENCE_END.split(self._pending)
+        self._pending = parts.pop()  # the last part may be an unfinished sentence
+        for sentence in parts:
+            sentence = sentence.strip()
+            if sentence:
+                self._segment.append(sentence)
+                self._segment_len += len(sentence.split())
+                if self._segment_len >= self.segment_words:
+                    self._flush()
+
+    def _flush(self):
+        text = " ".join(self._segment)
+        self._segment, self._segment_len = [], 0
+        self._spoken_words.extend(text.split())
+        self._queue.put(text)
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                return
+            if self._error:
+                continue
+            try:
+                with engine_session() as engine:
+                    cache = get_cache()
+                    if cache is not None:
+                        self._paths.extend(synthesize_sentences(engine, split_sentences(text), cache))
+                        continue
+                    path = os.path.join(self._dir, f"{len(self._paths):05d}.wav")
+                    synthesize(engine, text, path)
+                    self._paths.append(path)
+            except Exception as e:
+                self._error = e
+
+    def _stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def finish(self, final_text: str) -> bool:
+        """Speak the part of final_text not streamed yet and write output_path.
+
+        The final text may differ from the stream (it can be extended or
+        trimmed after generation). If what was already spoken is not a
+        prefix of it, or synthesis or joining the segments failed, False is
+        returned so the caller can synthesize final_text as a whole.
+        """
+        try:
+            words = final_text.split()
+            spoken = len(self._spoken_words)
+            same = [_norm_word(w) for w in words[:spoken]] == [_norm_word(w) for w in self._spoken_words]
+            if not same:
+                print("[WARN] Final summary differs from the streamed text; re-synthesizing audio")
+                return False
+            if words[spoken:]:
+                self._queue.put(" ".join(words[spoken:]))
+            self._stop()
+            if self._error:
+                print(f"[ERROR] Streamed TTS failed: {self._error}")
+                return False
+            if not self._paths:
+                return False
+            try:
+                join_wavs(self._paths, self.output_path)
+            except Exception as e:
+                # e.g. mismatched formats, or a cached sentence evicted during a long job
+                print(f"[ERROR] Joining streamed TTS segments failed: {e}")
+                return False
+            print(f"[SUCCESS] Generated TTS audio from {len(self._paths)} streamed segment(s): {self.output_path}")
+            return True
+        finally:
+            self.cancel()
+
+    def cancel(self) -> None:
+        """Discard queued speech and remove temporary segments."""
+        if self._thread.is_alive():
+            self._error = self._error or RuntimeError("cancelled")
+            self._stop()
+        shutil.rmtree(self._dir, ignore_errors=True)